@@ -0,0 +1,231 @@
+"""
+The backtester module scores the expanded elo model out of sample. get_accuracy
+on prediction_expanded_stats, and the genetic algorithm tuning on it, score the
+weights on the same games they were tuned on. A walk-forward backtest instead
+fits the weights with param_fitter on seasons [a, b), scores them on season b
+only, then moves on to season b + 1.
+
+Usage
+-----
+Call walk_forward() to run the backtest and print_backtest() to print its
+results. With train_seasons the window rolls, keeping the last train_seasons
+seasons, otherwise it expands from the first season in the table. Either way
+the elos carry over from every game before the window, as they do in
+SeasonCheckpoints.window_stats().
+
+Each window replays its training games once per fitted point, and the ReplayState
+param_fitter returns for the fitted point is the checkpoint at the start of the
+scored season, so scoring it only replays that one season. The windows don't
+depend on each other and are spread over worker processes that attach to the
+game table in shared memory (see GameTable.worker_pool).
+
+Methods
+-------
+walk_forward(list test_seasons, int train_seasons, int min_train, int workers,
+             str backend, str objective, str method, int max_iter, int bins)
+                                                                    -> list:
+    fits and scores every window and returns one result dict per season.
+print_backtest(list results) -> none:
+    prints the per-season scores and the pooled calibration table.
+pool_calibration(list results) -> dict:
+    combines the calibration tables of several seasons.
+_windows(GameTable table, list test_seasons, int train_seasons, int min_train)
+                                                                    -> list:
+    returns the (first, last) training seasons of every scored season.
+_run_window(GameTable table, list window, dict options) -> dict:
+    fits one window and scores its season.
+_pool_window(list args) -> dict:
+    pool worker function that runs one window on the shared game table.
+
+Global Variables
+----------------
+MIN_TRAIN_SEASONS: default number of seasons before the first scored season.
+"""
+
+import numpy as np
+from data_handler import DataHandler, worker_table
+from elo_engine import replay
+from errors import InputTooSmallError
+from param_fitter import fit_parameters
+from stat_eval import get_accuracy, get_log_loss, get_brier, get_calibration
+
+MIN_TRAIN_SEASONS = 5
+
+def walk_forward(test_seasons=None, train_seasons=None, min_train=MIN_TRAIN_SEASONS, workers=1,
+                 backend='numpy', objective='log_loss', method='L-BFGS-B', max_iter=100, bins=10):
+    """
+    Runs a walk-forward backtest of the expanded elo model on the shared
+    GameTable. For every scored season b the weights are fitted on the
+    seasons before it and scored on the games of b.
+
+    Parameters
+    ----------
+    test_seasons : list, optional
+        seasons to score. The default is every season with at least min_train
+        seasons before it.
+    train_seasons : int, optional
+        number of seasons in a rolling training window. The default is None,
+        every season before the scored one.
+    min_train : int, optional
+        seasons before the first scored season when test_seasons isn't given.
+        The default is MIN_TRAIN_SEASONS.
+    workers : int, optional
+        number of processes the windows are spread over, 1 runs them in this
+        process. The default is 1.
+    backend : str, optional
+        replay backend from elo_engine.BACKENDS. The default is 'numpy'.
+    objective, method, max_iter : optional
+        passed to param_fitter.fit_parameters(), see there.
+    bins : int, optional
+        number of bins of the calibration table. The default is 10.
+
+    Raises
+    ------
+    InputTooSmallError
+        If train_seasons, min_train, workers or bins is below 1.
+    ValueError
+        If a scored season isn't in the table or has no season before it.
+
+    Returns
+    -------
+    list
+        one dict per scored season, in season order, holding the 'season',
+        the 'train' (first, last) seasons, the fitted 'entity', its
+        'train_objective' and 'train_accuracy' on the training seasons, the
+        number of 'games' scored with their 'accuracy', 'log_loss', 'brier'
+        and 'calibration' (see stat_eval.get_calibration()), and the
+        'replays' the fit took.
+    """
+    for value, var in ((train_seasons, 'train_seasons'), (min_train, 'min_train'),
+                       (workers, 'workers'), (bins, 'bins')):
+        if value is not None and value < 1:
+            raise InputTooSmallError(value, 1, var)
+
+    table = DataHandler.get_game_table()
+    windows = _windows(table, test_seasons, train_seasons, min_train)
+    options = {'backend': backend, 'objective': objective, 'method': method,
+               'max_iter': max_iter, 'bins': bins}
+    if workers == 1 or len(windows) == 1:
+        return [_run_window(table, window, options) for window in windows]
+
+    with table.worker_pool(min(workers, len(windows))) as executor:
+        return list(executor.map(_pool_window, [[window, options] for window in windows]))
+
+def print_backtest(results):
+    """
+    Prints the results of walk_forward() to console, one season per line,
+    followed by the totals and the calibration table of all seasons pooled.
+
+    :param results: list returned by walk_forward().
+    """
+    print(f"{'season':>6} {'train':>11} {'games':>6} {'accuracy':>9} {'log loss':>9} "
+          f"{'brier':>7} {'train acc':>9}")
+    for result in results:
+        first, last = result['train']
+        print(f"{result['season']:>6} {first:>5}-{last:<5} {result['games']:>6} "
+              f"{result['accuracy']:>9.2%} {result['log_loss']:>9.4f} {result['brier']:>7.4f} "
+              f"{result['train_accuracy']:>9.2%}")
+    games = np.array([result['games'] for result in results])
+    means = {name: np.average([result[name] for result in results], weights=games)
+             for name in ('accuracy', 'log_loss', 'brier')}
+    print(f"{'all':>6} {'':>11} {games.sum():>6} {means['accuracy']:>9.2%} "
+          f"{means['log_loss']:>9.4f} {means['brier']:>7.4f}")
+
+    calibration = pool_calibration(results)
+    print(f"\n{'expected':>11} {'games':>6} {'mean':>6} {'observed':>8}")
+    for low, high, count, expected, observed in zip(*calibration.values()):
+        print(f"{low:>4.2f}-{high:<4.2f}  {count:>6} {expected:>6.3f} {observed:>8.3f}")
+
+def pool_calibration(results):
+    """
+    Combines the calibration tables of several scored seasons into one, as if
+    stat_eval.get_calibration() had been called on all their games at once.
+
+    :param results: list of result dicts from walk_forward(), all with the same
+                    number of bins.
+
+    :return dict: returns the pooled table in the stat_eval.get_calibration()
+                  layout.
+    """
+    tables = [result['calibration'] for result in results]
+    games = sum(table['Games'] for table in tables)
+    #empty bins hold nan means, which count for nothing once weighted by 0 games
+    expected = sum(np.nan_to_num(table['Expected']) * table['Games'] for table in tables)
+    observed = sum(np.nan_to_num(table['Observed']) * table['Games'] for table in tables)
+    with np.errstate(invalid='ignore'):
+        return {'Low': tables[0]['Low'], 'High': tables[0]['High'], 'Games': games,
+                'Expected': expected / games, 'Observed': observed / games}
+
+def _windows(table, test_seasons, train_seasons, min_train):
+    """
+    Internal function that finds the training window of every scored season.
+
+    :param table: GameTable being backtested.
+    :param test_seasons: list of seasons to score, or None for every season
+                         with at least min_train seasons before it.
+    :param train_seasons: int length of a rolling window, or None to expand
+                          from the first season.
+    :param min_train: int seasons before the first default scored season.
+
+    :return list: returns list of [season, first, last] for every scored
+                  season, where first and last are the training seasons.
+    """
+    seasons = list(table.season_starts())
+    if test_seasons is None:
+        test_seasons = seasons[min_train:]
+    windows = []
+    for season in sorted(test_seasons):
+        if season not in seasons:
+            raise ValueError(f"season {season} isn't in the games table")
+        position = seasons.index(season)
+        if position == 0:
+            raise ValueError(f"season {season} has no earlier season to train on")
+        first = seasons[0] if train_seasons is None\
+                else seasons[max(position - train_seasons, 0)]
+        windows.append([season, first, seasons[position - 1]])
+    return windows
+
+def _run_window(table, window, options):
+    """
+    Internal function that fits one training window and scores the season
+    after it. The season is replayed from the state param_fitter ends the fit
+    on, so none of the training games are replayed again.
+
+    :param table: GameTable being backtested.
+    :param window: list of [season, first, last] from _windows().
+    :param options: dict of the fit and scoring options of walk_forward().
+
+    :return dict: returns the result of the season, see walk_forward().
+    """
+    season, first, last = window
+    fit = fit_parameters(objective=options['objective'], method=options['method'], table=table,
+                         backend=options['backend'], max_iter=options['max_iter'],
+                         seasons=(first, last))
+    start = fit['state'].position
+    stop = next((idx for other, idx in table.season_starts().items() if other > season),
+                len(table))
+
+    probabilities = np.empty((stop - start, 1))
+    state = replay([fit['entity']], table, fit['state'], stop, backend=options['backend'],
+                   probabilities=probabilities)
+    expected, results = probabilities[:, 0], table.result[start:stop]
+    right = int(state.right[0] - fit['state'].right[0])
+    return {'season': season, 'train': (first, last), 'entity': fit['entity'],
+            'train_objective': fit['objective'], 'train_accuracy': fit['accuracy'],
+            'games': stop - start,
+            'accuracy': float(get_accuracy({'Right': right, 'Wrong': stop - start - right})),
+            'log_loss': float(get_log_loss(expected, results)),
+            'brier': float(get_brier(expected, results)),
+            'calibration': get_calibration(expected, results, options['bins']),
+            'replays': fit['replays']}
+
+def _pool_window(args):
+    """
+    Pool worker function that runs one window on the shared game table.
+
+    :param args: list of [window, options], see _run_window().
+
+    :return dict: returns the result of _run_window().
+    """
+    window, options = args
+    return _run_window(worker_table(), window, options)
@@ -0,0 +1,92 @@
+"""
+The compare module compares two json files written by run_benchmarks.py and
+prints the change in best time of every benchmark found in both.
+
+Usage
+-----
+From the repository root run:
+
+    python benchmarks/compare.py old.json new.json [--threshold 1.1]
+
+Benchmarks whose best time grew by more than threshold times are marked as
+regressions, and the exit code is 1 if there are any.
+
+Methods
+-------
+main(list argv) -> int:
+    parses the command line, prints the comparison and returns the exit code.
+compare(dict old, dict new, float threshold) -> list[dict]:
+    matches the benchmarks of both runs and returns their timings.
+_key(dict result) -> tuple:
+    returns the key benchmarks are matched on.
+"""
+
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD = 1.1
+
+def main(argv=None):
+    """
+    Parses the command line arguments and prints the comparison.
+
+    :param argv: list of command line arguments, defaults to sys.argv[1:].
+
+    :return int: returns 1 if any benchmark regressed, otherwise 0.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('old', help='json results of the baseline run')
+    parser.add_argument('new', help='json results of the run to check')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='new/old ratio above which a benchmark has regressed')
+    args = parser.parse_args(argv)
+
+    with open(args.old) as file:
+        old = json.load(file)
+    with open(args.new) as file:
+        new = json.load(file)
+
+    print(f"old: {old['environment']['commit']}  new: {new['environment']['commit']}")
+    rows = compare(old, new, args.threshold)
+    for row in rows:
+        mark = 'REGRESSION' if row['regression'] else ''
+        print(f"{row['name']:<28}{row['dataset']:<8}{json.dumps(row['params']):<58} "
+              f"{row['old']:>9.4f}s {row['new']:>9.4f}s {row['ratio']:>6.2f}x {mark}")
+    return int(any(row['regression'] for row in rows))
+
+def compare(old, new, threshold=DEFAULT_THRESHOLD):
+    """
+    Matches the benchmarks of two runs on their name, dataset and parameters.
+
+    :param old: dict loaded from the baseline json file.
+    :param new: dict loaded from the json file to check.
+    :param threshold: float new/old ratio above which a benchmark has regressed.
+
+    :return list: returns one dict per benchmark found in both runs, with the
+                  'old' and 'new' best times, their 'ratio' and 'regression'.
+    """
+    old_results = {_key(result): result for result in old['results']}
+    rows = []
+    for result in new['results']:
+        if _key(result) not in old_results:
+            continue
+        old_best = old_results[_key(result)]['best']
+        ratio = result['best'] / old_best if old_best else float('inf')
+        rows.append({'name': result['name'], 'dataset': result['dataset'],
+                     'params': result['params'], 'old': old_best, 'new': result['best'],
+                     'ratio': ratio, 'regression': ratio > threshold})
+    return rows
+
+def _key(result):
+    """
+    Returns the key a benchmark result is matched on between runs.
+
+    :param result: result dict from run_benchmarks.
+
+    :return tuple: returns (name, dataset, params).
+    """
+    return (result['name'], result['dataset'], json.dumps(result['params'], sort_keys=True))
+
+if __name__ == '__main__':
+    sys.exit(main())
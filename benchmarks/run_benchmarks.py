@@ -0,0 +1,311 @@
+"""
+The run_benchmarks module times the hot paths of the project and writes the
+timings to a json file, so runs from different commits can be compared with
+benchmarks/compare.py.
+
+Usage
+-----
+From the repository root run:
+
+    python benchmarks/run_benchmarks.py [--scales 1 10 100] [--pop-sizes 10 50 100]
+                                        [--repeat 3] [--output path.json]
+
+Every benchmark is run on the real dataset. The replay benchmarks
+(prediction_expanded_stats and a genetic algorithm generation, with and without
+racing) are also run on synthetic leagues made by repeating the real seasons
+scales times, see scaled_table(). The benchmarks that read the games file (iter_games and
+_parse_game_table) are also run on csv files written by synthetic_league with
+scales times as many seasons as the real dataset, and record the peak memory
+used as well as the time. If scipy is installed, param_fitter.fit_parameters
+is timed on the real dataset with the number of replays it took, to compare
+against the pop_size x generations replays of the genetic algorithm, and if
+numba is installed too, so is a backtester.walk_forward() over the last
+BACKTEST_SEASONS seasons.
+
+Methods
+-------
+main(list argv) -> none:
+    parses the command line, runs every benchmark and writes the json file.
+run_benchmarks(list scales, list pop_sizes, int repeat) -> list[dict]:
+    runs every benchmark and returns one result dict per benchmark.
+scaled_table(GameTable table, int factor) -> GameTable:
+    returns a table holding the games of table repeated factor times.
+time_call(fn, int repeat, int warmup) -> dict:
+    times fn and returns the timings.
+peak_memory(fn) -> dict:
+    calls fn once and returns the peak memory it allocated.
+_file_benchmarks(record, str dataset, int repeat):
+    runs the benchmarks that read the data files DataHandler points at.
+_environment() -> dict:
+    returns the commit and library versions the benchmarks were run with.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+#the project modules read the data folder relative to the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data_handler import DataHandler, GameTable # pylint: disable=wrong-import-position
+from elo_kernel import HAS_NUMBA # pylint: disable=wrong-import-position
+import backtester # pylint: disable=wrong-import-position
+import genetic_alg # pylint: disable=wrong-import-position
+import param_fitter # pylint: disable=wrong-import-position
+import stat_eval # pylint: disable=wrong-import-position
+import synthetic_league # pylint: disable=wrong-import-position
+
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_POP_SIZES = [10, 50, 100]
+DEFAULT_REPEAT = 3
+BACKTEST_SEASONS = 5
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+def main(argv=None):
+    """
+    Parses the command line arguments, runs the benchmarks and writes the
+    results as json.
+
+    :param argv: list of command line arguments, defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help='how many times the real seasons are repeated for the '
+                             'synthetic leagues, 1 is the real dataset')
+    parser.add_argument('--pop-sizes', type=int, nargs='+', default=DEFAULT_POP_SIZES,
+                        help='population sizes for the genetic algorithm generation')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help='timed runs per benchmark')
+    parser.add_argument('--output', help='json file to write, defaults to '
+                                         'benchmarks/results/<commit>.json')
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    environment = _environment()
+    results = run_benchmarks(args.scales, args.pop_sizes, args.repeat)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{environment['commit'] or 'unknown'}.json")
+    with open(output, 'w') as file:
+        json.dump({'environment': environment, 'results': results}, file, indent=2)
+    print(f'Results written to {output}')
+
+def run_benchmarks(scales, pop_sizes, repeat):
+    """
+    Runs every benchmark and prints each result as it finishes.
+
+    :param scales: list of ints, how many times the real seasons are repeated
+                   for the replay benchmarks.
+    :param pop_sizes: list of population sizes for the generation benchmark.
+    :param repeat: int number of timed runs per benchmark.
+
+    :return list: returns list of result dicts with the benchmark name, dataset,
+                  parameters and timings.
+    """
+    import elo_grapher # pylint: disable=import-outside-toplevel
+
+    results = []
+    def record(name, dataset, params, timing):
+        result = {'name': name, 'dataset': dataset, 'params': params, **timing}
+        print(f"{name:<31}{dataset:<8}{json.dumps(params):<58} "
+              f"best {result['best']:.4f}s  mean {result['mean']:.4f}s")
+        results.append(result)
+
+    real_table = DataHandler.get_game_table()
+    replay_backends = ['python', 'numba'] if HAS_NUMBA else ['python']
+    generation_backends = ['numpy', 'numba'] if HAS_NUMBA else ['numpy']
+
+    #csv and graph benchmarks on the real dataset
+    record('get_games_file_data', 'real', {},
+           time_call(DataHandler.get_games_file_data, repeat))
+    _file_benchmarks(record, 'real', repeat)
+    record('prediction_basic_stats', 'real', {},
+           time_call(stat_eval.prediction_basic_stats, repeat))
+    teams = stat_eval.prediction_basic_stats()[1]
+    get_graph_max_min = elo_grapher._get_graph_max_min # pylint: disable=protected-access
+    record('_get_graph_max_min', 'real', {},
+           time_call(lambda: get_graph_max_min(teams), repeat))
+
+    #replay benchmarks, on the real dataset and the synthetic leagues
+    population_fitnesses = genetic_alg._population_fitnesses # pylint: disable=protected-access
+    try:
+        for scale in scales:
+            dataset = 'real' if scale == 1 else f'x{scale}'
+            table = real_table if scale == 1 else scaled_table(real_table, scale)
+            DataHandler.set_game_table(table)
+            for backend in replay_backends:
+                record('prediction_expanded_stats', dataset,
+                       {'backend': backend, 'n_games': len(table)},
+                       time_call(lambda: stat_eval.prediction_expanded_stats(
+                           20, 400, 65, .75, 1.5, backend=backend),
+                                 repeat, warmup=int(backend == 'numba')))
+            for pop_size in pop_sizes:
+                population = genetic_alg._initial_population( # pylint: disable=protected-access
+                    pop_size, np.random.default_rng(pop_size))
+                for backend in generation_backends:
+                    record('genetic_alg_generation', dataset,
+                           {'backend': backend, 'n_games': len(table), 'pop_size': pop_size},
+                           time_call(lambda: population_fitnesses(population, backend=backend),
+                                     repeat, warmup=int(backend == 'numba')))
+                    record('genetic_alg_generation_racing', dataset,
+                           {'backend': backend, 'n_games': len(table), 'pop_size': pop_size},
+                           time_call(lambda: population_fitnesses(
+                               population, backend=backend, keep=2 * (pop_size // 3)),
+                                     repeat, warmup=int(backend == 'numba')))
+    finally:
+        DataHandler.set_game_table(real_table)
+
+    #parameter fit, only on the real dataset with the fastest backend since
+    #most of its replays are of a single entity
+    if param_fitter.HAS_SCIPY:
+        backend = generation_backends[-1]
+        for method in param_fitter.METHODS:
+            fit = param_fitter.fit_parameters(method=method, backend=backend)
+            record('fit_parameters', 'real', {'method': method, 'backend': backend},
+                   {**time_call(lambda: param_fitter.fit_parameters(
+                       method=method, backend=backend), repeat),
+                    'replays': fit['replays'], 'accuracy': fit['accuracy']})
+
+    #walk-forward backtest, every window is a full fit so only with numba
+    if param_fitter.HAS_SCIPY and HAS_NUMBA:
+        seasons = list(real_table.season_starts())[-BACKTEST_SEASONS:]
+        scored = backtester.walk_forward(seasons, train_seasons=10, backend='numba')
+        record('walk_forward', 'real', {'seasons': len(seasons), 'train_seasons': 10},
+               {**time_call(lambda: backtester.walk_forward(
+                   seasons, train_seasons=10, backend='numba'), repeat),
+                'log_loss': float(np.average([result['log_loss'] for result in scored],
+                                             weights=[result['games'] for result in scored]))})
+
+    #games file benchmarks on synthetic csv files
+    n_seasons = len(real_table.season_starts())
+    with tempfile.TemporaryDirectory() as folder:
+        try:
+            for scale in scales:
+                if scale == 1:
+                    continue
+                games_file = os.path.join(folder, f'games_x{scale}.csv')
+                teams_file = os.path.join(folder, f'teams_x{scale}.csv')
+                synthetic_league.generate_league(games_file, teams_file,
+                                                 n_seasons=n_seasons * scale,
+                                                 first_season=1000, seed=scale)
+                DataHandler.set_data_files(games_file, teams_file)
+                _file_benchmarks(record, f'x{scale}', repeat)
+        finally:
+            DataHandler.set_data_files()
+            DataHandler.set_game_table(real_table)
+    return results
+
+def _file_benchmarks(record, dataset, repeat):
+    """
+    Runs the benchmarks that read the games file DataHandler points at.
+
+    :param record: function(name, dataset, params, timing) storing a result.
+    :param dataset: string name of the dataset.
+    :param repeat: int number of timed runs per benchmark.
+    """
+    def consume():
+        for _ in DataHandler.iter_games():
+            pass
+    parse = DataHandler._parse_game_table # pylint: disable=protected-access
+    n_games = len(parse())
+    record('iter_games', dataset, {'n_games': n_games},
+           {**time_call(consume, repeat), **peak_memory(consume)})
+    record('_parse_game_table', dataset, {'n_games': n_games},
+           {**time_call(parse, repeat), **peak_memory(parse)})
+
+def scaled_table(table, factor):
+    """
+    Builds a synthetic league by repeating every season of table factor times.
+    Each copy is moved after the previous one, both in season numbers and in
+    dates, so the copies replay like one long history of the same teams.
+
+    :param table: GameTable to repeat.
+    :param factor: int number of copies.
+
+    :return GameTable: returns the scaled table.
+    """
+    season_span = int(table.season.max()) - int(table.season.min()) + 1
+    date_span = (table.date.max() - table.date.min()) + np.timedelta64(1, 'D')
+    columns = {}
+    for name in GameTable.COLUMNS:
+        column = getattr(table, name)
+        if name == 'season':
+            copies = [column + copy * season_span for copy in range(factor)]
+        elif name == 'date':
+            copies = [column + copy * date_span for copy in range(factor)]
+        else:
+            copies = [column] * factor
+        columns[name] = np.concatenate(copies).astype(column.dtype)
+    return GameTable(columns, table.team_ids, table.name_to_idx)
+
+def time_call(fn, repeat, warmup=0):
+    """
+    Calls fn warmup times untimed (e.g. for numba compilation), then repeat
+    times timed.
+
+    :param fn: function taking no arguments to time.
+    :param repeat: int number of timed calls.
+    :param warmup: int number of untimed calls made first.
+
+    :return dict: returns dict with the 'best' and 'mean' time in seconds and
+                  all the 'times'.
+    """
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {'best': min(times), 'mean': sum(times) / len(times), 'times': times}
+
+def peak_memory(fn):
+    """
+    Calls fn once while tracing python memory allocations.
+
+    :param fn: function taking no arguments to measure.
+
+    :return dict: returns dict with the 'peak_mb' allocated during the call.
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'peak_mb': peak / 2 ** 20}
+
+def _environment():
+    """
+    Collects what the benchmarks were run with, so results from different
+    machines or commits aren't mistaken for regressions.
+
+    :return dict: returns dict of the commit, time and versions.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'numba': HAS_NUMBA,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count()}
+
+if __name__ == '__main__':
+    main()
@@ -6,21 +6,96 @@ Classes:
     EloCalculator:
         Methods:
             static _get_teams_file_data() -> list
+            static get_team_index() -> TeamIndex
             static get_teams() -> dict
+            static iter_games() -> iterator[Game]
+            static iter_schedule() -> iterator[Game]
+            static get_divisions() -> dict
             static get_games_file_data() -> list
+            static _iter_game_rows(bool) -> iterator[dict]
             static _format_games(list) -> list
+            static _format_date(str) -> str
+            static get_game_table() -> GameTable
+            static set_game_table(GameTable)
+            static set_data_files(str, str)
+            static _build_game_table() -> GameTable
+            static _parse_game_table() -> GameTable
+            static _load_game_table_cache() -> GameTable
+            static _save_game_table_cache(GameTable)
+            static _replace_cache_file(str, str, fn)
+            static _game_table_cache_key() -> dict
+    TeamIndex:
+        Constructor:
+            TeamIndex(list, dict)
+        Methods:
+            id_of(str) -> int
+            ids_of(list) -> np.ndarray
+            static from_teams_file_data(list) -> TeamIndex
+    GameTable:
+        Constructor:
+            GameTable(dict, list, dict)
+        Methods:
+            new_teams() -> list[dict, LeagueState]
+            season_starts() -> dict
+            digest() -> str
+            to_shared_memory() -> list[SharedMemory, dict]
+            static from_shared_memory(dict) -> list[SharedMemory, GameTable]
+            worker_pool(int) -> ProcessPoolExecutor
+
+Methods:
+    worker_table() -> GameTable
+    _init_pool_worker(dict)
 
 Global Variables:
     GAMES_FILE - string with path to csv file that holds all the games data.
     TEAMS_FILE - string with path to csv file that holds all the teams data.
+    DEFAULT_GAMES_FILE, DEFAULT_TEAMS_FILE - the data folder's games and teams
+                                             files, used unless set_data_files()
+                                             is called.
+    GAMES_CACHE_FILE - string with path to the binary cache of the parsed games.
+    GAMES_CACHE_META_FILE - string with path to the json describing the cache.
+    GAMES_CACHE_VERSION - int version of the cache layout, bump to invalidate
+                          existing caches.
+    EPOCH_ORDINAL - int proleptic ordinal of 1970-01-01, day 0 of datetime64.
+    Game - namedtuple of a game yielded by DataHandler.iter_games() and
+           DataHandler.iter_schedule().
 """
 
 import csv
-from nfl_team import NFLTeam
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+from array import array
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+import numpy as np
+from nfl_team import LeagueState
+from elo_calculator import HOME_WIN, HOME_LOSS, HOME_DRAW
 
 #Location of data files
-GAMES_FILE = 'data/spreadspoke_scores.csv'
-TEAMS_FILE = 'data/nfl_teams.csv'
+DEFAULT_GAMES_FILE = 'data/spreadspoke_scores.csv'
+DEFAULT_TEAMS_FILE = 'data/nfl_teams.csv'
+GAMES_FILE = DEFAULT_GAMES_FILE
+TEAMS_FILE = DEFAULT_TEAMS_FILE
+
+#Location of the parsed games cache, written next to GAMES_FILE
+GAMES_CACHE_FILE = 'data/spreadspoke_scores.npy'
+GAMES_CACHE_META_FILE = GAMES_CACHE_FILE + '.json'
+GAMES_CACHE_VERSION = 2
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+#compact form of one game, see DataHandler.iter_games()
+Game = namedtuple('Game', ['date', 'season', 'week', 'playoff', 'home', 'away',
+                           'score_home', 'score_away', 'neutral'])
+
+#game table attached by each GameTable.worker_pool() worker, see worker_table()
+_worker_table = None
+_worker_shm = None
 
 class DataHandler:
     """
@@ -35,19 +110,60 @@ class DataHandler:
     'ARI'.
 
     Calling get_games_file_data() will return a list containing every game played
-    in the GAMES_FILE, already formatted to the proper data types.
+    in the GAMES_FILE, already formatted to the proper data types. iter_games()
+    yields the same games one at a time as compact Game tuples, so large files
+    can be read without holding every row in memory.
+
+    Calling get_game_table() returns the shared, read-only GameTable holding the
+    same games as typed numpy columns. The table is built on the first call and
+    reused afterwards, so repeated evaluations don't re-read the csv files. The
+    parsed table is also saved to GAMES_CACHE_FILE, which later processes map
+    into memory instead of parsing the csv files again, until either csv file
+    changes.
 
     Methods
     -------
     get_teams() -> dict:
         returns main teams dict, containing team_name keys and nfl_team values.
+    iter_games() -> iterator[Game]:
+        yields every played game as a Game, reading GAMES_FILE lazily.
+    iter_schedule() -> iterator[Game]:
+        yields every not-yet played game as a Game without scores.
+    get_divisions() -> dict:
+        returns dict of team_id keys to the team's current division.
     get_games_file_data() -> list:
         returns list of all games, with formatted data.
+    _iter_game_rows(bool played) -> iterator[dict]:
+        yields the raw csv rows of GAMES_FILE before or after the first
+        unplayed game.
     _format_games(list data) -> list:
         formats and returns list of games from GAMES_FILE with proper data types.
+    _format_date(str date) -> str:
+        converts a M/D/YYYY date to YYYY-MM-DD.
+    get_game_table() -> GameTable:
+        returns the shared GameTable, building it on the first call.
+    set_game_table(GameTable table):
+        replaces the shared GameTable, None rebuilds it from the data files.
+    set_data_files(str games_file, str teams_file):
+        points the DataHandler at another pair of data files.
+    _build_game_table() -> GameTable:
+        loads the GameTable from the cache, or parses and caches it.
+    _parse_game_table() -> GameTable:
+        reads both data files and converts the games into a GameTable.
+    _load_game_table_cache() -> GameTable:
+        maps the cached GameTable into memory if the cache is up to date.
+    _save_game_table_cache(GameTable table):
+        writes table to the cache files.
+    _replace_cache_file(str path, str mode, function write):
+        writes a cache file through a temporary file.
+    _game_table_cache_key() -> dict:
+        returns the values a cache has to match to be up to date.
     _get_teams_file_data() -> list:
         returns list of all team data from TEAMS_FILE.
     """
+    _game_table = None #shared GameTable, built by the first get_game_table() call
+    _team_index = None #shared TeamIndex, built by the first get_team_index() call
+
     @staticmethod
     def _get_teams_file_data():
         """
@@ -67,27 +183,92 @@ class DataHandler:
         """
         return list(csv.DictReader(open(TEAMS_FILE)))
 
+    @staticmethod
+    def get_team_index():
+        """
+        Returns the TeamIndex of the teams data file shared by every caller. The
+        file is only read the first time this is called.
+
+        :returns TeamIndex: returns the shared index of team names to dense ids.
+        """
+        if DataHandler._team_index is None:
+            DataHandler._team_index = TeamIndex.from_teams_file_data(
+                DataHandler._get_teams_file_data())
+        return DataHandler._team_index
+
     @staticmethod
     def get_teams():
         """
-        Creates an NFLTeam object for each unique team_id in list returned by
-        _get_teams_file_data() to hold team information. Returns a dictionary mapping
-        each team_name to the NFLTeam created by it's team_id. I.E. both 'Arizona
-        Cardinals' and 'Phoenix Cardinals' will have the same NFLTeam created with
-        'ARI'.
+        Creates an NFLTeam object for each unique team_id in the TeamIndex to
+        hold team information. Returns a dictionary mapping each team_name to
+        the NFLTeam created by it's team_id. I.E. both 'Arizona Cardinals' and
+        'Phoenix Cardinals' will have the same NFLTeam created with 'ARI'. The
+        NFLTeams are views of one LeagueState, in dense id order.
 
         :returns dict:  returns dictionary of 'team_name' keys to NFLTeam objects.
         """
-        data = DataHandler._get_teams_file_data()
-        teams = {}
-        id_to_team = {}
-        for entry in data:
-            if entry['team_id'] in id_to_team:
-                teams[entry['team_name']] = id_to_team[entry['team_id']]
-            else:
-                id_to_team[entry['team_id']] = NFLTeam(entry['team_id'])
-                teams[entry['team_name']] = id_to_team[entry['team_id']]
-        return teams
+        index = DataHandler.get_team_index()
+        league = LeagueState(index.team_ids)
+        return {name: league.teams[idx] for name, idx in index.aliases.items()}
+
+    @staticmethod
+    def iter_games():
+        """
+        Generator over the played games of the games data file. Rows are parsed
+        one at a time as they are read, so memory use doesn't grow with the size
+        of the file. Stops at the first unplayed game, see _iter_game_rows().
+
+        Game(
+             date: str YYYY-MM-DD
+             season: int year
+             week: str week num, or playoff round name
+             playoff: bool true if game was a playoff game
+             home: team_name for home team
+             away: team_name for away team
+             score_home: int score for home team
+             score_away: int score for away team
+             neutral: bool true if neither team has a home team advantage
+        )
+
+        :returns iterator: yields a Game for each played game, in file order.
+        """
+        for row in DataHandler._iter_game_rows():
+            yield Game(DataHandler._format_date(row['schedule_date']),
+                       int(row['schedule_season']), row['schedule_week'],
+                       row['schedule_playoff'] == 'TRUE', row['team_home'],
+                       row['team_away'], int(row['score_home']), int(row['score_away']),
+                       row['stadium_neutral'] == 'TRUE')
+
+    @staticmethod
+    def iter_schedule():
+        """
+        Generator over the not-yet played games at the end of the games data
+        file, i.e. the rows iter_games() stops at. Same layout as iter_games()
+        except score_home and score_away are None.
+
+        :returns iterator: yields a Game for each unplayed game, in file order.
+        """
+        for row in DataHandler._iter_game_rows(played=False):
+            yield Game(DataHandler._format_date(row['schedule_date']),
+                       int(row['schedule_season']), row['schedule_week'],
+                       row['schedule_playoff'] == 'TRUE', row['team_home'],
+                       row['team_away'], None, None, row['stadium_neutral'] == 'TRUE')
+
+    @staticmethod
+    def get_divisions():
+        """
+        Gets the division each team plays in from the teams data file. Only the
+        team_name of a team's current name has its division filled in, e.g.
+        'Arizona Cardinals' but not 'Phoenix Cardinals'.
+
+        :returns dict: returns dict of team_id keys to division strings
+                       (e.g. 'NFC West'). Teams without a division are left out.
+        """
+        divisions = {}
+        for entry in DataHandler._get_teams_file_data():
+            if entry['team_division'] and entry['team_id'] not in divisions:
+                divisions[entry['team_id']] = entry['team_division']
+        return divisions
 
     @staticmethod
     def get_games_file_data():
@@ -117,21 +298,540 @@ class DataHandler:
 
         :returns list: returns list of team data.
         """
-        data = list(csv.DictReader(open(GAMES_FILE)))
-        data = data[:12947] #trim not-yet played games from data
+        data = list(DataHandler._iter_game_rows()) #not-yet played games are trimmed
 
         #cast number strings to ints
         data = DataHandler._format_games(data)
         return data
+
+    @staticmethod
+    def _iter_game_rows(played=True):
+        """
+        Internal generator over the raw rows of the games data file. The file
+        lists the upcoming schedule after the played games, so the first row
+        without a score splits the played games from the schedule.
+
+        :param played: bool, true to yield the rows before the first row without
+                       a score, false to yield that row and every row after it.
+
+        :returns iterator: yields a dict of column name to string for each row.
+        """
+        with open(GAMES_FILE, newline='') as file:
+            rows = csv.DictReader(file)
+            for row in rows:
+                if row['score_home'] == '' or row['score_away'] == '':
+                    if not played:
+                        yield row
+                        yield from rows
+                    return
+                if played:
+                    yield row
+
     @staticmethod
     def _format_games(data):
         for game in data:
             game['score_home'], game['score_away'] = \
                 int(game['score_home']), int(game['score_away'])
-            date = game['schedule_date'].split('/')
-            if len(date[0]) == 1:
-                date[0] = '0' + date[0]
-            if len(date[1]) == 1:
-                date[1] = '0' + date[1]
-            game['schedule_date'] = date[2]+ '-' + date[0] + '-' + date[1]
+            game['schedule_date'] = DataHandler._format_date(game['schedule_date'])
         return data
+
+    @staticmethod
+    def _format_date(date):
+        """
+        Internal function that converts a date from the games data file to ISO
+        format.
+
+        :param date: string date as M/D/YYYY.
+
+        :returns str: returns the date as YYYY-MM-DD.
+        """
+        month, day, year = date.split('/')
+        return year + '-' + month.zfill(2) + '-' + day.zfill(2)
+
+    @staticmethod
+    def get_game_table():
+        """
+        Returns the GameTable shared by every evaluator. The data files are only
+        read the first time this is called, later calls return the same object.
+
+        :returns GameTable: returns the shared, read-only table of played games.
+        """
+        if DataHandler._game_table is None:
+            DataHandler._game_table = DataHandler._build_game_table()
+        return DataHandler._game_table
+
+    @staticmethod
+    def set_game_table(table):
+        """
+        Replaces the shared GameTable returned by get_game_table(), e.g. with a
+        larger synthetic table for benchmarking. Passing None drops the shared
+        table so the next get_game_table() call builds it from the data files.
+
+        :param table: GameTable to share, or None.
+        """
+        DataHandler._game_table = table
+
+    @staticmethod
+    def set_data_files(games_file=DEFAULT_GAMES_FILE, teams_file=DEFAULT_TEAMS_FILE):
+        """
+        Points the DataHandler at another games and teams file with the same
+        layout, e.g. a league written by synthetic_league. The games cache moves
+        next to the new games file and the shared GameTable is dropped so it is
+        rebuilt from the new files. Call with no arguments to go back to the
+        files in the data folder.
+
+        :param games_file: string path of the games csv file.
+        :param teams_file: string path of the teams csv file.
+        """
+        # pylint: disable-next=global-statement
+        global GAMES_FILE, TEAMS_FILE, GAMES_CACHE_FILE, GAMES_CACHE_META_FILE
+        GAMES_FILE, TEAMS_FILE = games_file, teams_file
+        GAMES_CACHE_FILE = os.path.splitext(games_file)[0] + '.npy'
+        GAMES_CACHE_META_FILE = GAMES_CACHE_FILE + '.json'
+        DataHandler._team_index = None
+        DataHandler.set_game_table(None)
+
+    @staticmethod
+    def _build_game_table():
+        """
+        Internal function that loads the GameTable from the cache files, or
+        parses the data files and writes the cache if the cache is missing or
+        out of date.
+
+        :returns GameTable: returns a new table built from the data files.
+        """
+        table = DataHandler._load_game_table_cache()
+        if table is None:
+            table = DataHandler._parse_game_table()
+            DataHandler._save_game_table_cache(table)
+        return table
+
+    @staticmethod
+    def _parse_game_table():
+        """
+        Internal function that reads the teams and games data files and converts
+        every played game into a GameTable. The games are streamed from
+        iter_games() into compact typed arrays, so no list of rows is built.
+
+        :returns GameTable: returns a new table built from the data files.
+        """
+        index = DataHandler.get_team_index()
+        name_to_idx = index.aliases
+
+        raw = {'home': array('h'), 'away': array('h'), 'score_home': array('h'),
+               'score_away': array('h'), 'season': array('h'), 'playoff': array('b'),
+               'neutral': array('b'), 'date': array('q')}
+        for game in DataHandler.iter_games():
+            raw['home'].append(name_to_idx[game.home])
+            raw['away'].append(name_to_idx[game.away])
+            raw['score_home'].append(game.score_home)
+            raw['score_away'].append(game.score_away)
+            raw['season'].append(game.season)
+            raw['playoff'].append(game.playoff)
+            raw['neutral'].append(game.neutral)
+            raw['date'].append(datetime.date.fromisoformat(game.date).toordinal()
+                               - EPOCH_ORDINAL)
+
+        columns = {name: np.array(column) for name, column in raw.items()}
+        score_home, score_away = columns['score_home'], columns['score_away']
+        columns['result'] = np.where(score_home > score_away, HOME_WIN,
+                                     np.where(score_home < score_away, HOME_LOSS,
+                                              HOME_DRAW)).astype(np.int8)
+        columns['playoff'] = columns['playoff'].astype(bool)
+        columns['neutral'] = columns['neutral'].astype(bool)
+        columns['date'] = columns['date'].astype('datetime64[D]')
+        return GameTable(columns, index.team_ids, name_to_idx)
+
+    @staticmethod
+    def _load_game_table_cache():
+        """
+        Internal function that loads the GameTable saved by
+        _save_game_table_cache(). The games are memory mapped read-only, so the
+        load is nearly free and processes using the same cache share its pages.
+
+        :returns GameTable: returns the cached table, or None if there is no cache
+                            or it doesn't match the current data files.
+        """
+        try:
+            with open(GAMES_CACHE_META_FILE) as file:
+                meta = json.load(file)
+            if meta['key'] != DataHandler._game_table_cache_key():
+                return None
+            games = np.load(GAMES_CACHE_FILE, mmap_mode='r')
+        except (OSError, ValueError, KeyError):
+            return None
+        if len(games) != meta['n_games']:
+            return None
+        columns = {name: np.asarray(games[name]) for name in GameTable.COLUMNS}
+        return GameTable(columns, meta['team_ids'], meta['name_to_idx'])
+
+    @staticmethod
+    def _save_game_table_cache(table):
+        """
+        Internal function that writes table to GAMES_CACHE_FILE as a single
+        structured array, plus GAMES_CACHE_META_FILE holding the teams and the
+        cache key. Each is written to its own temporary file in the data folder and
+        then moved into place. The games go first and the meta file is only
+        written once they are in place, so the meta file never describes a half
+        written or stale array. If the data folder can't be written to, no cache
+        is saved.
+
+        :param table: GameTable to save.
+        """
+        dtype = np.dtype([(name, getattr(table, name).dtype) for name in GameTable.COLUMNS])
+        games = np.empty(len(table), dtype=dtype)
+        for name in GameTable.COLUMNS:
+            games[name] = getattr(table, name)
+        meta = {'key': DataHandler._game_table_cache_key(), 'n_games': len(table),
+                'team_ids': table.team_ids, 'name_to_idx': table.name_to_idx}
+        try:
+            #an old meta file must not outlive the games it described
+            if os.path.exists(GAMES_CACHE_META_FILE):
+                os.remove(GAMES_CACHE_META_FILE)
+            DataHandler._replace_cache_file(GAMES_CACHE_FILE, 'wb',
+                                            lambda file: np.save(file, games))
+            DataHandler._replace_cache_file(GAMES_CACHE_META_FILE, 'w',
+                                            lambda file: json.dump(meta, file))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _replace_cache_file(path, mode, write):
+        """
+        Internal function that writes a cache file through a uniquely named
+        temporary file next to it, so concurrent saves don't write over each
+        other, and then moves it to path. The temporary file is removed if the
+        write fails.
+
+        :param path: string path of the cache file.
+        :param mode: string mode to open the temporary file with, 'w' or 'wb'.
+        :param write: function(file) writing the contents.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, mode) as file:
+                write(file)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _game_table_cache_key():
+        """
+        Internal function that returns what a cache must have been saved with to
+        still be valid: the cache version and the modification time and size of
+        both data files.
+
+        :returns dict: returns the cache key.
+        """
+        key = {'version': GAMES_CACHE_VERSION}
+        for path in (GAMES_FILE, TEAMS_FILE):
+            stat = os.stat(path)
+            key[path] = [stat.st_mtime_ns, stat.st_size]
+        return key
+
+class TeamIndex:
+    """
+    TeamIndex maps every name a franchise has played under to one dense integer
+    id, e.g. 'Arizona Cardinals', 'Phoenix Cardinals' and 'St. Louis Cardinals'
+    all to the id of ARI. It is built once when the data is loaded, so the
+    string hashing of team names happens there and the game loops only index
+    by id. The ids are the order each team_id first appears in the teams data
+    file.
+
+    Usage
+    -----
+    Get the shared index with DataHandler.get_team_index(), or the index of a
+    GameTable's teams with table.team_index.
+
+    Attributes
+    ----------
+    team_ids : list
+        team_id string for each dense id.
+    aliases : dict
+        maps every team_name to the dense id of its team_id.
+
+    Methods
+    -------
+    id_of(str name) -> int:
+        returns the dense id of a team_name or team_id.
+    ids_of(list names) -> np.ndarray:
+        returns the dense ids of several team_names or team_ids.
+    from_teams_file_data(list data) -> TeamIndex:
+        builds the index from the rows of the teams data file.
+    """
+    def __init__(self, team_ids, aliases):
+        """
+        Constructor
+
+        :param team_ids: list of team_id strings, one for each dense id.
+        :param aliases: dict of team_name keys to dense ids.
+        """
+        self.team_ids = team_ids
+        self.aliases = aliases
+        self._ids = {team_id: idx for idx, team_id in enumerate(team_ids)}
+
+    def __len__(self):
+        return len(self.team_ids)
+
+    def __contains__(self, name):
+        return name in self.aliases or name in self._ids
+
+    def id_of(self, name):
+        """
+        Looks up the dense id of a team.
+
+        :param name: string team_name (any alias) or team_id.
+
+        :raises KeyError: if name is neither a team_name nor a team_id.
+
+        :returns int: returns the dense id.
+        """
+        if name in self.aliases:
+            return self.aliases[name]
+        if name in self._ids:
+            return self._ids[name]
+        raise KeyError(f"unknown team {name!r}")
+
+    def ids_of(self, names):
+        """
+        Looks up the dense ids of several teams at once.
+
+        :param names: iterable of team_names or team_ids.
+
+        :raises KeyError: if a name is neither a team_name nor a team_id.
+
+        :returns np.ndarray: returns int16 array of dense ids, the GameTable
+                             home and away dtype.
+        """
+        return np.array([self.id_of(name) for name in names], dtype=np.int16)
+
+    @staticmethod
+    def from_teams_file_data(data):
+        """
+        Builds the index from rows of the teams data file, see
+        DataHandler._get_teams_file_data().
+
+        :param data: list of dicts with 'team_name' and 'team_id'.
+
+        :returns TeamIndex: returns the new index.
+        """
+        team_ids = []
+        ids = {}
+        aliases = {}
+        for entry in data:
+            if entry['team_id'] not in ids:
+                ids[entry['team_id']] = len(team_ids)
+                team_ids.append(entry['team_id'])
+            aliases[entry['team_name']] = ids[entry['team_id']]
+        return TeamIndex(team_ids, aliases)
+
+class GameTable:
+    """
+    GameTable stores every played game as typed numpy columns so the games only
+    have to be parsed once. Teams are stored as dense indexes into team_ids, so
+    team_ids[home[i]] is the team_id of the home team in game i. All the columns
+    are read-only because a single table is shared between every evaluator.
+
+    Usage
+    -----
+    Get the shared table with DataHandler.get_game_table() instead of creating
+    one directly. Index the columns with the game number, e.g. table.season[i].
+
+    Attributes
+    ----------
+    team_ids : list
+        team_id string for each dense team index.
+    name_to_idx : dict
+        maps every team_name to the dense index of its team_id.
+    team_index : TeamIndex
+        index over team_ids and name_to_idx, to look up teams by any name.
+    home : np.ndarray[int16]
+        dense team index of the home team.
+    away : np.ndarray[int16]
+        dense team index of the away team.
+    score_home : np.ndarray[int16]
+        home team's score.
+    score_away : np.ndarray[int16]
+        away team's score.
+    result : np.ndarray[int8]
+        HOME_WIN, HOME_LOSS or HOME_DRAW from elo_calculator for the game.
+    season : np.ndarray[int16]
+        season the game was played in.
+    playoff : np.ndarray[bool]
+        true if the game was a playoff game.
+    neutral : np.ndarray[bool]
+        true if the game was played at a neutral stadium.
+    date : np.ndarray[datetime64[D]]
+        date the game was played.
+
+    Methods
+    -------
+    new_teams() -> list[dict, LeagueState]:
+        returns fresh NFLTeam objects keyed by team_name and their LeagueState.
+    season_starts() -> dict:
+        returns the index of the first game of each season.
+    digest() -> str:
+        returns a sha256 hash of the table's data.
+    to_shared_memory() -> list[SharedMemory, dict]:
+        publishes the columns in a shared memory block for other processes.
+    from_shared_memory(dict spec) -> list[SharedMemory, GameTable]:
+        attaches to a table published by to_shared_memory().
+    worker_pool(int workers) -> ProcessPoolExecutor:
+        context manager of a process pool whose workers share the table.
+    """
+    COLUMNS = ('home', 'away', 'score_home', 'score_away', 'result', 'season',
+               'playoff', 'neutral', 'date')
+
+    def __init__(self, columns, team_ids, name_to_idx):
+        """
+        Constructor
+
+        :param columns: dict of every name in GameTable.COLUMNS to its np.ndarray.
+        :param team_ids: list of team_id strings, one for each dense team index.
+        :param name_to_idx: dict of team_name keys to dense team indexes.
+        """
+        self.team_ids = team_ids
+        self.name_to_idx = name_to_idx
+        self.team_index = TeamIndex(team_ids, name_to_idx)
+        self._digest = None
+        for name in GameTable.COLUMNS:
+            column = columns[name]
+            column.flags.writeable = False
+            setattr(self, name, column)
+
+    def __len__(self):
+        return len(self.home)
+
+    def season_starts(self):
+        """
+        Finds where each season begins. The games are in date order, so every
+        season is one contiguous block of the table.
+
+        :returns dict: returns dict of season keys to the index of the season's
+                       first game, in season order.
+        """
+        if len(self) == 0:
+            return {}
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(self.season)) + 1))
+        return {int(self.season[idx]): int(idx) for idx in starts}
+
+    def digest(self):
+        """
+        Hash of the games and teams in the table, used to tell if results saved
+        from an earlier run (e.g. a fitness cache) were made with the same data.
+
+        :returns str: returns the sha256 hex digest of the table.
+        """
+        if self._digest is None:
+            sha = hashlib.sha256(repr([self.team_ids, sorted(self.name_to_idx.items())]).encode())
+            for name in GameTable.COLUMNS:
+                sha.update(name.encode())
+                sha.update(np.ascontiguousarray(getattr(self, name)).tobytes())
+            self._digest = sha.hexdigest()
+        return self._digest
+
+    def to_shared_memory(self):
+        """
+        Copies every column into a single block of shared memory so that worker
+        processes can attach to the table instead of having it pickled to them.
+        The caller owns the block and has to close() and unlink() it when done.
+
+        :returns list: returns list of 2 items. First is the SharedMemory block,
+                       second is the spec dict to pass to from_shared_memory().
+        """
+        size = sum(getattr(self, name).nbytes for name in GameTable.COLUMNS)
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        layout = []
+        offset = 0
+        for name in GameTable.COLUMNS:
+            column = getattr(self, name)
+            view = np.ndarray(column.shape, column.dtype, buffer=shm.buf, offset=offset)
+            view[:] = column
+            layout.append((name, column.dtype.str, column.shape, offset))
+            offset += column.nbytes
+        spec = {'name': shm.name, 'layout': layout, 'team_ids': self.team_ids,
+                'name_to_idx': self.name_to_idx}
+        return [shm, spec]
+
+    @staticmethod
+    def from_shared_memory(spec):
+        """
+        Attaches to a table published with to_shared_memory(). The columns are
+        views into the shared block, so the block has to be kept open for as
+        long as the table is used.
+
+        :param spec: dict returned by to_shared_memory().
+
+        :returns list: returns list of 2 items. First is the SharedMemory block,
+                       second is the GameTable viewing it.
+        """
+        shm = shared_memory.SharedMemory(name=spec['name'])
+        columns = {name: np.ndarray(shape, np.dtype(dtype), buffer=shm.buf, offset=offset)
+                   for name, dtype, shape, offset in spec['layout']}
+        return [shm, GameTable(columns, spec['team_ids'], spec['name_to_idx'])]
+
+    def new_teams(self):
+        """
+        Creates a fresh LeagueState with an NFLTeam view for each team_id in the
+        table without reading the teams data file again.
+
+        :returns list: returns list of 2 items. First is a dict of 'team_name' keys
+                       to NFLTeam objects (same layout as DataHandler.get_teams()),
+                       second is the LeagueState, indexed by dense team index.
+        """
+        league = LeagueState(self.team_ids)
+        teams = {name: league.teams[idx] for name, idx in self.name_to_idx.items()}
+        return [teams, league]
+
+    @contextmanager
+    def worker_pool(self, workers):
+        """
+        Context manager that publishes the table with to_shared_memory() and
+        starts a process pool whose workers attach to it once on startup. The
+        functions run on the pool get the table with worker_table(). On exit
+        the pool is shut down and the shared block is freed.
+
+        :param workers: int number of worker processes.
+
+        :returns ProcessPoolExecutor: yields the pool.
+        """
+        shm, spec = self.to_shared_memory()
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_pool_worker,
+                                     initargs=(spec,)) as executor:
+                yield executor
+        finally:
+            shm.close()
+            shm.unlink()
+
+    @property
+    def n_teams(self):
+        """
+        Number of unique teams (team_ids) in the table.
+        """
+        return len(self.team_ids)
+
+def worker_table():
+    """
+    Returns the table a GameTable.worker_pool() worker attached to.
+
+    :raises RuntimeError: if called outside of a worker_pool() worker.
+
+    :returns GameTable: returns the shared table.
+    """
+    if _worker_table is None:
+        raise RuntimeError("worker_table() is only available in a GameTable.worker_pool() worker")
+    return _worker_table
+
+def _init_pool_worker(spec):
+    """
+    Pool worker initializer of GameTable.worker_pool() that attaches to the
+    shared table. The block stays attached until the worker exits.
+
+    :param spec: spec dict from GameTable.to_shared_memory().
+    """
+    global _worker_table, _worker_shm # pylint: disable=global-statement
+    _worker_shm, _worker_table = GameTable.from_shared_memory(spec)
@@ -9,15 +9,35 @@ Classes:
             static expanded_expected(int, int, int, int) -> float
             static basic_elo_change(int, int, int) -> dict
             static basic_expected(int, int) -> float
+            static expanded_elo_changes(np.ndarray, np.ndarray, np.ndarray, ...) -> tuple
+            static expanded_expected_array(np.ndarray, np.ndarray, ...) -> np.ndarray
+            static basic_elo_changes(np.ndarray, np.ndarray, np.ndarray) -> tuple
+            static basic_expected_array(np.ndarray, np.ndarray) -> np.ndarray
+            static result_scores(np.ndarray) -> np.ndarray
+            static elo_changes(num, num, num, num) -> tuple
+            static mov_multiplier(int, num, num) -> float
+            static mov_multiplier_array(np.ndarray, np.ndarray, np.ndarray) -> np.ndarray
 
 Global Variables:
     HOME_WIN - int used to indicate the home team won a game.
     HOME_LOSS - int used to indicate the home team lost a game.
     HOME_DRAW - int used to indicate the home team drew a game.
+    RESULT_SCORES - tuple of the home team's score for each result, indexed by
+                    HOME_WIN, HOME_LOSS and HOME_DRAW.
+    MOV_BASE - float base of the margin of victory multiplier, FiveThirtyEight's 2.2.
+    MOV_ELO - float weight of the winner's elo lead (including hfa) in the margin
+              of victory multiplier, per rating_factor. FiveThirtyEight's .001 per
+              elo point at the standard rating factor of 400.
 """
+import math
+import numpy as np
+
 HOME_WIN = 0 #0 for when home team wins
 HOME_LOSS = 1 #1 for when home team loses
 HOME_DRAW = 2 #2 for when the game is a draw
+RESULT_SCORES = (1.0, 0.0, 0.5) #home team's score, indexed by the result ints above
+MOV_BASE = 2.2
+MOV_ELO = .4
 
 class EloCalculator:
     """
@@ -58,10 +78,23 @@ class EloCalculator:
         Calculates elo using standard elo factors to determine the expected winner.
         Returns a dictionary with 'Home Change' and 'Away Change' as keys with
         the values being the amount each team's elos will change.
+
+    Each function also has an array version (expanded_elo_changes,
+    expanded_expected_array, basic_elo_changes and basic_expected_array) that
+    takes numpy arrays, e.g. one row per game or per set of weights, and
+    returns arrays. The elo changes are returned as a (home, away) tuple of
+    arrays instead of a dict. Both versions share elo_changes(), so they give
+    the same results for the same inputs.
+
+    The expanded elo change can also scale k by a margin of victory multiplier
+    (mov_multiplier), FiveThirtyEight style: a bigger win moves the elos more,
+    but less so when the winner was already the favourite, which corrects for
+    favourites winning by more (autocorrelation).
     """
 
     @staticmethod
-    def expanded_elo_change(home_elo, away_elo, result, k, rating_factor, hfa, playoff_bonus):
+    def expanded_elo_change(home_elo, away_elo, result, k, rating_factor, hfa, playoff_bonus,\
+                            margin=None):
         """
         Expanded_elo_change is the function for calculating elo using additional
         factors for the expected winner to find a model that accurately ranks
@@ -78,6 +111,8 @@ class EloCalculator:
                         in the expected winner function.
         :param playoff_bonus: int representing multiplier that's applied to the
                               elo changes if the game is a post-season game.
+        :param margin: int home score minus away score. If given, k is also
+                       scaled by mov_multiplier(). Defaults to None.
 
         :return dict: returns dictionary with the amount of elo change for both
                       teams. Keys are 'Home Change' for the home team and 'Away Change'
@@ -86,16 +121,12 @@ class EloCalculator:
         home_expected = EloCalculator.expanded_expected(home_elo, away_elo, rating_factor, hfa)
         away_expected = EloCalculator.expanded_expected(away_elo, home_elo, rating_factor, 1-hfa)
 
-        if result == HOME_DRAW:
-            home_change = k * playoff_bonus * (0.5 - home_expected)
-            away_change = k * playoff_bonus * (0.5 - away_expected)
-        elif result == HOME_WIN:
-            home_change = k * playoff_bonus * (1 - home_expected)
-            away_change = k * playoff_bonus * (0 - away_expected)
-        else: #HOME_LOSS
-            home_change = k * playoff_bonus * (0 - home_expected)
-            away_change = k * playoff_bonus * (1 - away_expected)
-
+        k_game = k * playoff_bonus
+        if margin is not None:
+            k_game = k_game * EloCalculator.mov_multiplier(margin, home_elo + hfa - away_elo,\
+                                                           rating_factor)
+        home_change, away_change = EloCalculator.elo_changes(home_expected, away_expected,\
+                                       RESULT_SCORES[result], k_game)
         return {'Home Change': home_change, 'Away Change': away_change}
 
     @staticmethod
@@ -114,7 +145,12 @@ class EloCalculator:
                      win.
         """
         exp = (t2_elo - (t1_elo + hfa)) / rating_factor
-        base = 1 + 10 ** exp
+        try:
+            base = 1 + 10 ** exp
+        except OverflowError:
+            #python floats raise where numpy gives inf, and 1 / inf is a certain
+            #loss, the same as expanded_expected_array and the compiled kernel
+            return 0.0
         return 1 / base
 
     @staticmethod
@@ -137,16 +173,8 @@ class EloCalculator:
         home_expected = EloCalculator.basic_expected(home_elo, away_elo)
         away_expected = 1 - home_expected
 
-        if result == HOME_DRAW:
-            home_change = k * (0.5 - home_expected)
-            away_change = k * (0.5 - away_expected)
-        elif result == HOME_WIN:
-            home_change = k * (1 - home_expected)
-            away_change = k * (0 - away_expected)
-        else: #HOME_LOSS
-            home_change = k * (0 - home_expected)
-            away_change = k * (1 - away_expected)
-
+        home_change, away_change = EloCalculator.elo_changes(home_expected, away_expected,\
+                                       RESULT_SCORES[result], k)
         return {'Home Change': home_change, 'Away Change': away_change}
 
     @staticmethod
@@ -164,3 +192,172 @@ class EloCalculator:
         exp = (t2_elo - t1_elo) / rating_factor
         base = 1 + 10 ** exp
         return 1 / base
+
+    @staticmethod
+    def expanded_elo_changes(home_elos, away_elos, results, k, rating_factor, hfa,\
+                             playoff_bonus, margins=None):
+        """
+        Array version of expanded_elo_change. Every argument can be a numpy array
+        (one value per row) or a single value used for every row, so a batch of
+        games, or one game for a batch of weights, is calculated in one call.
+
+        :param home_elos: np.ndarray of the home teams' elos.
+        :param away_elos: np.ndarray of the away teams' elos.
+        :param results: np.ndarray of HOME_WIN, HOME_LOSS or HOME_DRAW ints.
+        :param k: np.ndarray of k-factors.
+        :param rating_factor: np.ndarray of rating factors.
+        :param hfa: np.ndarray of home field advantages, 0 for neutral games.
+        :param playoff_bonus: np.ndarray of multipliers applied to the changes.
+        :param margins: np.ndarray of home scores minus away scores. If given, k
+                        is also scaled by mov_multiplier_array(). Defaults to None.
+
+        :return tuple: returns (home changes, away changes) np.ndarrays.
+        """
+        hfa = np.asarray(hfa)
+        home_expected = EloCalculator.expanded_expected_array(home_elos, away_elos,\
+                                                              rating_factor, hfa)
+        away_expected = EloCalculator.expanded_expected_array(away_elos, home_elos,\
+                                                              rating_factor, 1-hfa)
+        k_game = np.multiply(k, playoff_bonus)
+        if margins is not None:
+            elo_diffs = np.add(home_elos, hfa) - away_elos
+            k_game = k_game * EloCalculator.mov_multiplier_array(margins, elo_diffs, rating_factor)
+        return EloCalculator.elo_changes(home_expected, away_expected,\
+                                         EloCalculator.result_scores(results), k_game)
+
+    @staticmethod
+    def expanded_expected_array(t1_elos, t2_elos, rating_factor, hfa):
+        """
+        Array version of expanded_expected. np.float_power is used instead of **
+        because it gives bit for bit the same result as python's float pow,
+        while np.power can be off in the last place and the difference
+        compounds over a replay.
+
+        :param t1_elos: np.ndarray of team 1's elos (usually home team).
+        :param t2_elos: np.ndarray of team 2's elos (usually away team).
+        :param rating_factor: np.ndarray of rating factors.
+        :param hfa: np.ndarray of home field advantages.
+
+        :return np.ndarray: returns team 1's expected win percentage for each row.
+        """
+        exp = (np.subtract(t2_elos, np.add(t1_elos, hfa))) / rating_factor
+        base = 1 + np.float_power(10, exp)
+        return 1 / base
+
+    @staticmethod
+    def basic_elo_changes(home_elos, away_elos, results):
+        """
+        Array version of basic_elo_change.
+
+        :param home_elos: np.ndarray of the home teams' elos.
+        :param away_elos: np.ndarray of the away teams' elos.
+        :param results: np.ndarray of HOME_WIN, HOME_LOSS or HOME_DRAW ints.
+
+        :return tuple: returns (home changes, away changes) np.ndarrays.
+        """
+        k = 32 #standard value used to determine max elo change
+        home_expected = EloCalculator.basic_expected_array(home_elos, away_elos)
+        away_expected = 1 - home_expected
+        return EloCalculator.elo_changes(home_expected, away_expected,\
+                                         EloCalculator.result_scores(results), k)
+
+    @staticmethod
+    def basic_expected_array(t1_elos, t2_elos):
+        """
+        Array version of basic_expected.
+
+        :param t1_elos: np.ndarray of team 1's elos (usually home team).
+        :param t2_elos: np.ndarray of team 2's elos (usually away team).
+
+        :return np.ndarray: returns team 1's expected win percentage for each row.
+        """
+        rating_factor = 400 #standard rating factor
+        exp = np.subtract(t2_elos, t1_elos) / rating_factor
+        base = 1 + np.float_power(10, exp)
+        return 1 / base
+
+    @staticmethod
+    def result_scores(results):
+        """
+        Converts result ints to the home team's score: 1 for a win, 0 for a loss
+        and .5 for a draw. The away team's score is 1 minus the home score.
+
+        :param results: np.ndarray of HOME_WIN, HOME_LOSS or HOME_DRAW ints.
+
+        :return np.ndarray: returns float array of home scores.
+        """
+        return np.asarray(RESULT_SCORES)[results]
+
+    @staticmethod
+    def elo_changes(home_expected, away_expected, home_score, k):
+        """
+        Elo change of both teams given their expected win percentages and the
+        home team's score. Shared by the scalar and array functions, works on
+        plain numbers and numpy arrays alike.
+
+        :param home_expected: num or np.ndarray of the home team's expected score.
+        :param away_expected: num or np.ndarray of the away team's expected score.
+        :param home_score: num or np.ndarray of the home team's actual score.
+        :param k: num or np.ndarray of the k-factor, including any multipliers.
+
+        :return tuple: returns (home change, away change).
+        """
+        return k * (home_score - home_expected), k * ((1 - home_score) - away_expected)
+
+    @staticmethod
+    def mov_multiplier(margin, elo_diff, rating_factor):
+        """
+        Margin of victory multiplier of the k-factor, FiveThirtyEight's
+        ln(|margin| + 1) * 2.2 / (winner's elo lead * .001 + 2.2). The log means
+        each extra point of margin counts for less, and dividing by the winner's
+        elo lead shrinks the changes from favourites winning big, which would
+        otherwise keep inflating the elos of strong teams. A draw counts as a
+        margin of 1 with no lead. The lead is measured in rating factors, so
+        other rating factors than 400 scale the same way, and the divisor is
+        kept at least 1 so huge upsets can't blow the multiplier up.
+
+        :param margin: int home score minus away score.
+        :param elo_diff: num home elo plus home field advantage minus away elo.
+        :param rating_factor: num rating factor of the expected score.
+
+        :return float: returns the multiplier, about .7 for a 1 point win and 2
+                       for a 7 point win between even teams.
+        """
+        log_margin = math.log(max(abs(margin), 1) + 1)
+        if margin == 0:
+            return log_margin * MOV_BASE / 1.0
+        winner_diff = elo_diff if margin > 0 else -elo_diff
+        return log_margin * MOV_BASE / max(winner_diff / rating_factor * MOV_ELO + MOV_BASE, 1.0)
+
+    @staticmethod
+    def mov_multiplier_array(margins, elo_diffs, rating_factor):
+        """
+        Array version of mov_multiplier, e.g. one game's margin for a batch of
+        weights. The logs are taken with math.log rather than np.log so the
+        multipliers match mov_multiplier and elo_kernel bit for bit.
+
+        :param margins: int or np.ndarray of home scores minus away scores.
+        :param elo_diffs: np.ndarray of home elos plus home field advantage
+                          minus away elos.
+        :param rating_factor: np.ndarray of rating factors.
+
+        :return np.ndarray: returns the multipliers.
+        """
+        if np.ndim(margins) == 0: #one game, the common case in a replay
+            if margins == 0:
+                return np.full(np.shape(elo_diffs), math.log(2) * MOV_BASE / 1.0)
+            #in place, this runs once per game of a batched replay
+            divisors = np.divide(elo_diffs if margins > 0 else np.negative(elo_diffs),\
+                                 rating_factor)
+            divisors *= MOV_ELO
+            divisors += MOV_BASE
+            np.maximum(divisors, 1.0, out=divisors)
+            return np.divide(math.log(abs(margins) + 1) * MOV_BASE, divisors, out=divisors)
+        margins = np.asarray(margins)
+        log_margins = np.array([math.log(margin + 1) for margin in\
+                                np.maximum(np.abs(margins), 1).ravel().tolist()])\
+                      .reshape(margins.shape)
+        winner_diffs = np.where(margins > 0, elo_diffs, np.negative(elo_diffs))
+        divisors = np.where(margins == 0, 1.0,\
+                            np.maximum(winner_diffs / rating_factor * MOV_ELO + MOV_BASE, 1.0))
+        return log_margins * MOV_BASE / divisors
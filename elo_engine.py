@@ -0,0 +1,585 @@
+"""
+The elo_engine module replays every game in a GameTable for a whole batch of
+expanded elo weights at the same time. Instead of walking the games once per
+set of weights like prediction_expanded_stats does, each game is applied to all
+sets of weights with one numpy operation, which is what makes evaluating a full
+genetic_alg population cheap.
+
+Usage
+-----
+Call batch_expanded_stats() with a list of entities (each entity being
+[k-factor, rating-factor, home field advantage, seasonal scaling, playoff
+multiplier, margin of victory], the same layout used by genetic_alg). A margin
+of victory of 1 scales each elo change by EloCalculator.mov_multiplier(), 0
+leaves it out. Entities of the first 5 values only leave it out too. The
+returned stats hold one
+'Right' and 'Wrong' count per entity in the same order as the input, and give
+the same counts prediction_expanded_stats would for each entity on its own.
+
+replay() is the underlying function. It runs from a ReplayState, so a replay
+can be stopped and resumed, and it can save a ReplayState at the start of every
+season. SeasonCheckpoints uses that to score any window of seasons without
+replaying, and to take in newly played games by only replaying the new ones.
+
+Every replay takes a backend from BACKENDS. 'numpy' loops over the games in
+python and updates all entities with numpy operations. 'numba' runs the
+compiled elo_kernel instead and falls back to 'numpy' if numba isn't installed.
+Both give identical results.
+
+Classes
+-------
+ReplayState:
+    elos, seasons and right prediction counts of a replay at one game index.
+SeasonCheckpoints:
+    replay of a set of entities with a ReplayState saved for every season.
+
+Methods
+-------
+batch_expanded_stats(list entities, GameTable table, str backend) ->
+                                                    list[dict, np.ndarray]:
+    replays all games for every entity at once and returns the right/wrong
+    prediction counts and the final elos of every team for every entity.
+replay(list entities, GameTable table, ReplayState state, int stop,
+       dict checkpoints, str backend, bool losses, np.ndarray probabilities)
+                                                            -> ReplayState:
+    replays the games from state up to stop and returns the new state.
+race(list entities, int keep, GameTable table, str backend, float z,
+     int min_games) -> list[np.ndarray, np.ndarray]:
+    replays season by season, dropping entities that can't make the top keep.
+_weights(list entities) -> np.ndarray:
+    returns the entities as a (n_entities x N_GENES) float array.
+_replay_games(np.ndarray weights, GameTable table, ReplayState state, int stop,
+              bool losses, np.ndarray probabilities):
+    inner loop of replay(), updates state in place.
+_replay_games_compiled(np.ndarray weights, GameTable table, ReplayState state,
+                       int stop, bool losses, np.ndarray probabilities):
+    same as _replay_games but runs the compiled elo_kernel.
+
+Global Variables
+----------------
+BACKENDS: names of the replay backends.
+N_GENES: number of values in an entity.
+RACE_Z: default number of standard errors an entity's running accuracy must be
+        below the cut-off before race() drops it.
+RACE_MIN_GAMES: default number of games race() replays before dropping any
+                entity.
+"""
+
+import numpy as np
+from data_handler import DataHandler
+from elo_calculator import EloCalculator as ec
+from elo_calculator import HOME_WIN, HOME_LOSS, RESULT_SCORES
+from elo_kernel import compiled_kernel, NO_SEASON, MIN_EXPECTED
+
+BACKENDS = ('numpy', 'numba')
+N_GENES = 6
+RACE_Z = 3.0
+RACE_MIN_GAMES = 1000
+
+class ReplayState:
+    """
+    ReplayState holds everything a replay needs to carry on from a game index:
+    the elo of every team for every entity, the last season each team played
+    in (used like NFLTeam.curr_season to scale elos on a new season), the
+    number of right predictions so far for every entity and the summed log
+    loss and Brier score of the home team's expected score for every entity.
+
+    Attributes
+    ----------
+    elos : np.ndarray
+        (n_teams x n_entities) elo matrix. Each team's row is contiguous so a
+        game only touches 2 rows.
+    curr_seasons : list
+        last season played by each team, None if the team hasn't played yet.
+    right : np.ndarray
+        int count of right predictions for each entity.
+    log_loss : np.ndarray
+        float sum of the log loss of every game for each entity.
+    brier : np.ndarray
+        float sum of the squared error of every game for each entity.
+    position : int
+        index of the next game to replay, also the number of games replayed.
+
+    Methods
+    -------
+    copy() -> ReplayState:
+        returns an independent copy of the state.
+    get_stats() -> dict:
+        returns dict of 'Right' and 'Wrong' count arrays.
+    get_losses() -> dict:
+        returns dict of 'Log Loss' and 'Brier' mean arrays.
+    select(np.ndarray keep) -> ReplayState:
+        returns a copy holding only the kept entities.
+    """
+    def __init__(self, n_teams, n_entities):
+        self.elos = np.full((n_teams, n_entities), 1200.0)
+        self.curr_seasons = [None] * n_teams
+        self.right = np.zeros(n_entities, dtype=np.int64)
+        self.log_loss = np.zeros(n_entities)
+        self.brier = np.zeros(n_entities)
+        self.position = 0
+
+    def copy(self):
+        """
+        Copies the state so that replaying from the copy leaves it unchanged.
+
+        :return ReplayState: returns the copy.
+        """
+        state = ReplayState.__new__(ReplayState)
+        state.elos = self.elos.copy()
+        state.curr_seasons = list(self.curr_seasons)
+        state.right = self.right.copy()
+        state.log_loss = self.log_loss.copy()
+        state.brier = self.brier.copy()
+        state.position = self.position
+        return state
+
+    def select(self, keep):
+        """
+        Copies the state for only some of its entities, e.g. to stop replaying
+        entities that can't catch up.
+
+        :param keep: bool mask or int indexes of the entities to keep.
+
+        :return ReplayState: returns the copy, with the kept entities in order.
+        """
+        state = ReplayState.__new__(ReplayState)
+        state.elos = self.elos[:, keep]
+        state.curr_seasons = list(self.curr_seasons)
+        state.right = self.right[keep]
+        state.log_loss = self.log_loss[keep]
+        state.brier = self.brier[keep]
+        state.position = self.position
+        return state
+
+    def get_stats(self):
+        """
+        Right/wrong prediction counts of the games replayed so far, in the same
+        layout as prediction_expanded_stats.
+
+        :return dict: returns dict with 'Right' and 'Wrong' int arrays holding one
+                      count per entity.
+        """
+        return {"Right": self.right.copy(), "Wrong": self.position - self.right}
+
+    def get_losses(self):
+        """
+        Mean log loss and Brier score of the home team's expected score over
+        the games replayed so far. A home win scores 1, a loss 0 and a draw .5.
+        Unlike the right/wrong counts both change smoothly with the weights.
+
+        :return dict: returns dict with 'Log Loss' and 'Brier' float arrays
+                      holding one mean per entity.
+        """
+        games = max(self.position, 1)
+        return {"Log Loss": self.log_loss / games, "Brier": self.brier / games}
+
+class SeasonCheckpoints:
+    """
+    SeasonCheckpoints replays a set of entities once and keeps the ReplayState
+    from the start of every season. Since the states hold the running right
+    prediction counts, the counts for any window of seasons are the difference
+    between two checkpoints and need no replaying. When more games are played,
+    update() only replays the new games.
+
+    Usage
+    -----
+    Constructor: SeasonCheckpoints(entities, table) replays table for the
+                 entities and saves the checkpoints. The default table is the
+                 shared DataHandler.get_game_table().
+
+    Attributes
+    ----------
+    entities : list
+        entities the checkpoints were replayed with.
+    table : GameTable
+        games the checkpoints were replayed from.
+    checkpoints : dict
+        season keys to the ReplayState before the season's first game.
+    state : ReplayState
+        state after the last game in table.
+
+    Methods
+    -------
+    window_stats(int first_season, int last_season) -> dict:
+        returns the right/wrong counts for the games in a range of seasons.
+    resume(int season, int stop) -> ReplayState:
+        returns the state at stop, replayed from the checkpoint of season.
+    update(GameTable table):
+        takes in a newer table, replaying only the games that were added.
+    """
+    def __init__(self, entities, table=None):
+        if table is None:
+            table = DataHandler.get_game_table()
+        self.entities = entities
+        self.table = table
+        self.checkpoints = {}
+        self.state = replay(entities, table, checkpoints=self.checkpoints)
+
+    def window_stats(self, first_season, last_season=None):
+        """
+        Right/wrong prediction counts for only the games from first_season up to
+        and including last_season. Elos still carry over from earlier seasons.
+
+        :param first_season: int first season of the window.
+        :param last_season: int last season of the window. The default is the
+                            last season in the table.
+
+        :return dict: returns dict with 'Right' and 'Wrong' int arrays holding one
+                      count per entity.
+        """
+        start = self._checkpoint(first_season)
+        #the window ends at the next season with games, which needn't be
+        #last_season + 1 if a season is missing from the table
+        later = [season for season in self.checkpoints if last_season is not None and\
+                 season > last_season]
+        end = self.checkpoints[min(later)] if later else self.state
+        right = end.right - start.right
+        return {"Right": right, "Wrong": (end.position - start.position) - right}
+
+    def resume(self, season, stop=None):
+        """
+        Replays from the checkpoint of season instead of from the first game.
+
+        :param season: int season to start from.
+        :param stop: int index to stop at. The default is the end of the table.
+
+        :return ReplayState: returns the state at stop.
+        """
+        return replay(self.entities, self.table, self._checkpoint(season), stop)
+
+    def update(self, table):
+        """
+        Moves the checkpoints to a newer version of the table. If the old games
+        are unchanged at the start of the new table, only the new games are
+        replayed. Otherwise everything is replayed from the start.
+
+        :param table: GameTable holding the old games plus any new ones.
+        """
+        n_games = len(self.table)
+        extends = table.team_ids[:self.table.n_teams] == self.table.team_ids and\
+                  len(table) >= n_games and\
+                  all(np.array_equal(getattr(table, name)[:n_games], getattr(self.table, name))\
+                      for name in table.COLUMNS)
+        if not extends:
+            self.table = table
+            self.checkpoints = {}
+            self.state = replay(self.entities, table, checkpoints=self.checkpoints)
+            return
+
+        state = self.state
+        if table.n_teams > self.table.n_teams: #new teams start at 1200
+            state = state.copy()
+            new_teams = table.n_teams - self.table.n_teams
+            state.elos = np.vstack((state.elos, np.full((new_teams, len(state.right)), 1200.0)))
+            state.curr_seasons += [None] * new_teams
+        self.table = table
+        self.state = replay(self.entities, table, state, checkpoints=self.checkpoints)
+
+    def _checkpoint(self, season):
+        """
+        Returns the checkpoint of season or raises KeyError if it isn't in the
+        table.
+        """
+        if season not in self.checkpoints:
+            raise KeyError(f"no checkpoint for season {season}")
+        return self.checkpoints[season]
+
+def batch_expanded_stats(entities, table=None, backend='numpy'):
+    """
+    Batched version of stat_eval.prediction_expanded_stats. Every game is
+    replayed once, with the elo changes for all entities calculated together
+    from a (n_teams x n_entities) elo matrix.
+
+    Parameters
+    ----------
+    entities : list
+        list of entities, each made up of values of [k-factor, rating-factor,
+        home field advantage, seasonal scaling, playoff multiplier, margin of
+        victory], see _weights().
+    table : GameTable, optional
+        games to replay. The default is the shared DataHandler.get_game_table().
+    backend : str, optional
+        replay backend from BACKENDS. The default is 'numpy'.
+
+    Returns
+    -------
+    list
+        returns list of 2 items. First is a dict of 'Right'ly predicted games and
+        'Wrong'ly predicted games, each an int array with one count per entity.
+        Second is the final elo matrix, indexed [team index, entity index].
+    """
+    state = replay(entities, table, backend=backend)
+    return [state.get_stats(), state.elos]
+
+def replay(entities, table=None, state=None, stop=None, checkpoints=None, backend='numpy',\
+           losses=False, probabilities=None):
+    """
+    Replays the games of table from state.position up to stop for every entity.
+    The given state isn't changed.
+
+    Parameters
+    ----------
+    entities : list
+        list of entities, each made up of values of [k-factor, rating-factor,
+        home field advantage, seasonal scaling, playoff multiplier, margin of
+        victory], see _weights().
+    table : GameTable, optional
+        games to replay. The default is the shared DataHandler.get_game_table().
+    state : ReplayState, optional
+        state to start from. The default is a new state before the first game.
+    stop : int, optional
+        index of the game to stop before. The default is the end of the table.
+    checkpoints : dict, optional
+        if given, a copy of the state before the first game of every season
+        that starts in the replayed range is saved in it under the season.
+    backend : str, optional
+        replay backend from BACKENDS. The default is 'numpy'.
+    losses : bool, optional
+        if true, the log loss and Brier score are summed into the state, see
+        ReplayState.get_losses(). They are skipped otherwise since they slow
+        the replay down. The default is False.
+    probabilities : np.ndarray, optional
+        if given, a (games x n_entities) float array that the home team's
+        expected score of every replayed game is written into, one row per
+        game starting from state.position. The default is None.
+
+    Raises
+    ------
+    ValueError
+        If backend isn't one of BACKENDS, or probabilities doesn't have a row
+        for every replayed game.
+
+    Returns
+    -------
+    ReplayState
+        state after the last replayed game.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend expected one of {BACKENDS} and received {backend!r}")
+    replay_games = _replay_games_compiled if backend == 'numba' and compiled_kernel\
+                   else _replay_games
+    if table is None:
+        table = DataHandler.get_game_table()
+    weights = _weights(entities)
+    state = ReplayState(table.n_teams, len(weights)) if state is None else state.copy()
+    stop = len(table) if stop is None else stop
+    first = state.position
+    if probabilities is not None and probabilities.shape != (max(stop - first, 0), len(weights)):
+        raise ValueError(f"probabilities expected shape {(max(stop - first, 0), len(weights))}"
+                         f" and received {probabilities.shape}")
+
+    def rows(end):
+        #view of the rows of the games from state.position to end
+        return None if probabilities is None else probabilities[state.position - first:end - first]
+
+    if checkpoints is None:
+        replay_games(weights, table, state, stop, losses, rows(stop))
+        return state
+
+    for season, start in table.season_starts().items():
+        if state.position <= start < stop:
+            replay_games(weights, table, state, start, losses, rows(start))
+            checkpoints[season] = state.copy()
+    replay_games(weights, table, state, stop, losses, rows(stop))
+    return state
+
+def race(entities, keep, table=None, backend='numpy', z=RACE_Z, min_games=RACE_MIN_GAMES):
+    """
+    Replays the entities season by season and only finishes the replay for
+    those that could still be in the top keep. After every season the cut-off
+    is the keep-th best running accuracy of the entities still racing, and an
+    entity is dropped once its running accuracy is more than z binomial
+    standard errors below it. Every accuracy compared is over the same games,
+    an accuracy part way through the history isn't comparable to one over all
+    of it since the early seasons have a different base rate. The keep
+    entities at or above the cut-off are never dropped, so at least keep
+    entities finish.
+
+    Parameters
+    ----------
+    entities : list
+        list of entities, each made up of values of [k-factor, rating-factor,
+        home field advantage, seasonal scaling, playoff multiplier, margin of
+        victory], see _weights().
+    keep : int
+        number of top entities that have to be ranked correctly.
+    table : GameTable, optional
+        games to replay. The default is the shared DataHandler.get_game_table().
+    backend : str, optional
+        replay backend from BACKENDS. The default is 'numpy'.
+    z : float, optional
+        standard errors below the cut-off needed to drop an entity. The default
+        is RACE_Z.
+    min_games : int, optional
+        games replayed before any entity is dropped. The default is
+        RACE_MIN_GAMES.
+
+    Returns
+    -------
+    list
+        returns list of 2 items. First is the float array of each entity's
+        accuracy, over every game if it finished and over the games replayed
+        before it was dropped otherwise. Second is the bool array, true for the
+        entities that finished.
+    """
+    if table is None:
+        table = DataHandler.get_game_table()
+    weights = _weights(entities)
+    accuracies = np.zeros(len(weights))
+    alive = np.arange(len(weights))
+    state = ReplayState(table.n_teams, len(weights))
+
+    stops = [start for start in table.season_starts().values() if start > 0] + [len(table)]
+    for stop in stops:
+        state = replay(weights[alive], table, state, stop, backend=backend)
+        running = state.right / max(state.position, 1)
+        accuracies[alive] = running
+        if stop == len(table) or state.position < min_games or len(running) <= keep:
+            continue
+        cutoff = np.sort(running)[::-1][keep - 1]
+        error = np.sqrt(running * (1 - running) / state.position)
+        survive = running + z * error >= cutoff
+        if not survive.all():
+            alive = alive[survive]
+            state = state.select(survive)
+
+    finished = np.zeros(len(weights), dtype=bool)
+    finished[alive] = True
+    return [accuracies, finished]
+
+def _weights(entities):
+    """
+    Internal function that stacks the entities into a float array, one row per
+    entity. Entities of only the first 5 genes get a margin of victory of 0,
+    so entities from before the margin of victory gene replay as they did.
+
+    :param entities: list of entities, or a 2d array of them.
+
+    :return np.ndarray: returns (n_entities x N_GENES) float array.
+    """
+    weights = np.asarray(entities, dtype=np.float64)
+    weights = weights.reshape(-1, weights.shape[-1] if weights.ndim == 2 else N_GENES)
+    if weights.shape[1] < N_GENES:
+        weights = np.hstack((weights, np.zeros((len(weights), N_GENES - weights.shape[1]))))
+    return weights
+
+def _replay_games(weights, table, state, stop, losses=False, probabilities=None):
+    """
+    Inner loop of replay(). Replays the games from state.position up to stop,
+    updating state in place.
+
+    Parameters
+    ----------
+    weights : np.ndarray
+        (n_entities x N_GENES) array of entities.
+    table : GameTable
+        games to replay.
+    state : ReplayState
+        state to start from, updated in place.
+    stop : int
+        index of the game to stop before.
+    losses : bool, optional
+        if true, also sums the log loss and Brier score. The default is False.
+    probabilities : np.ndarray, optional
+        if given, the home team's expected score of game state.position + i is
+        written into row i. The default is None.
+    """
+    start = state.position
+    if start >= stop:
+        return
+    #playoff_bonus scales k on every game, see stat_eval.prediction_expanded_stats
+    k, rating_factor, hfa_val, season_scale, playoff_bonus, mov = \
+        [np.ascontiguousarray(column) for column in weights.T]
+    k_bonus = k * playoff_bonus
+    #entities without the margin of victory get a multiplier of 1, and if none
+    #have it the multiplier isn't calculated at all
+    no_mov = mov == 0
+    any_mov = not no_mov.all()
+    no_hfa = np.zeros(len(weights))
+    elos, curr_seasons, right = state.elos, state.curr_seasons, state.right
+    log_loss, brier = state.log_loss, state.brier
+
+    #python lists for the game loop, see stat_eval.prediction_expanded_stats
+    homes, aways = table.home[start:stop].tolist(), table.away[start:stop].tolist()
+    seasons, neutrals = table.season[start:stop].tolist(), table.neutral[start:stop].tolist()
+    results = table.result[start:stop].tolist()
+    margins = (table.score_home[start:stop].astype(np.int64) - table.score_away[start:stop])\
+              .tolist()
+
+    #very low rating factors overflow 10 ** exp, which just means a certain win
+    with np.errstate(over='ignore'):
+        for idx, (home, away, season, neutral, result, margin) in\
+            enumerate(zip(homes, aways, seasons, neutrals, results, margins)):
+            #same as NFLTeam.adj_season, scale towards 1200 on a new season
+            for team in (home, away):
+                if curr_seasons[team] != season:
+                    if curr_seasons[team] is not None:
+                        elos[team] = 1200 + (elos[team] - 1200) * season_scale
+                    curr_seasons[team] = season
+
+            hfa = no_hfa if neutral else hfa_val
+            home_elo, away_elo = elos[home], elos[away]
+            home_expected = ec.expanded_expected_array(home_elo, away_elo, rating_factor, hfa)
+            away_expected = ec.expanded_expected_array(away_elo, home_elo, rating_factor,\
+                                                       1 - hfa)
+
+            #prediction is a home win when expected >= .5, draws are always wrong
+            if result == HOME_WIN:
+                right += home_expected >= .5
+            elif result == HOME_LOSS:
+                right += home_expected < .5
+            home_score = RESULT_SCORES[result]
+            if probabilities is not None:
+                probabilities[idx] = home_expected
+            if losses:
+                clipped = np.clip(home_expected, MIN_EXPECTED, 1 - MIN_EXPECTED)
+                log_loss -= home_score * np.log(clipped) + (1 - home_score) * np.log(1 - clipped)
+                brier += (home_expected - home_score) ** 2
+            k_game = k_bonus
+            if any_mov:
+                multiplier = ec.mov_multiplier_array(margin, home_elo + hfa - away_elo,\
+                                                     rating_factor)
+                np.copyto(multiplier, 1.0, where=no_mov)
+                k_game = k_bonus * multiplier
+            home_change, away_change = ec.elo_changes(home_expected, away_expected,\
+                                                      home_score, k_game)
+            elos[home] += home_change
+            elos[away] += away_change
+
+    state.position = stop
+
+def _replay_games_compiled(weights, table, state, stop, losses=False, probabilities=None):
+    """
+    Same as _replay_games, but the games are replayed by the numba compiled
+    elo_kernel. Only call this if elo_kernel.compiled_kernel isn't None.
+
+    Parameters
+    ----------
+    weights : np.ndarray
+        (n_entities x N_GENES) array of entities.
+    table : GameTable
+        games to replay.
+    state : ReplayState
+        state to start from, updated in place.
+    stop : int
+        index of the game to stop before.
+    losses : bool, optional
+        if true, also sums the log loss and Brier score. The default is False.
+    probabilities : np.ndarray, optional
+        if given, the home team's expected score of game state.position + i is
+        written into row i. The default is None.
+    """
+    if state.position >= stop:
+        return
+    if probabilities is None: #the kernel skips an empty array
+        probabilities = np.empty((0, len(weights)))
+    curr_seasons = np.array([NO_SEASON if season is None else season\
+                             for season in state.curr_seasons], dtype=np.int64)
+    compiled_kernel(table.home, table.away, table.season, table.neutral, table.result,\
+                    table.score_home, table.score_away, state.position, stop,\
+                    np.ascontiguousarray(weights), state.elos, curr_seasons, state.right,\
+                    state.log_loss, state.brier, losses, probabilities)
+    state.curr_seasons = [None if season == NO_SEASON else int(season)\
+                          for season in curr_seasons]
+    state.position = stop
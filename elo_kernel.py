@@ -0,0 +1,146 @@
+"""
+The elo_kernel module holds the compiled backend of the expanded elo replay.
+replay_kernel() is written as a plain loop over the GameTable columns so that
+numba can compile it to machine code. If numba is installed, compiled_kernel is
+the compiled version of it, otherwise compiled_kernel is None and callers fall
+back to the pure python/numpy loops in elo_engine and stat_eval.
+
+Usage
+-----
+Don't call the kernel directly, pick it with backend='numba' in
+elo_engine.replay(), elo_engine.batch_expanded_stats() or
+stat_eval.prediction_expanded_stats().
+
+Methods
+-------
+replay_kernel(np.ndarray home, np.ndarray away, np.ndarray season,
+              np.ndarray neutral, np.ndarray result, np.ndarray score_home,
+              np.ndarray score_away, int start, int stop,
+              np.ndarray weights, np.ndarray elos, np.ndarray curr_seasons,
+              np.ndarray right, np.ndarray log_loss, np.ndarray brier,
+              bool losses, np.ndarray probabilities) -> none:
+    replays games start to stop for every entity, updating elos, curr_seasons,
+    right, (if losses) log_loss and brier and (if not empty) probabilities
+    in place.
+
+Global Variables:
+    HAS_NUMBA - bool true if numba is installed.
+    NO_SEASON - int stored in curr_seasons for teams that haven't played yet.
+    MIN_EXPECTED - expected scores are clipped to [MIN_EXPECTED, 1 - MIN_EXPECTED]
+                   before taking the log loss, so a certain wrong prediction
+                   gives a large but finite loss.
+    compiled_kernel - numba compiled replay_kernel, or None without numba.
+"""
+
+import math
+from elo_calculator import HOME_WIN, HOME_LOSS, MOV_BASE, MOV_ELO
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+NO_SEASON = -1
+MIN_EXPECTED = 1e-15
+
+def replay_kernel(home, away, season, neutral, result, score_home, score_away, start, stop,\
+                  weights, elos, curr_seasons, right, log_loss, brier, losses, probabilities):
+    """
+    Replays the games from start to stop for every entity. This is the same
+    calculation as elo_engine._replay_games, including the order of every float
+    operation, so both give identical elos, right counts and losses.
+
+    Parameters
+    ----------
+    home, away, season, neutral, result, score_home, score_away : np.ndarray
+        GameTable columns of the same name.
+    start : int
+        index of the first game to replay.
+    stop : int
+        index of the game to stop before.
+    weights : np.ndarray
+        (n_entities x 6) float array of entities, the last value is the
+        margin of victory switch.
+    elos : np.ndarray
+        (n_teams x n_entities) float elo matrix, updated in place.
+    curr_seasons : np.ndarray
+        int array of the last season played by each team (NO_SEASON if none),
+        updated in place.
+    right : np.ndarray
+        int array of right predictions of each entity, updated in place.
+    log_loss, brier : np.ndarray
+        float arrays of the summed log loss and Brier score of each entity,
+        updated in place.
+    losses : bool
+        if false, log_loss and brier are left unchanged.
+    probabilities : np.ndarray
+        ((stop - start) x n_entities) float array the home team's expected
+        score of every game is written into, or an empty array to skip it.
+    """
+    n_entities = weights.shape[0]
+    gather = probabilities.shape[0] > 0
+    for idx in range(start, stop):
+        home_team = home[idx]
+        away_team = away[idx]
+        game_season = season[idx]
+        #same as EloCalculator.mov_multiplier, the log only depends on the game
+        margin = int(score_home[idx]) - int(score_away[idx])
+        log_margin = math.log(max(abs(margin), 1) + 1)
+
+        #same as NFLTeam.adj_season, scale towards 1200 on a new season
+        for team in (home_team, away_team):
+            if curr_seasons[team] != game_season:
+                if curr_seasons[team] != NO_SEASON:
+                    for entity in range(n_entities):
+                        elos[team, entity] = 1200 + (elos[team, entity] - 1200) * weights[entity, 3]
+                curr_seasons[team] = game_season
+
+        for entity in range(n_entities):
+            rating_factor = weights[entity, 1]
+            hfa = 0.0 if neutral[idx] else weights[entity, 2]
+            #k_bonus as in elo_engine._replay_games
+            k_bonus = weights[entity, 0] * weights[entity, 4]
+            home_elo = elos[home_team, entity]
+            away_elo = elos[away_team, entity]
+            home_expected = 1 / (1 + 10 ** ((away_elo - (home_elo + hfa)) / rating_factor))
+            away_expected = 1 / (1 + 10 ** ((home_elo - (away_elo + (1 - hfa))) / rating_factor))
+
+            if result[idx] == HOME_WIN:
+                if home_expected >= .5:
+                    right[entity] += 1
+                home_score = 1.0
+                home_change = k_bonus * (1 - home_expected)
+                away_change = k_bonus * (0 - away_expected)
+            elif result[idx] == HOME_LOSS:
+                if home_expected < .5:
+                    right[entity] += 1
+                home_score = 0.0
+                home_change = k_bonus * (0 - home_expected)
+                away_change = k_bonus * (1 - away_expected)
+            else: #HOME_DRAW
+                home_score = 0.5
+                home_change = k_bonus * (0.5 - home_expected)
+                away_change = k_bonus * (0.5 - away_expected)
+            if weights[entity, 5] != 0:
+                if margin == 0:
+                    divisor = 1.0
+                else:
+                    winner_diff = (home_elo + hfa) - away_elo
+                    if margin < 0:
+                        winner_diff = -winner_diff
+                    divisor = max(winner_diff / rating_factor * MOV_ELO + MOV_BASE, 1.0)
+                k_game = k_bonus * (log_margin * MOV_BASE / divisor)
+                home_change = k_game * (home_score - home_expected)
+                away_change = k_game * ((1 - home_score) - away_expected)
+            if gather:
+                probabilities[idx - start, entity] = home_expected
+            if losses:
+                clipped = min(max(home_expected, MIN_EXPECTED), 1 - MIN_EXPECTED)
+                log_loss[entity] -= home_score * math.log(clipped)\
+                                    + (1 - home_score) * math.log(1 - clipped)
+                brier[entity] += (home_expected - home_score) ** 2
+            elos[home_team, entity] = home_elo + home_change
+            elos[away_team, entity] = away_elo + away_change
+
+compiled_kernel = njit(cache=True)(replay_kernel) if HAS_NUMBA else None
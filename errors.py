@@ -9,6 +9,9 @@ Error:
 InputTooSmallError:
     error class that is raised if a value for an input is found to be below
     the low bound threshold for that input.
+DatasetMismatchError:
+    error class that is raised if saved results are used with a different
+    dataset than the one they were calculated with.
 """
 
 class Error(Exception):
@@ -40,3 +43,28 @@ class InputTooSmallError(Error):
         """
         self.message = f"Param {var} is lower than the min value ({val} < {bound})."
         super().__init__(self.message)
+
+class DatasetMismatchError(Error):
+    """
+    Error class used for when saved results don't match the current dataset.
+    """
+    def __init__(self, expected, found, source):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        expected : str
+            digest of the current dataset.
+        found : str
+            digest of the dataset the results were calculated with.
+        source : str
+            name of the results that don't match.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.message = f"{source} was built from a different dataset ({found} != {expected})."
+        super().__init__(self.message)
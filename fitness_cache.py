@@ -0,0 +1,225 @@
+"""
+The fitness_cache module contains the FitnessCache class used by genetic_alg to
+remember the fitness value of every entity it has already evaluated, so that
+duplicate entities (the elite carried over by elitism, or children identical to
+a parent) are never replayed again.
+
+Classes:
+    FitnessCache:
+        Constructor:
+            FitnessCache(str, int)
+
+        Attributes:
+            str dataset_hash
+            int max_size
+            int hits
+            int misses
+
+        Methods:
+            get(list) -> float
+            put(list, float)
+            merge(FitnessCache)
+            to_dict() -> dict
+            save(str)
+            static from_dict(dict, str, int, str) -> FitnessCache
+            static load(str, str, int) -> FitnessCache
+            static _key(list) -> tuple
+
+Global Variables:
+    CACHE_VERSION - int version of the saved cache file layout.
+    DEFAULT_MAX_SIZE - int default number of entries kept in a cache.
+"""
+
+from collections import OrderedDict
+import json
+import os
+from errors import DatasetMismatchError
+
+CACHE_VERSION = 1
+DEFAULT_MAX_SIZE = 100000
+
+class FitnessCache:
+    """
+    Bounded LRU cache of entity -> fitness value. Entities are keyed on the
+    tuple of their genes, i.e. (k, rf, hfa, scale, pm, mov). When the cache is
+    full the least recently used entry is dropped. Every cache is tied to the
+    digest of the GameTable the fitness values were calculated with, so saved
+    caches can be shared between runs as long as the dataset hasn't changed.
+
+    Usage
+    _____
+
+    Constructor: FitnessCache(dataset_hash, max_size) creates an empty cache for
+                 the dataset with the digest dataset_hash.
+
+    Call get() before evaluating an entity and put() after. Use save() and
+    FitnessCache.load() to keep the cache between runs.
+
+    Attributes
+    __________
+    dataset_hash : string
+        GameTable.digest() of the data the fitness values were calculated with.
+    max_size : int
+        max number of entries held before the least recently used are dropped.
+    hits : int
+        number of get() calls that found a fitness value.
+    misses : int
+        number of get() calls that didn't find a fitness value.
+
+    Methods
+    _______
+    get(list entity):
+        returns the cached fitness value for entity or None.
+    put(list entity, float fitness):
+        stores the fitness value for entity.
+    merge(FitnessCache other):
+        stores every fitness value of other, e.g. from another process.
+    to_dict():
+        returns the cache as a json serializable dict.
+    save(str path):
+        writes the cache to path.
+    from_dict(dict data, str dataset_hash, int max_size, str source):
+        returns the cache held by a dict from to_dict().
+    load(str path, str dataset_hash, int max_size):
+        returns the cache saved at path, or an empty cache if there isn't one.
+    """
+    def __init__(self, dataset_hash, max_size=DEFAULT_MAX_SIZE):
+        self.dataset_hash = dataset_hash
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, entity):
+        return FitnessCache._key(entity) in self._entries
+
+    def get(self, entity):
+        """
+        Looks up the fitness value for entity and counts the hit or miss.
+
+        :param entity: list of genes for a single entity.
+
+        :returns float: returns the cached fitness value, or None if the entity
+                        isn't in the cache.
+        """
+        key = FitnessCache._key(entity)
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, entity, fitness):
+        """
+        Stores the fitness value of entity, dropping the least recently used
+        entry if the cache is full.
+
+        :param entity: list of genes for a single entity.
+        :param fitness: float fitness value of the entity.
+        """
+        key = FitnessCache._key(entity)
+        self._entries[key] = fitness
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def merge(self, other):
+        """
+        Stores every fitness value held by other, oldest first, so the entries
+        other used most recently stay the most recent here too.
+
+        :param other: FitnessCache of the same dataset.
+
+        :raises DatasetMismatchError: if other was built from a different dataset.
+        """
+        if other.dataset_hash != self.dataset_hash:
+            raise DatasetMismatchError(self.dataset_hash, other.dataset_hash, 'merged cache')
+        for key, fitness in other._entries.items(): # pylint: disable=protected-access
+            self.put(list(key), fitness)
+
+    def to_dict(self):
+        """
+        Returns the cache as a json serializable dict, the layout save() writes.
+        The entries are listed from least to most recently used.
+
+        :returns dict: returns dict of the 'version', 'dataset_hash' and
+                       'entries' of the cache.
+        """
+        return {'version': CACHE_VERSION, 'dataset_hash': self.dataset_hash,
+                'entries': [[list(key), fitness] for key, fitness in self._entries.items()]}
+
+    def save(self, path):
+        """
+        Writes the cache to path as json. The file is written and synced next
+        to path first and then moved over it, so an interrupted save never
+        leaves a half written cache behind.
+
+        :param path: string path of the file to write.
+        """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(self.to_dict(), file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def from_dict(data, dataset_hash, max_size=DEFAULT_MAX_SIZE, source='cache'):
+        """
+        Rebuilds a cache from a dict returned by to_dict(), with the entries in
+        the same least to most recently used order. If data was made with an
+        older CACHE_VERSION, an empty cache is returned.
+
+        :param data: dict from to_dict().
+        :param dataset_hash: GameTable.digest() of the current data.
+        :param max_size: max number of entries held by the cache.
+        :param source: string naming where data came from in errors.
+
+        :raises DatasetMismatchError: if data was made for another dataset.
+
+        :returns FitnessCache: returns the rebuilt cache.
+        """
+        cache = FitnessCache(dataset_hash, max_size)
+        if data['version'] != CACHE_VERSION:
+            return cache
+        if data['dataset_hash'] != dataset_hash:
+            raise DatasetMismatchError(dataset_hash, data['dataset_hash'], source)
+        for key, fitness in data['entries']:
+            cache.put(key, fitness)
+        return cache
+
+    @staticmethod
+    def load(path, dataset_hash, max_size=DEFAULT_MAX_SIZE):
+        """
+        Loads a cache written by save(). If there is no file at path, or it was
+        written with an older CACHE_VERSION, an empty cache is returned.
+
+        :param path: string path of the file to read.
+        :param dataset_hash: GameTable.digest() of the current data.
+        :param max_size: max number of entries held by the cache.
+
+        :raises DatasetMismatchError: if the file was saved for another dataset.
+
+        :returns FitnessCache: returns the loaded cache.
+        """
+        if not os.path.exists(path):
+            return FitnessCache(dataset_hash, max_size)
+        with open(path) as file:
+            data = json.load(file)
+        return FitnessCache.from_dict(data, dataset_hash, max_size, path)
+
+    @staticmethod
+    def _key(entity):
+        """
+        Returns the hashable key used for entity. Ints and floats of the same
+        value hash the same, so [32, ...] and [32.0, ...] share an entry.
+
+        :param entity: list of genes for a single entity.
+
+        :returns tuple: returns the genes as a tuple.
+        """
+        return tuple(entity)
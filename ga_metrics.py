@@ -0,0 +1,130 @@
+"""
+The ga_metrics module contains the MetricsLog class genetic_alg hands a record
+of every generation to, so a long run can be followed (and its time accounted
+for) without parsing the printed best/worst entities.
+
+Classes:
+    MetricsLog:
+        Constructor:
+            MetricsLog(str, fn)
+
+        Attributes:
+            str path
+            fn callback
+
+        Methods:
+            record(dict)
+            close()
+            static read(str) -> list
+
+Each record is a dict of:
+    generation - int generation number, 0 for the initial population.
+    island - int island number, or None outside island mode.
+    seconds - float wall time of the generation, breeding and evaluating it.
+    elapsed - float wall time since the run (or island) started.
+    entities - int number of entities evaluated.
+    replays - int number of entities replayed, the rest came from the cache.
+    cache_hits - int number of entities whose fitness came from the cache.
+    replays_per_second - float replays / seconds.
+    fitness - dict of 'best', 'worst', 'mean', 'median' and 'std' fitness of
+              the pruned population.
+    diversity - dict of the number of 'unique' entities in the generation and
+                the 'spread', the mean over the genes of their standard
+                deviation as a share of the gene's range in GENE_RANGES.
+    best - best entity of the pruned population.
+"""
+
+import json
+
+class MetricsLog:
+    """
+    Sink for the per-generation records of genetic_alg.genetic_algorithm(). Each
+    record is appended to a JSON lines file as one line and/or passed to a
+    callback in the process that called genetic_algorithm().
+
+    Usage
+    _____
+
+    Constructor: MetricsLog(path, callback) appends records to the file at path
+                 and calls callback(record) for each of them. Either may be None.
+
+    Pass it as the metrics argument of genetic_algorithm(). In island mode the
+    island processes send their records back over a queue, tagged with their
+    island, and they are recorded here in the order they arrive, so callback's
+    side effects are seen by the caller and only one process writes the file.
+    Use MetricsLog.read() to load the records of a file back.
+
+    Attributes
+    __________
+    path : string
+        path of the JSON lines file, or None.
+    callback : function
+        function(dict record) called for every record, or None.
+
+    Methods
+    _______
+    record(dict record):
+        writes record to the file and passes it to the callback.
+    close():
+        closes the file, it is opened again by the next record().
+    read(str path):
+        returns the records of a JSON lines file.
+    """
+    def __init__(self, path=None, callback=None):
+        """
+        Constructor
+
+        :param path: optional string path of the JSON lines file to append to.
+        :param callback: optional function(dict record) called for each record.
+        """
+        self.path = path
+        self.callback = callback
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getstate__(self):
+        #file handles can't be pickled, a copy opens its own
+        state = self.__dict__.copy()
+        state['_file'] = None
+        return state
+
+    def record(self, record):
+        """
+        Appends record to the file as one line, flushed straight away so the
+        file can be followed while the run goes on, then calls the callback.
+
+        :param record: dict of json serializable values.
+        """
+        if self.path is not None:
+            if self._file is None:
+                self._file = open(self.path, 'a')
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+        if self.callback is not None:
+            self.callback(record)
+
+    def close(self):
+        """
+        Closes the file. Records are flushed as they are written, so nothing is
+        lost if close() isn't called.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @staticmethod
+    def read(path):
+        """
+        Reads back the records written to a JSON lines file.
+
+        :param path: string path of the file.
+
+        :returns list: returns the records in the order they were written.
+        """
+        with open(path) as file:
+            return [json.loads(line) for line in file if line.strip()]
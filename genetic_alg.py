@@ -7,68 +7,174 @@ function.
 
 Usage
 -----
-Call genetic_algorithm() to run the algorithm. The function can take 2 inputs,
-one for the population size (pop_size) and one for the number of generations run
-(generations). Defaults to 100 pop_size and 100 generations.
+Call genetic_algorithm() to run the algorithm. The function takes inputs for
+the population size (pop_size) and the number of generations run (generations),
+defaulting to 100 pop_size and 100 generations. workers spreads the fitness
+calculations over that many processes and seed makes a run repeatable. Fitness
+values are cached per entity; pass a FitnessCache (see fitness_cache) as cache
+to reuse them across runs on the same dataset. backend='numba' replays with the
+compiled kernel from elo_kernel when numba is installed.
+
+Every run draws from its own numpy.random.Generator, seeded from a
+SeedSequence of seed, instead of the global random module, so other code
+using random can't change a seeded run and a run can't change theirs. Each
+island gets its own stream spawned from the same SeedSequence. Pool workers
+only replay entities and draw nothing, so the workers setting never changes
+the result. New entities are drawn a generation at a time as arrays (see
+_random_genes and _next_population) rather than one gene at a time.
+
+Each entity is [k-factor, rating-factor, home field advantage, seasonal
+scaling, playoff multiplier, margin of victory]. The last gene is 0 or 1 and
+switches EloCalculator.mov_multiplier() off or on, so the algorithm also
+chooses between the plain and the margin of victory elo.
+
+Pass a MetricsLog (see ga_metrics) as metrics to get a record of every
+generation: its wall time, how many entities were replayed and how many came
+from the cache, the fitness distribution and the diversity of the population.
+The records go to a JSON lines file and/or a callback, e.g. to see where the
+time of a long run goes or when the best fitness stops improving. In island
+mode the islands send their records back, so the file is only written and
+the callback only called by the process that called genetic_algorithm().
+
+With checkpoint set to a file path, the pruned population, the fitness cache,
+the random number generator's state and the generation number are saved to it
+every checkpoint_interval generations and after the last one. Pass the path as
+resume_from to carry on a run that was stopped: the resumed run draws the same
+numbers and replays the same entities, so it ends with exactly the population
+the uninterrupted run would have. generations is the total of the run, so a
+larger value than before also extends a finished run.
+
+racing=True evaluates each generation with elo_engine.race(): entities are
+replayed season by season and the ones that are clearly not going to survive
+the pruning are dropped before the replay reaches the last season. The
+entities kept for reproduction are still ranked on every game.
+
+With islands > 1 the algorithm runs in island mode: that many populations of
+pop_size evolve independently, each in its own process, and every
+migration_interval generations each island sends copies of its best
+migration_size entities to the next island in a ring, where they replace the
+worst entities. Islands keep the search from collapsing onto the first good
+entity found (pruning to the top two thirds converges a single population
+quickly) and use one core each.
 
 Methods
 -------
-genetic_algorithm(int pop_size, int generations) ->
+genetic_algorithm(int pop_size, int generations, int workers, int seed,
+                  FitnessCache cache, str backend, int islands,
+                  int migration_interval, int migration_size, bool racing,
+                  MetricsLog metrics, str checkpoint, int checkpoint_interval,
+                  str resume_from) ->
                                         list[list entity, float fitness_value]:
     function called to run the genetic algorithm. inputs determine the scope and
     depth of the algorithm.
-_validate_inputs(int pop_size, int generations) -> none:
-    checks pop_size and generations to make sure they are within legal type &
-    range.
-_print_gen_stats(list population, int generation) -> none:
+_run_generations(int pop_size, int generations, list pool, FitnessCache cache,
+                 str backend, Generator rng, bool racing, fn migrate, str label,
+                 MetricsLog metrics, int island, list checkpoint, list resume) ->
+                                        list[list entity, float fitness_value]:
+    main loop of the genetic algorithm.
+_run_islands(int pop_size, int generations, int islands, list migration,
+             SeedSequence seed_seq, FitnessCache cache, str backend, bool racing,
+             MetricsLog metrics) -> list[list entity, float fitness_value]:
+    runs the main loop on islands processes with migration between them.
+_island_main(int island, dict spec, int pop_size, int generations, list migration,
+             SeedSequence seed_seq, FitnessCache cache, str backend, bool racing,
+             bool send_metrics, Queue inbox, Queue outbox, Queue results) -> none:
+    process function of a single island.
+_validate_inputs(int pop_size, int generations, int workers, str backend,
+                 int islands, int migration_interval, int migration_size,
+                 bool racing, int checkpoint_interval, bool checkpointing) -> none:
+    checks pop_size, generations, workers, the island and the checkpoint
+    settings to make sure they are within legal type & range, and that backend
+    is a replay backend.
+_save_checkpoint(str path, int generation, int pop_size, list pop_fitness,
+                 Generator rng, FitnessCache cache) -> none:
+    atomically writes the state of a run to path.
+_load_checkpoint(str path, str dataset_hash, int pop_size) -> dict:
+    reads the state of a run written by _save_checkpoint().
+_print_gen_stats(list population, int generation, str label) -> none:
     prints best/worst entities in population to console.
-_reproduce(list parent1, list parent2) -> list child:
-    function takes in 2 list of weights and randomly selects gene from both
-    parents or 'mutates' and takes a random gene.
-_mutate(int index) -> int/float:
-    index input determines which random function is called to represent mutation,
-    calling the random function associated with which gene is being replaced.
-_population_fitness(list entity) -> list[list entity, float fitness]:
-    calculates the fitness value given the weights in an entity. returns the
-    entity and the fitness value.
-_population_fitnesses(list[list entity]) -> list[list[list entity, float fitness]]:
+_generation_metrics(list population, list pop_fitness, dict counts,
+                    float seconds, float elapsed) -> dict:
+    returns the MetricsLog record of a generation.
+_next_population(list pop_fitness, int pop_size, int prune_idx, Generator rng)
+                                                        -> list[entity]:
+    returns the next generation, the best entity and pop_size - 1 children of
+    the pruned population.
+_reproduce(np.ndarray parent1, np.ndarray parent2, Generator rng) -> np.ndarray:
+    function takes in 2 arrays of parents' weights and randomly selects each
+    gene from either parent or 'mutates' and takes a random gene.
+_population_fitnesses(list[list entity], list pool, FitnessCache cache,
+                      str backend, int keep, dict counts) ->
+                                        list[list[list entity, float fitness]]:
     calculates the fitness values for all entities in a population. returns a
     list of the entities and their fitness value.
-_initial_population(int pop_size) -> list[entity]:
+_race_accuracies(list[list entity], int keep, str backend) ->
+                                                        list[list, list]:
+    races entities and returns their accuracies and which ones finished.
+_replay_accuracies(list[list entity], list pool, str backend) -> list[float]:
+    replays entities locally or on the pool and returns their accuracies.
+_chunk_accuracies(list[list entity], str backend) -> list[float]:
+    worker function returning the accuracy of each entity in a chunk.
+_initial_population(int pop_size, Generator rng) -> list[entity]:
     returns a list of randomly generated entities (list of weights) of length
     pop_size.
-_create_single() -> list:
-    creates and returns a single, randomly generated entity (list of weights)
-    to be used in a population.
-_random_k() -> int:
-    returns a random int to be used as a weight for the k-factor.
-_random_rf() -> int:
-    returns a random int to be used as a weight for the rating-factor.
-_random_hfa() -> int:
-    returns a random int to be used as a weight for the home field advantage.
-_random_scale() -> float:
-    returns a random float to be used as a weight for the seasonal scaling.
-_random_playoff_multiplier() -> float:
-    returns a random float to be used as a weight for the playoff multiplier.
+_random_genes(Generator rng, int count) -> np.ndarray:
+    returns count rows of random weights, one column per gene.
+_to_entities(np.ndarray genes) -> list[entity]:
+    converts rows of weights to entities.
 
 Global Vars
 -----------
 MIN_POP_SIZE: lower bound for pop_size input in genetic_algorithm. set to 3 to
               avoid all entities being removed from the population during pruning.
 MIN_GEN_SIZE: lower bound for generations input in genetic_algorithm.
+MIN_WORKERS: lower bound for workers input in genetic_algorithm.
+MIN_ISLANDS: lower bound for islands input in genetic_algorithm.
+MIN_MIGRATION_INTERVAL: lower bound for migration_interval input in
+                        genetic_algorithm.
+MIN_CHECKPOINT_INTERVAL: lower bound for checkpoint_interval input in
+                         genetic_algorithm.
+CHECKPOINT_VERSION: version of the checkpoint file layout.
+GENE_RANGES: (low, high, divisor) of each gene. random genes are ints drawn
+             from low to high, both included, divided by divisor.
 """
 
+import json
 import math
-from random import randint, random
-from errors import InputTooSmallError
-from stat_eval import prediction_expanded_stats, get_accuracy
+import multiprocessing
+import os
+import queue
+import time
+from contextlib import nullcontext
+from itertools import repeat
+import numpy as np
+from data_handler import DataHandler, GameTable, worker_table
+from errors import InputTooSmallError, DatasetMismatchError
+from fitness_cache import FitnessCache
+from ga_metrics import MetricsLog
+from stat_eval import get_accuracy
+from elo_engine import batch_expanded_stats, race, BACKENDS
 
 MIN_POP_SIZE = 3
 MIN_GEN_SIZE = 1
-#WEIGHTS = ['k', 'rf', 'hfa', 'scale', 'pm']
-
-#TODO: change random generated genes to SINGLE function
-def genetic_algorithm(pop_size=100, generations=100):
+MIN_WORKERS = 1
+MIN_ISLANDS = 1
+MIN_MIGRATION_INTERVAL = 1
+MIN_CHECKPOINT_INTERVAL = 1
+CHECKPOINT_VERSION = 1
+#k-factor between 1 and 1000, if zero ratings won't change after games.
+#rating-factor between 50 and 10000, factors below 50 tend to make the function
+#too exponential to run. home field advantage between 0 and 500, a flat elo
+#increase for the home team. seasonal scaling between 0 and 1 and playoff
+#multiplier between .01 and 2, in steps of .01. margin of victory 0 or 1.
+GENE_RANGES = ((1, 1000, 1), (50, 10000, 1), (0, 500, 1), (0, 100, 100), (1, 200, 100), (0, 1, 1))
+
+#WEIGHTS = ['k', 'rf', 'hfa', 'scale', 'pm', 'mov']
+
+def genetic_algorithm(pop_size=100, generations=100, workers=1, seed=None, cache=None,\
+                      backend='numpy', islands=1, migration_interval=10, migration_size=2,\
+                      racing=False, metrics=None, checkpoint=None, checkpoint_interval=10,\
+                      resume_from=None):
     """
     Genetic algorithm is the main function that is called to try and generate
     the ideal weights to be used in the elo calculations. The entities are
@@ -80,47 +186,271 @@ def genetic_algorithm(pop_size=100, generations=100):
                      must be >= 3
     :param generations: int value representing how many times the genetic algorithm
                         will run.
+    :param workers: int number of processes used to calculate fitness values.
+                    with more than 1 worker, each generation is split into one
+                    chunk per worker and the games are shared with the workers
+                    through shared memory. must be >= 1
+    :param seed: optional seed of the run's random number generator. runs with
+                 the same seed return the same result for any number of workers.
+    :param cache: optional FitnessCache to reuse fitness values from earlier
+                  runs. a new cache is used if none is given, either way
+                  duplicate entities are only ever replayed once.
+    :param backend: replay backend from elo_engine.BACKENDS. 'numba' uses the
+                    compiled kernel (if numba is installed), which is much
+                    faster and gives the same fitness values.
+    :param islands: int number of populations of pop_size evolved in parallel
+                    processes. can't be combined with workers > 1. must be >= 1
+    :param migration_interval: int number of generations between migrations
+                               when islands > 1. must be >= 1
+    :param migration_size: int number of best entities each island sends to the
+                           next one per migration. must be between 0 and the
+                           pruned population size (2/3 of pop_size).
+    :param racing: bool, true to drop entities that can't survive the pruning
+                   part way through the replay, see elo_engine.race(). can't be
+                   combined with workers > 1.
+    :param metrics: optional MetricsLog every generation's record is passed to,
+                    see ga_metrics.
+    :param checkpoint: optional string path the state of the run is saved to.
+                       can't be combined with islands > 1.
+    :param checkpoint_interval: int number of generations between checkpoints.
+                                must be >= 1
+    :param resume_from: optional string path of a checkpoint to carry on from.
+                        seed is ignored, the generator carries on from the
+                        saved state. a given cache gets the checkpoint's
+                        entries merged in. can't be combined with islands > 1.
+
+    :raises DatasetMismatchError: if cache or resume_from was made with another
+                                  dataset.
+
+    :return list: returns list of lists, representing the final population made
+                  up of the entity and it's associated fitness value. in island
+                  mode, the final populations of every island are returned
+                  together, sorted by fitness value.
+    """
+    _validate_inputs(pop_size, generations, workers, backend, islands, migration_interval,\
+                     migration_size, racing, checkpoint_interval,\
+                     checkpoint is not None or resume_from is not None)
+    seed_seq = np.random.SeedSequence(seed)
+
+    dataset_hash = DataHandler.get_game_table().digest()
+    if cache is None:
+        cache = FitnessCache(dataset_hash)
+    elif cache.dataset_hash != dataset_hash:
+        raise DatasetMismatchError(dataset_hash, cache.dataset_hash, 'cache')
+    rng = np.random.default_rng(seed_seq)
+    resume = None
+    if resume_from is not None:
+        saved = _load_checkpoint(resume_from, dataset_hash, pop_size)
+        cache.merge(saved['cache'])
+        rng.bit_generator.state = saved['rng']
+        resume = [saved['generation'], saved['population']]
+
+    if islands > 1:
+        return _run_islands(pop_size, generations, islands, [migration_interval, migration_size],\
+                            seed_seq, cache, backend, racing, metrics)
+    table = DataHandler.get_game_table()
+    with table.worker_pool(workers) if workers > 1 else nullcontext() as executor:
+        pool = None if executor is None else [executor, workers]
+        return _run_generations(pop_size, generations, pool, cache, backend, rng, racing,\
+                                metrics=metrics, resume=resume,\
+                                checkpoint=None if checkpoint is None\
+                                           else [checkpoint, checkpoint_interval])
+
+def _run_generations(pop_size, generations, pool, cache, backend, rng, racing=False,\
+                     migrate=None, label='', metrics=None, island=None, checkpoint=None,\
+                     resume=None):
+    """
+    Main loop of the genetic algorithm, see genetic_algorithm().
+
+    :param pop_size: int value representing how many entities are in a population.
+    :param generations: int value representing how many times the genetic algorithm
+                        will run.
+    :param pool: list of [ProcessPoolExecutor from GameTable.worker_pool(), int
+                 workers], or None to calculate fitness values in
+                 this process.
+    :param cache: FitnessCache used to skip replaying already seen entities.
+    :param backend: replay backend from elo_engine.BACKENDS.
+    :param rng: numpy.random.Generator every random choice of the run is drawn
+                from.
+    :param racing: bool, true to race the fitness values of each generation.
+    :param migrate: optional function(generation, pop_fitness) -> pop_fitness
+                    called after every generation, used by islands to swap
+                    entities.
+    :param label: string printed before the generation stats.
+    :param metrics: optional MetricsLog to record every generation to.
+    :param island: optional int island number put in the records.
+    :param checkpoint: optional list of [str path, int interval] to save the
+                       run to every interval generations and at the end.
+    :param resume: optional list of [int generation, list pop_fitness] from a
+                   checkpoint to carry on from instead of a new population.
 
     :return list: returns list of lists, representing the final population made
                   up of the entity and it's associated fitness value.
     """
-    _validate_inputs(pop_size, generations)
+    counts = {'replays': 0, 'cache_hits': 0}
+    times = {'run': time.perf_counter(), 'generation': time.perf_counter()}
+    def record(generation):
+        if metrics is None:
+            return
+        now = time.perf_counter()
+        metrics.record({'generation': generation, 'island': island,
+                        **_generation_metrics(population, pop_fitness, counts,
+                                              now - times['generation'], now - times['run'])})
+        counts.update(replays=0, cache_hits=0)
+        times['generation'] = time.perf_counter()
 
-    #generate initial population
-    population = _initial_population(pop_size)
     #amount to prune pop_fitness by
     prune_idx = 2*math.floor(pop_size/3)
-    #find fitness of initial population and prune
-    pop_fitness = _population_fitnesses(population)[:prune_idx]
+    #with racing, only the entities that survive the pruning are fully replayed
+    keep = prune_idx if racing else None
+    if resume is None:
+        first_gen = 0
+        #generate initial population
+        population = _initial_population(pop_size, rng)
+        #find fitness of initial population and prune
+        pop_fitness = _population_fitnesses(population, pool, cache, backend, keep,\
+                                            counts)[:prune_idx]
+        record(0)
+    else:
+        first_gen, pop_fitness = resume
 
     #run main algorithm loop
-    for gen in range(0, generations):
-        _print_gen_stats(pop_fitness, gen)
-        new_population = []
-        #elitism, add previous generation's best fitness valued entity
-        new_population.append(pop_fitness[0][0])
-
-        #start at 1 bc elitism already adds first entity to new pop.
-        for _ in range(1, pop_size):
-            #genetic selection
-            parent1 = pop_fitness[randint(0, prune_idx-1)][0]
-            parent2 = pop_fitness[randint(0, prune_idx-1)][0]
-            #reproduce and add to new population
-            child = _reproduce(parent1, parent2)
-            new_population.append(child)
-
-        #update population to new children generated in function
-        population = new_population
+    for gen in range(first_gen, generations):
+        _print_gen_stats(pop_fitness, gen, label)
+        population = _next_population(pop_fitness, pop_size, prune_idx, rng)
         #find fitness of new population and prune so that only 2/3 remain
-        pop_fitness = _population_fitnesses(population)[:prune_idx]
-
-    _print_gen_stats(pop_fitness, generations)
+        pop_fitness = _population_fitnesses(population, pool, cache, backend, keep,\
+                                            counts)[:prune_idx]
+        if migrate is not None:
+            pop_fitness = migrate(gen + 1, pop_fitness)
+        record(gen + 1)
+        if checkpoint is not None and ((gen + 1) % checkpoint[1] == 0 or gen + 1 == generations):
+            _save_checkpoint(checkpoint[0], gen + 1, pop_size, pop_fitness, rng, cache)
+
+    _print_gen_stats(pop_fitness, max(generations, first_gen), label)
     return pop_fitness
 
-def _validate_inputs(pop_size, generations):
+def _run_islands(pop_size, generations, islands, migration, seed_seq, cache, backend,\
+                 racing=False, metrics=None):
+    """
+    Island mode of the genetic algorithm, see genetic_algorithm(). Starts one
+    process per island, connected in a ring by queues, and waits for their
+    final populations. The game table is shared with the islands through
+    shared memory.
+
+    :param pop_size: int population size of each island.
+    :param generations: int number of generations each island runs.
+    :param islands: int number of islands.
+    :param migration: list of [int migration_interval, int migration_size].
+    :param seed_seq: SeedSequence of the run, each island gets its own random
+                     number generator from a stream spawned from it.
+    :param cache: FitnessCache copied to every island. the fitness values the
+                  islands calculate are merged back into it at the end.
+    :param backend: replay backend from elo_engine.BACKENDS.
+    :param racing: bool, true to race the fitness values of each generation.
+    :param metrics: optional MetricsLog the islands' records are passed to in
+                    this process, tagged with their island.
+
+    :raises RuntimeError: if an island process exits without a result.
+
+    :return list: returns the final populations of every island together, sorted
+                  by fitness value.
+    """
+    shm, spec = DataHandler.get_game_table().to_shared_memory()
+    inboxes = [multiprocessing.Queue() for _ in range(islands)]
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_island_main,\
+                     args=(island, spec, pop_size, generations, migration, island_seq, cache,\
+                           backend, racing, metrics is not None, inboxes[island],\
+                           inboxes[(island + 1) % islands], results))\
+                 for island, island_seq in enumerate(seed_seq.spawn(islands))]
+    finals = {}
+    try:
+        for process in processes:
+            process.start()
+        while len(finals) < islands:
+            try:
+                message = results.get(timeout=1)
+            except queue.Empty:
+                #an island that died would leave its neighbour waiting for migrants forever
+                if any(process.exitcode not in (None, 0) for process in processes):
+                    raise RuntimeError("an island process exited without a result") from None
+                continue
+            if message[0] == 'record':
+                metrics.record(message[1])
+                continue
+            _, island, pop_fitness, island_cache = message
+            finals[island] = [pop_fitness, island_cache]
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        shm.close()
+        shm.unlink()
+
+    for island in range(islands):
+        cache.merge(finals[island][1])
+    pop_fitness = [entry for island in range(islands) for entry in finals[island][0]]
+    return sorted(pop_fitness, key=lambda x:x[1], reverse=True)
+
+def _island_main(island, spec, pop_size, generations, migration, seed_seq, cache, backend,\
+                 racing, send_metrics, inbox, outbox, results):
     """
-    Checks to make sure genetic_algorithm inputs are both ints and both above
-    their min value.
+    Process function of a single island. Runs the main loop of the genetic
+    algorithm on the shared game table, and every migration_interval
+    generations sends its best entities to outbox and replaces its worst ones
+    with the entities waiting in inbox. The final population and cache are put
+    on results, and so is every generation's record if send_metrics is true.
+
+    :param island: int number of the island.
+    :param spec: spec dict from GameTable.to_shared_memory().
+    :param pop_size: int population size.
+    :param generations: int number of generations.
+    :param migration: list of [int migration_interval, int migration_size].
+    :param seed_seq: SeedSequence spawned for this island.
+    :param cache: FitnessCache to start from.
+    :param backend: replay backend from elo_engine.BACKENDS.
+    :param racing: bool, true to race the fitness values of each generation.
+    :param send_metrics: bool, true to put ['record', dict record] on results
+                         for every generation.
+    :param inbox: Queue the previous island sends its migrants to.
+    :param outbox: Queue of the next island.
+    :param results: Queue the ['result', island, population, cache] result is
+                    put on.
+    """
+    #the block stays attached until the process exits, like the pool workers
+    _shm, table = GameTable.from_shared_memory(spec)
+    DataHandler.set_game_table(table)
+    migration_interval, migration_size = migration
+
+    def migrate(generation, pop_fitness):
+        #no migration after the last generation, nobody would use the migrants
+        if generation % migration_interval != 0 or generation == generations:
+            return pop_fitness
+        outbox.put([[entity.copy(), fitness] for entity, fitness in pop_fitness[:migration_size]])
+        migrants = inbox.get()
+        for entity, fitness in migrants:
+            cache.put(entity, fitness)
+        #migrants replace the worst entities, residents win ties
+        pop_fitness = pop_fitness[:len(pop_fitness) - len(migrants)] + migrants
+        return sorted(pop_fitness, key=lambda x:x[1], reverse=True)
+
+    #the records go back to the parent, which owns the file and the callback
+    metrics = MetricsLog(callback=lambda record: results.put(['record', record]))\
+              if send_metrics else None
+    pop_fitness = _run_generations(pop_size, generations, None, cache, backend,\
+                                   np.random.default_rng(seed_seq), racing, migrate,\
+                                   f'Island {island} ', metrics, island)
+    results.put(['result', island, pop_fitness, cache])
+
+def _validate_inputs(pop_size, generations, workers=1, backend='numpy', islands=1,\
+                     migration_interval=10, migration_size=2, racing=False,\
+                     checkpoint_interval=10, checkpointing=False):
+    """
+    Checks to make sure genetic_algorithm inputs are all ints and all above
+    their min value, and that backend is a known replay backend.
 
     Parameters
     ----------
@@ -128,14 +458,37 @@ def _validate_inputs(pop_size, generations):
         pop_size param to check if valid.
     generations : int
         generations param to check if valid.
+    workers : int
+        workers param to check if valid.
+    backend : str
+        backend param to check if valid.
+    islands : int
+        islands param to check if valid.
+    migration_interval : int
+        migration_interval param to check if valid.
+    migration_size : int
+        migration_size param to check if valid.
+    racing : bool
+        racing param to check if valid.
+    checkpoint_interval : int
+        checkpoint_interval param to check if valid.
+    checkpointing : bool
+        true if checkpoint or resume_from is given.
 
     Raises
     ------
     TypeError
-        If pop_size or generations are not ints, raises TypeError.
+        If pop_size, generations, workers, the island params or
+        checkpoint_interval are not ints, raises TypeError.
     InputTooSmallError
-        If pop_size or generations are below their min value, raises
+        If pop_size, generations, workers, the island params or
+        checkpoint_interval are below their min value, raises
         InputTooSmallError.
+    ValueError
+        If backend isn't one of elo_engine.BACKENDS, if migration_size is
+        larger than the pruned population, if both workers and islands are
+        above 1, if racing is combined with workers above 1 or checkpointing
+        with islands above 1, raises ValueError.
 
     Returns
     -------
@@ -147,6 +500,13 @@ def _validate_inputs(pop_size, generations):
         raise TypeError(f"pop_size expected an int and received a {type(pop_size)}")
     if not isinstance(generations, int):
         raise TypeError(f"generations expected an int and received a {type(generations)}")
+    if not isinstance(workers, int):
+        raise TypeError(f"workers expected an int and received a {type(workers)}")
+    for name, value in (('islands', islands), ('migration_interval', migration_interval),\
+                        ('migration_size', migration_size),\
+                        ('checkpoint_interval', checkpoint_interval)):
+        if not isinstance(value, int):
+            raise TypeError(f"{name} expected an int and received a {type(value)}")
 
     #check input size greater than min. if 0 < pop_size < 3, when the fitness
     #list is pruned, it will remove all entities from the population
@@ -154,10 +514,87 @@ def _validate_inputs(pop_size, generations):
         raise InputTooSmallError(pop_size, MIN_POP_SIZE, 'pop_size')
     if generations < MIN_GEN_SIZE:
         raise InputTooSmallError(generations, MIN_GEN_SIZE, 'generations')
+    if workers < MIN_WORKERS:
+        raise InputTooSmallError(workers, MIN_WORKERS, 'workers')
+    if islands < MIN_ISLANDS:
+        raise InputTooSmallError(islands, MIN_ISLANDS, 'islands')
+    if migration_interval < MIN_MIGRATION_INTERVAL:
+        raise InputTooSmallError(migration_interval, MIN_MIGRATION_INTERVAL, 'migration_interval')
+    if migration_size < 0:
+        raise InputTooSmallError(migration_size, 0, 'migration_size')
+    if checkpoint_interval < MIN_CHECKPOINT_INTERVAL:
+        raise InputTooSmallError(checkpoint_interval, MIN_CHECKPOINT_INTERVAL,\
+                                 'checkpoint_interval')
+    if migration_size > 2*math.floor(pop_size/3):
+        raise ValueError(f"migration_size ({migration_size}) is larger than the pruned "\
+                         f"population ({2*math.floor(pop_size/3)})")
+    if islands > 1 and workers > 1:
+        raise ValueError("islands and workers can't both be above 1, islands already use "\
+                         "one process each")
+    if racing and workers > 1:
+        raise ValueError("racing replays in a single process and can't be used with workers > 1")
+    if checkpointing and islands > 1:
+        raise ValueError("checkpoint and resume_from can't be used with islands > 1, the islands "\
+                         "run out of step with each other")
+    if backend not in BACKENDS:
+        raise ValueError(f"backend expected one of {BACKENDS} and received {backend!r}")
+
+
+
+def _save_checkpoint(path, generation, pop_size, pop_fitness, rng, cache):
+    """
+    Saves the state of a run after generation as json. The file is written and
+    synced next to path first and then moved over it, so a run killed part way
+    through a save still has its previous checkpoint.
+
+    :param path: string path of the checkpoint.
+    :param generation: int number of generations finished.
+    :param pop_size: int population size of the run.
+    :param pop_fitness: sorted list of [entity, fitness] of the pruned population.
+    :param rng: numpy.random.Generator of the run.
+    :param cache: FitnessCache of the run.
+    """
+    data = {'version': CHECKPOINT_VERSION, 'dataset_hash': cache.dataset_hash,
+            'generation': generation, 'pop_size': pop_size, 'population': pop_fitness,
+            'rng': rng.bit_generator.state, 'cache': cache.to_dict()}
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+def _load_checkpoint(path, dataset_hash, pop_size):
+    """
+    Reads a checkpoint written by _save_checkpoint().
 
+    :param path: string path of the checkpoint.
+    :param dataset_hash: GameTable.digest() of the current data.
+    :param pop_size: int population size of the resumed run.
 
+    :raises DatasetMismatchError: if the checkpoint was saved for another dataset.
+    :raises ValueError: if the checkpoint has another CHECKPOINT_VERSION or
+                        pop_size.
 
-def _print_gen_stats(population, generation):
+    :return dict: returns dict of the 'generation', the 'population' as a
+                  sorted list of [entity, fitness], the bit generator state as
+                  'rng' and the FitnessCache as 'cache'.
+    """
+    with open(path) as file:
+        data = json.load(file)
+    if data['version'] != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} has checkpoint version {data['version']}, "\
+                         f"expected {CHECKPOINT_VERSION}")
+    if data['dataset_hash'] != dataset_hash:
+        raise DatasetMismatchError(dataset_hash, data['dataset_hash'], path)
+    if data['pop_size'] != pop_size:
+        raise ValueError(f"{path} was saved with pop_size {data['pop_size']}, "\
+                         f"received {pop_size}")
+    return {'generation': data['generation'], 'population': data['population'],
+            'rng': data['rng'],
+            'cache': FitnessCache.from_dict(data['cache'], dataset_hash, source=path)}
+
+def _print_gen_stats(population, generation, label=''):
     """
     Print statement that prints the best/worst entities to the console based on
     their fitness values.
@@ -168,6 +605,8 @@ def _print_gen_stats(population, generation):
         population list consisting of entities and their fitness value.
     generation : int
         which generation number the print fn is called from.
+    label : str, optional
+        printed before the stats, e.g. the island. The default is ''.
 
     Returns
     -------
@@ -181,88 +620,143 @@ def _print_gen_stats(population, generation):
     worst_fitness = population[-1].copy()
     worst_fitness[1] = round(worst_fitness[1], 5)
     if generation == 0:
-        print(f'Initial Generation: Best: {best_fitness} Worst: {worst_fitness}')
+        print(f'{label}Initial Generation: Best: {best_fitness} Worst: {worst_fitness}')
     else:
-        print(f'Generation {generation}: Best: {best_fitness} Worst: {worst_fitness}')
+        print(f'{label}Generation {generation}: Best: {best_fitness} Worst: {worst_fitness}')
 
-def _reproduce(parent1, parent2):
+def _next_population(pop_fitness, pop_size, prune_idx, rng):
     """
-    Simulates reproduction between 2 entities. Instead of selecting a crossover
-    point as traditionally is done, generates random number to decide. Each
-    parent has a 45% chance of having their gene selected while there's a 10%
-    chance of the gene mutating. Returns a new entity.
+    Breeds the next generation from the pruned population. The best entity is
+    kept as is (elitism) and the other pop_size - 1 entities are children of two
+    parents picked at random from the pruned population, all drawn at once.
 
-    :param parent1: list containing weights used for an entity of the population.
-    :param parent2: list containing weights used for an entity of the population.
+    :param pop_fitness: sorted list of [entity, fitness] of the pruned population.
+    :param pop_size: int number of entities in the new population.
+    :param prune_idx: int number of entities parents are picked from.
+    :param rng: numpy.random.Generator to draw from.
 
-    :returns child: list containing weights used for an entity of the population.
+    :return list: returns the new population as a list of entities.
     """
-    child = []
-    for index, (gene1, gene2) in enumerate(zip(parent1, parent2)):
-        prob = random()
-        if prob <= .45:
-            child.append(gene1)
-        elif prob <= .9:
-            child.append(gene2)
-        else:
-            child.append(_mutate(index))
-    return child
+    parents = np.array([entity for entity, _ in pop_fitness[:prune_idx]], dtype=float)
+    #genetic selection, start at 1 bc elitism already adds first entity to new pop.
+    picks = rng.integers(0, prune_idx, size=(2, pop_size - 1))
+    children = _reproduce(parents[picks[0]], parents[picks[1]], rng)
+    return [pop_fitness[0][0]] + _to_entities(children)
 
-def _mutate(index):
+def _generation_metrics(population, pop_fitness, counts, seconds, elapsed):
     """
-    Simulates a 'mutated gene' by taking which gene is being mutated and generating
-    a new random value for that gene.
+    Builds the MetricsLog record of a generation, see ga_metrics for its keys.
 
-    :param index: int representing which index gene of an entity is being mutated.
+    :param population: list of every entity evaluated in the generation.
+    :param pop_fitness: sorted list of [entity, fitness] of the pruned population.
+    :param counts: dict of the 'replays' and 'cache_hits' of the generation.
+    :param seconds: float wall time of the generation.
+    :param elapsed: float wall time since the run started.
 
-    :return int/float: returns an int if indes is for k-factor, rating-factor,
-                       or homefield advantage, and a float for the others
-                       representing a new mutated gene.
+    :return dict: returns the record, without its generation and island.
     """
-    if index == 0:
-        return _random_k()
-    if index == 1:
-        return _random_rf()
-    if index == 2:
-        return _random_hfa()
-    if index == 3:
-        return _random_scale()
-    return _random_playoff_multiplier()
-
-def _population_fitness(entity):
+    fitness = np.array([fit for _, fit in pop_fitness])
+    genes = np.array(population, dtype=float)
+    low, high, _ = np.array(GENE_RANGES, dtype=float).T
+    spans = (high - low) / np.array([divisor for _, _, divisor in GENE_RANGES])
+    return {'seconds': seconds, 'elapsed': elapsed, 'entities': len(population),
+            'replays': counts['replays'], 'cache_hits': counts['cache_hits'],
+            'replays_per_second': counts['replays'] / seconds if seconds > 0 else 0.0,
+            'fitness': {'best': float(fitness[0]), 'worst': float(fitness[-1]),
+                        'mean': float(fitness.mean()), 'median': float(np.median(fitness)),
+                        'std': float(fitness.std())},
+            'diversity': {'unique': len({tuple(entity) for entity in population}),
+                          'spread': float(np.mean(genes.std(axis=0) / spans))},
+            'best': list(pop_fitness[0][0])}
+
+def _reproduce(parent1, parent2, rng):
     """
-    Calculates the fitness value for a single entity using an evaluation of
-    how many games are predicted right that are in the dataset.
+    Simulates reproduction between pairs of entities. Instead of selecting a
+    crossover point as traditionally is done, generates random number to decide.
+    Each parent has a 45% chance of having their gene selected while there's a
+    10% chance of the gene mutating to a new random value. Returns the new
+    entities.
 
-    :param entity: a single entity made up of values of:
-                   [k-factor, rating-factor, home field advantage, seasonal scaling,
-                   playoff multiplier].
+    :param parent1: np.ndarray of weights, one row per child.
+    :param parent2: np.ndarray of weights of the other parent of each child.
+    :param rng: numpy.random.Generator to draw from.
 
-    :return list: a list containing the entity and it's fitness value.
+    :returns np.ndarray: array of weights of the children, one row per child.
     """
-    predictions = prediction_expanded_stats(entity[0], entity[1], entity[2],\
-                                                       entity[3], entity[4])[0]
-    return [entity, get_accuracy(predictions)]
+    prob = rng.random(parent1.shape)
+    mutations = _random_genes(rng, len(parent1))
+    return np.where(prob <= .45, parent1, np.where(prob <= .9, parent2, mutations))
 
-def _population_fitnesses(pop):
+def _population_fitnesses(pop, pool=None, cache=None, backend='numpy', keep=None, counts=None):
     """
     Calculates the fitness values for every entity in a population using an
     evaluation of how many games are predicted right that are in the dataset.
+    The whole population is replayed together with elo_engine's
+    batch_expanded_stats, which gives the same fitness as replaying each entity
+    with stat_eval's prediction_expanded_stats.
+    If a pool is given, the population is split into one chunk per worker and
+    the chunks are replayed in parallel. If a cache is given, only entities that
+    aren't in it are replayed, and each unique entity is replayed once.
+
+    If keep is given the entities are raced instead (see elo_engine.race), so
+    only the entities that could be in the top keep are replayed to the end.
+    The dropped entities come after all the others, ranked by the accuracy they
+    had when dropped, and aren't cached.
 
     :param pop: a list of entities representing a population. Each entity is a
                 list made up of values of:
                 [k-factor, rating-factor, home field advantage, seasonal scaling,
-                 playoff multiplier].
+                 playoff multiplier, margin of victory].
+    :param pool: optional list of [ProcessPoolExecutor, int workers], see
+                 _run_generations().
+    :param cache: optional FitnessCache of already calculated fitness values.
+    :param backend: replay backend from elo_engine.BACKENDS.
+    :param keep: optional int number of top entities to race for. racing always
+                 replays in this process, pool is ignored.
+    :param counts: optional dict whose 'replays' and 'cache_hits' are increased
+                   by the number of entities replayed and found in cache.
 
     :return list: returns sorted list of lists, the inner list being a single
                   entity and it's associated fitness value.
     """
-    pop_fitness = []
-    for entity in pop:
-        #run against every game and get percentage of games predicted right
-        predictions = prediction_expanded_stats(entity[0], entity[1], entity[2],\
-                                               entity[3], entity[4])[0]
-        pop_fitness.append([entity, get_accuracy(predictions)])
+    finished = None
+    if cache is None and keep is None:
+        accuracies = _replay_accuracies(pop, pool, backend)
+    elif cache is None:
+        accuracies, finished = _race_accuracies(pop, keep, backend)
+    else:
+        #only replay unique entities that haven't been seen before
+        accuracies = [cache.get(entity) for entity in pop]
+        missing = {}
+        for entity, accuracy in zip(pop, accuracies):
+            if accuracy is None:
+                missing.setdefault(tuple(entity), entity)
+        if keep is None:
+            replayed = dict(zip(missing, _replay_accuracies(list(missing.values()), pool, backend)))
+            done = set(missing)
+        else:
+            raced, raced_finished = _race_accuracies(list(missing.values()), keep, backend)
+            replayed = dict(zip(missing, raced))
+            done = {key for key, key_finished in zip(missing, raced_finished) if key_finished}
+            finished = [accuracy is not None or tuple(entity) in done\
+                        for entity, accuracy in zip(pop, accuracies)]
+        for key, entity in missing.items():
+            if key in done:
+                cache.put(entity, replayed[key])
+        if counts is not None:
+            counts['cache_hits'] += len(pop) - sum(accuracy is None for accuracy in accuracies)
+        accuracies = [replayed[tuple(entity)] if accuracy is None else accuracy\
+                      for entity, accuracy in zip(pop, accuracies)]
+    pop_fitness = [[entity, accuracy] for entity, accuracy in zip(pop, accuracies)]
+    if counts is not None:
+        counts['replays'] += len(pop) if cache is None else len(missing)
+
+    if finished is not None:
+        #dropped entities only have the accuracy of the seasons they were
+        #replayed for, so they rank after every entity that finished
+        order = sorted(range(len(pop)), key=lambda idx: (finished[idx], accuracies[idx]),\
+                       reverse=True)
+        return [pop_fitness[idx] for idx in order]
 
     #Sort all values according to their fitness value.
     #IMPORTANT: entities in population are pruned later for reproduction, so a
@@ -271,85 +765,95 @@ def _population_fitnesses(pop):
 
     return sorted(pop_fitness, key=lambda x:x[1], reverse=True)
 
-def _initial_population(pop_size):
+def _race_accuracies(pop, keep, backend='numpy'):
     """
-    Initializes a population to be used in the genetic algorithm. The population
-    is determined on the input size of randomly created entities and returned
-    as a list.
+    Races every entity in pop with elo_engine.race and returns their accuracies
+    in the same order.
 
-    :param pop_size: an integer value representing how many entities are in a
-                     population.
+    :param pop: list of entities to race.
+    :param keep: int number of top entities to race for.
+    :param backend: replay backend.
 
-    :return list:    returns a list of entities as an initial population.
+    :return list: returns list of 2 lists, the accuracy of each entity and
+                  whether it finished the replay.
     """
-    pop = []
-    for _ in range(pop_size):
-        pop.append(_create_single())
-    return pop
+    if not pop:
+        return [[], []]
+    accuracies, finished = race(pop, keep, backend=backend)
+    return [accuracies.tolist(), finished.tolist()]
 
-def _create_single():
+def _replay_accuracies(pop, pool, backend='numpy'):
     """
-    Creates a single entity for a population. Entity consists of random numbers
-    for each gene and is returned as a list.
+    Replays every entity in pop and returns their accuracies in the same order,
+    either in this process or split into one chunk per worker of pool.
 
-    :return list: returns a list of random number representing a single entity.
-    """
-    k = _random_k()
-    rating_factor = _random_rf()
-    hfa = _random_hfa()
-    scale = _random_scale()
-    playoff_multiplier = _random_playoff_multiplier()
-    return [k, rating_factor, hfa, scale, playoff_multiplier]
+    :param pop: list of entities to replay.
+    :param pool: list of [ProcessPoolExecutor, int workers] or None.
+    :param backend: replay backend from elo_engine.BACKENDS.
 
-def _random_k():
+    :return list: returns the accuracy of each entity.
+    """
+    if not pop:
+        return []
+    if pool is None:
+        #run every entity against every game at once and get percentage of games
+        #predicted right for each one
+        return get_accuracy(batch_expanded_stats(pop, backend=backend)[0]).tolist()
+    executor, workers = pool
+    chunk_size = math.ceil(len(pop) / workers)
+    chunks = [pop[idx:idx+chunk_size] for idx in range(0, len(pop), chunk_size)]
+    #map keeps the chunks in order, so the results don't depend on which
+    #worker finishes first
+    return [accuracy for chunk in executor.map(_chunk_accuracies, chunks, repeat(backend))\
+            for accuracy in chunk]
+
+def _chunk_accuracies(chunk, backend):
     """
-    Generates a random number for the k-factor in the elo calculation between
-    1 and 1000. K-factor is a boundry on the max amount an elo can change in 1
-    game.
+    Pool worker function that replays a chunk of entities against the shared
+    game table.
 
-    NOTE: if zero, ratings won't change after games.
+    :param chunk: list of entities.
+    :param backend: replay backend from elo_engine.BACKENDS.
 
-    :return int: returns an int between 1 and 1000.
+    :return list: returns the accuracy of each entity in the chunk.
     """
-    return randint(1, 1000)
+    return get_accuracy(batch_expanded_stats(chunk, worker_table(), backend)[0]).tolist()
 
-def _random_rf():
+def _initial_population(pop_size, rng):
     """
-    Generates a random number for the rating-factor in the elo calculation between
-    50 and 1000. The rating factor determines how much elo it takes to increase
-    the percent chance of a winner by a factor of 10.
+    Initializes a population to be used in the genetic algorithm. The population
+    is determined on the input size of randomly created entities and returned
+    as a list.
 
-    NOTE: if changed, factors of below 50 tend to make the function too
-    exponential to run.
+    :param pop_size: an integer value representing how many entities are in a
+                     population.
+    :param rng: numpy.random.Generator to draw from.
 
-    :return int: returns an int between 50 and 1000.
+    :return list:    returns a list of entities as an initial population.
     """
-    return randint(50, 10000)
+    return _to_entities(_random_genes(rng, pop_size))
 
-def _random_hfa():
+def _random_genes(rng, count):
     """
-    Generates a random number between 0 and 500 for the home field advantage,
-    which is a flat elo increase for the home team.
+    Draws count rows of random weights within GENE_RANGES.
 
-    :return int: returns an int between 0 and 500.
-    """
-    return randint(0, 500)
+    :param rng: numpy.random.Generator to draw from.
+    :param count: int number of rows.
 
-def _random_scale():
+    :return np.ndarray: returns float array of shape (count, len(GENE_RANGES)).
     """
-    Generates a random number between 0 and 100 to scale the teams elo after
-    each season. The number is divided by 100 to create and return a float.
+    low, high, divisor = np.array(GENE_RANGES).T
+    return rng.integers(low, high + 1, size=(count, len(GENE_RANGES))) / divisor
 
-    :return float: returns an float between 0 and 1.
+def _to_entities(genes):
     """
-    return randint(0, 100)/100
+    Converts rows of weights to entities. k-factor, rating-factor, home field
+    advantage and margin of victory go back to ints, as they are printed and
+    cached as ints.
 
-def _random_playoff_multiplier():
-    """
-    Generates a random number between 1 and 200 to scale the elo changes
-    that result from playoff games. The number is divided by 100 to create and
-    return a float.
+    :param genes: np.ndarray of weights, one row per entity.
 
-    :return float: returns an float greater than 0 and <= 2.
+    :return list: returns list of entities.
     """
-    return randint(1, 200)/100
+    return [[int(k), int(rating_factor), int(hfa), scale, playoff_multiplier, int(mov)]
+            for k, rating_factor, hfa, scale, playoff_multiplier, mov in genes.tolist()]
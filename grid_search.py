@@ -0,0 +1,163 @@
+"""
+The grid_search module evaluates every combination of a grid of expanded elo
+parameters, mapping the accuracy surface that genetic_alg only samples. Each
+point gets the same accuracy prediction_expanded_stats would give it, but the
+grid is replayed in chunks of points with elo_engine.batch_expanded_stats, so
+one pass over the games evaluates a whole chunk.
+
+Usage
+-----
+Call grid_search() with the values to try for each parameter, e.g.
+grid_search(k=range(10, 60, 10), rating_factor=[300, 400, 500], mov=[0, 1]).
+Parameters that aren't given stay at the prediction_expanded_stats default.
+workers spreads the chunks over that many processes, which attach to the game
+table in shared memory (see GameTable.worker_pool).
+
+With store set to a file path, the right/wrong counts of every chunk are
+appended to a ResultsStore (see results_store) as soon as the chunk finishes.
+Running the same call again after an interruption only replays the points that
+aren't in the store, and a bigger grid reuses every point it shares with an
+earlier one.
+
+Methods
+-------
+grid_search(list k, list rating_factor, list hfa_val, list season_scale,
+            list playoff_multiplier, list mov, str store, int workers,
+            int chunk_size, str backend) -> list[list entity, float accuracy]:
+    evaluates every point of the grid and returns them sorted by accuracy.
+_chunk_counts(GameTable table, list chunk, str backend) -> list[list, list]:
+    replays a chunk of points and returns their right and wrong counts.
+_pool_chunk(list chunk, str backend) -> list[list, list]:
+    worker function returning the counts of a chunk on the shared game table.
+
+Global Variables
+----------------
+DEFAULT_CHUNK_SIZE: default number of grid points replayed together.
+"""
+
+from itertools import product, repeat
+from data_handler import DataHandler, worker_table
+from elo_engine import batch_expanded_stats, BACKENDS
+from errors import InputTooSmallError
+from results_store import ResultsStore
+from stat_eval import get_accuracy
+
+DEFAULT_CHUNK_SIZE = 100
+
+def grid_search(k=(32,), rating_factor=(400,), hfa_val=(0,), season_scale=(1,),
+                playoff_multiplier=(1,), mov=(0,), store=None, workers=1,
+                chunk_size=DEFAULT_CHUNK_SIZE, backend='numpy'):
+    """
+    Evaluates the accuracy of every point in the Cartesian grid of the given
+    parameter values.
+
+    Parameters
+    ----------
+    k, rating_factor, hfa_val, season_scale, playoff_multiplier, mov : iterable, optional
+        values to try for each parameter of prediction_expanded_stats, see
+        there. Any iterable works, generators included. The defaults are its
+        default values.
+    store : str, optional
+        path of a ResultsStore to resume from and append the results to. The
+        default is None, nothing is kept.
+    workers : int, optional
+        number of processes the chunks are spread over, 1 replays them in this
+        process. The default is 1.
+    chunk_size : int, optional
+        number of points replayed together. Bigger chunks replay faster, but
+        an interruption loses the chunks that were running. The default is
+        DEFAULT_CHUNK_SIZE.
+    backend : str, optional
+        replay backend from elo_engine.BACKENDS. The default is 'numpy'.
+
+    Raises
+    ------
+    InputTooSmallError
+        If workers or chunk_size is below 1, or a parameter has no values.
+    ValueError
+        If backend isn't one of elo_engine.BACKENDS.
+    DatasetMismatchError
+        If store was made from a different dataset.
+
+    Returns
+    -------
+    list
+        one [entity, accuracy] per grid point, the entity being [k,
+        rating_factor, hfa_val, season_scale, playoff_multiplier, mov], sorted
+        from the highest accuracy down like the genetic_algorithm results.
+    """
+    #read each axis once, a generator would be empty the second time
+    axes = {'k': tuple(k), 'rating_factor': tuple(rating_factor), 'hfa_val': tuple(hfa_val),
+            'season_scale': tuple(season_scale),
+            'playoff_multiplier': tuple(playoff_multiplier), 'mov': tuple(mov)}
+    for name, values in axes.items():
+        if len(values) < 1:
+            raise InputTooSmallError(len(values), 1, name)
+    if workers < 1:
+        raise InputTooSmallError(workers, 1, 'workers')
+    if chunk_size < 1:
+        raise InputTooSmallError(chunk_size, 1, 'chunk_size')
+    if backend not in BACKENDS:
+        raise ValueError(f"backend expected one of {BACKENDS} and received {backend!r}")
+
+    table = DataHandler.get_game_table()
+    points = [list(point) for point in product(*axes.values())]
+    results = ResultsStore(store, table.digest()) if store is not None else None
+    try:
+        counts = results.finished() if results is not None else {}
+        pending = list({ResultsStore.key(point): point for point in points
+                        if ResultsStore.key(point) not in counts}.values())
+        chunks = [pending[idx:idx+chunk_size] for idx in range(0, len(pending), chunk_size)]
+
+        def finish(chunk, chunk_counts):
+            rows = [[point, right, wrong] for point, right, wrong in zip(chunk, *chunk_counts)]
+            for point, right, wrong in rows:
+                counts[ResultsStore.key(point)] = [right, wrong]
+            if results is not None:
+                results.append(rows)
+
+        if workers == 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                finish(chunk, _chunk_counts(table, chunk, backend))
+        else:
+            with table.worker_pool(min(workers, len(chunks))) as executor:
+                #map hands back the chunks in order, each is stored as soon
+                #as it and the ones before it are done
+                for chunk, chunk_counts in zip(chunks, executor.map(_pool_chunk, chunks,
+                                                                    repeat(backend))):
+                    finish(chunk, chunk_counts)
+    finally:
+        if results is not None:
+            results.close()
+
+    scored = []
+    for point in points:
+        right, wrong = counts[ResultsStore.key(point)]
+        scored.append([point, get_accuracy({'Right': right, 'Wrong': wrong})])
+    return sorted(scored, key=lambda item: item[1], reverse=True)
+
+def _chunk_counts(table, chunk, backend):
+    """
+    Internal function that replays a chunk of grid points together.
+
+    :param table: GameTable to replay.
+    :param chunk: list of entities.
+    :param backend: replay backend from elo_engine.BACKENDS.
+
+    :return list: returns list of 2 items, the right counts and the wrong counts
+                  of the entities as lists of ints.
+    """
+    stats = batch_expanded_stats(chunk, table, backend)[0]
+    return [stats['Right'].tolist(), stats['Wrong'].tolist()]
+
+def _pool_chunk(chunk, backend):
+    """
+    Pool worker function that replays a chunk of grid points against the
+    shared game table.
+
+    :param chunk: list of entities.
+    :param backend: replay backend from elo_engine.BACKENDS.
+
+    :return list: returns the result of _chunk_counts().
+    """
+    return _chunk_counts(worker_table(), chunk, backend)
@@ -1,10 +1,24 @@
 """
-Module contains class for NFLTeam objects.
+Module contains class for NFLTeam objects and the LeagueState they store their
+stats in.
 
 Classes:
+    LeagueState:
+        Constructor:
+            LeagueState(list)
+
+        Attributes:
+            list team_ids
+            array elo
+            array wins
+            array losses
+            array draws
+            list curr_season
+            list teams
+
     NFLTeam:
         Constructor:
-            NFLTeam(str)
+            NFLTeam(str, LeagueState, int)
 
         Attributes:
             str team_id
@@ -13,6 +27,8 @@ Classes:
             int losses
             int draws
             str curr_season
+            np.ndarray date_history
+            np.ndarray elo_history
 
         Methods:
             add_win()
@@ -27,10 +43,97 @@ Classes:
             adj_season(str, float)
             record(str)
             get_graph_data() -> list
+
+Methods:
+    _league_column(str) -> property
+    _history_buffer(np.ndarray, int, str) -> np.ndarray
+
+Global Variables:
+    HISTORY_CAPACITY - int number of history entries a team allocates on its
+                       first record(), before the history buffers need to grow.
 """
 
+from array import array
 import numpy as np
 
+HISTORY_CAPACITY = 512
+
+class LeagueState:
+    """
+    LeagueState stores the stats of every team in a league as parallel columns
+    indexed by a dense team index, instead of one object per team. Hot loops
+    (see stat_eval.prediction_expanded_stats) index the columns directly, which
+    skips the attribute lookups and method calls of going through NFLTeam.
+
+    Usage
+    _____
+
+    Constructor: LeagueState(team_ids) creates the columns for every team_id,
+                 initialized the same way as a new NFLTeam, and an NFLTeam view
+                 for each row in self.teams.
+
+    Attributes
+    __________
+    team_ids : list
+        team_id string for each dense team index.
+    elo : array('d')
+        elo of each team.
+    wins : array('q')
+        number of wins of each team.
+    losses : array('q')
+        number of losses of each team.
+    draws : array('q')
+        number of draws of each team.
+    curr_season : list
+        season of the last game of each team, '' if it hasn't played.
+    teams : list
+        NFLTeam view of each row, indexed by dense team index.
+    """
+    def __init__(self, team_ids):
+        n_teams = len(team_ids)
+        self.team_ids = list(team_ids)
+        self.elo = array('d', [1200.0]) * n_teams
+        self.wins = array('q', [0]) * n_teams
+        self.losses = array('q', [0]) * n_teams
+        self.draws = array('q', [0]) * n_teams
+        self.curr_season = [''] * n_teams
+        self.teams = [NFLTeam(team_id, self, idx) for idx, team_id in enumerate(team_ids)]
+
+def _league_column(name):
+    """
+    Creates a property that reads and writes an NFLTeam's row of the LeagueState
+    column called name.
+
+    :param name: string name of the LeagueState column.
+
+    :return property: returns the property for the column.
+    """
+    def getter(self):
+        return getattr(self._league, name)[self._idx]
+    def setter(self, value):
+        getattr(self._league, name)[self._idx] = value
+    return property(getter, setter, doc=f"Team's row of LeagueState.{name}.")
+
+def _history_buffer(buffer, size, dtype):
+    """
+    Makes room for one more entry in an NFLTeam history buffer.
+
+    :param buffer: np.ndarray history buffer, or None if none was allocated yet.
+    :param size: int number of entries used in buffer.
+    :param dtype: dtype of the buffer.
+
+    :return np.ndarray: returns buffer if it has room, otherwise a buffer of
+                        twice the capacity (HISTORY_CAPACITY for the first one)
+                        starting with the size entries of buffer.
+    """
+    if buffer is not None and size < len(buffer):
+        return buffer
+    capacity = HISTORY_CAPACITY if buffer is None else max(2 * len(buffer), HISTORY_CAPACITY)
+    grown = np.empty(capacity, dtype=dtype)
+    if buffer is not None:
+        grown[:size] = buffer[:size]
+    return grown
+
 class NFLTeam:
     """
     Class NFLTeam is used to store data for each NFL team. NFLTeam controls the
@@ -38,12 +141,17 @@ class NFLTeam:
     current season (used for scaling elo on a season by season basis). Constructor
     takes the team_id from the data/nfl_teams data file for an id.
 
+    The stats themselves live in one row of a LeagueState, so an NFLTeam is a
+    view of that row. A team created on its own gets a single row LeagueState.
+
     Usage
     _____
 
     Constructor: NFLTeam(team_id) creates a team with initialized values and sets
                  the object's id to the input. Initializes elo to 1200 and wins,
                  losses, and draws to 0 and curr_season to ''.
+                 NFLTeam(team_id, league, idx) creates a view of row idx of an
+                 existing LeagueState instead.
 
     Most of the class's methods are getter's/setter's for data used inside the
     EloCalculator classes. Contains code for calling print() on the object to
@@ -65,6 +173,12 @@ class NFLTeam:
     curr_season : string
         string value representing the season of the last game used to change
         elo and add a win/loss/draw.
+    date_history : np.ndarray[datetime64]
+        read-only view of the dates recorded by record(). Assigning to it
+        replaces the dates with a copy of the assigned values.
+    elo_history : np.ndarray
+        read-only view of the elos recorded by record(). Assigning to it
+        replaces the elos with a copy of the assigned values.
 
     Methods
     _______
@@ -98,15 +212,58 @@ class NFLTeam:
     get_graph_data():
         returns list with self.date_history and self.elo_history.
     """
-    def __init__(self, input_id):
+    elo = _league_column('elo')
+    wins = _league_column('wins')
+    losses = _league_column('losses')
+    draws = _league_column('draws')
+    curr_season = _league_column('curr_season')
+
+    def __init__(self, input_id, league=None, idx=0):
         self.team_id = input_id #team_id from data/nfl_teams
-        self.elo = 1200
-        self.wins = 0
-        self.losses = 0
-        self.draws = 0
-        self.curr_season = ''
-        self.date_history = np.array([], dtype='datetime64')
-        self.elo_history = np.array([])
+        if league is None: #standalone team, give it a league of its own
+            league = LeagueState([input_id])
+        self._league = league
+        self._idx = idx
+        #history is kept in buffers that double in size when full, so recording
+        #a game is amortized O(1) instead of copying the whole history. most
+        #teams (e.g. the ones of every replay) never record, so the buffers are
+        #only allocated by the first record()
+        self._date_buffer, self._date_size = None, 0
+        self._elo_buffer, self._elo_size = None, 0
+
+    @property
+    def date_history(self):
+        """
+        Read-only view of the recorded dates, no copy is made.
+        """
+        if self._date_buffer is None:
+            view = np.empty(0, dtype='datetime64[D]')
+        else:
+            view = self._date_buffer[:self._date_size]
+        view.flags.writeable = False
+        return view
+
+    @date_history.setter
+    def date_history(self, value):
+        self._date_buffer = np.array(value, dtype='datetime64[D]')
+        self._date_size = len(self._date_buffer)
+
+    @property
+    def elo_history(self):
+        """
+        Read-only view of the recorded elos, no copy is made.
+        """
+        if self._elo_buffer is None:
+            view = np.empty(0)
+        else:
+            view = self._elo_buffer[:self._elo_size]
+        view.flags.writeable = False
+        return view
+
+    @elo_history.setter
+    def elo_history(self, value):
+        self._elo_buffer = np.array(value, dtype=np.float64)
+        self._elo_size = len(self._elo_buffer)
 
     def __lt__(self, other):
         """
@@ -235,14 +392,19 @@ class NFLTeam:
         Records inputed date in date_history and current elo in elo_history for
         graphing purposes.
 
-        :param date: date string where elo for the team changed.
+        :param date: date string (or np.datetime64) where elo for the team changed.
         """
-        self.date_history = np.append(self.date_history, np.datetime64(date))
-        self.elo_history = np.append(self.elo_history, self.elo)
+        self._date_buffer = _history_buffer(self._date_buffer, self._date_size, 'datetime64[D]')
+        self._elo_buffer = _history_buffer(self._elo_buffer, self._elo_size, np.float64)
+        self._date_buffer[self._date_size] = date
+        self._elo_buffer[self._elo_size] = self.elo
+        self._date_size += 1
+        self._elo_size += 1
 
     def get_graph_data(self):
         """
-        Returns self.date_history and self.elo_history for graphing.
+        Returns self.date_history and self.elo_history for graphing. Both are
+        views of the history buffers, so no data is copied.
 
         :return list: returns list filled wiith self.date_history and
                        self.elo_history.
@@ -0,0 +1,223 @@
+"""
+The param_fitter module finds values for the expanded elo functions by
+minimizing a smooth loss of the predictions with scipy.optimize, as a faster
+alternative to genetic_alg. The accuracy used as the genetic algorithm's
+fitness only changes when a prediction flips, so it can't be followed downhill;
+the log loss and Brier score of the home team's expected score change smoothly
+with every weight, so a quasi-Newton method converges in a few dozen replays
+where the genetic algorithm needs pop_size x generations of them.
+
+Usage
+-----
+Call fit_parameters() to run the fit. It starts from the standard elo values
+(or start) and returns the fitted entity in the genetic_alg layout, its loss
+and accuracy, and how many replays and how much time the fit took.
+
+'L-BFGS-B' gets its gradient by forward differences, replaying the point and
+the 5 nudged points together as one batch in elo_engine.replay(), so each
+gradient costs one batched replay. 'Nelder-Mead' replays one point at a time.
+Both keep the weights within BOUNDS, the same ranges genetic_alg draws from.
+
+With seasons, only the games of those seasons are scored. The elos still carry
+over from every earlier game, the same as SeasonCheckpoints.window_stats(), so
+backtester can fit on a window of seasons and score the seasons after it.
+
+Scaling k-factor, rating-factor and home field advantage by the same amount
+gives almost the same predictions (only the 1 - hfa of the away team's
+expected score breaks the tie), so fits from different starts can land far
+apart on that ridge with nearly equal losses. Compare fits by their ratios to
+the rating-factor rather than by the raw values.
+
+Requires scipy.
+
+Methods
+-------
+fit_parameters(list start, str objective, str method, GameTable table,
+               str backend, int max_iter, float step, tuple seasons) -> dict:
+    fits the expanded elo weights and returns the result.
+_season_range(GameTable table, tuple seasons) -> list[int, int]:
+    returns the game indexes of a range of seasons.
+_to_units(list entity) -> np.ndarray:
+    scales an entity into the unit cube the optimizer works in.
+_to_entity(np.ndarray units) -> list:
+    scales a point of the unit cube back to an entity.
+
+Global Variables
+----------------
+HAS_SCIPY: bool true if scipy is installed.
+BOUNDS: (low, high) of each weight, in entity order.
+DEFAULT_START: standard elo weights the fit starts from by default.
+OBJECTIVES: dict of objective names to their ReplayState.get_losses() key.
+METHODS: names of the supported scipy.optimize.minimize methods.
+"""
+
+import time
+import numpy as np
+from data_handler import DataHandler
+from elo_engine import replay, BACKENDS
+from stat_eval import get_accuracy
+
+try:
+    from scipy.optimize import minimize
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+BOUNDS = ((1, 1000), (50, 10000), (0, 500), (0, 1), (.01, 2))
+DEFAULT_START = [32, 400, 0, 1, 1]
+OBJECTIVES = {'log_loss': 'Log Loss', 'brier': 'Brier'}
+METHODS = ('L-BFGS-B', 'Nelder-Mead')
+
+def fit_parameters(start=None, objective='log_loss', method='L-BFGS-B', table=None,
+                   backend='numpy', max_iter=100, step=1e-3, seasons=None):
+    """
+    Fits [k-factor, rating-factor, home field advantage, seasonal scaling,
+    playoff multiplier] by minimizing objective over every game in table, or
+    over the games of seasons.
+
+    Parameters
+    ----------
+    start : list, optional
+        entity to start from. The default is DEFAULT_START.
+    objective : str, optional
+        'log_loss' or 'brier', see ReplayState.get_losses(). The default is
+        'log_loss'.
+    method : str, optional
+        scipy.optimize.minimize method from METHODS. The default is 'L-BFGS-B'.
+    table : GameTable, optional
+        games to fit on. The default is the shared DataHandler.get_game_table().
+    backend : str, optional
+        replay backend from elo_engine.BACKENDS. The default is 'numpy'.
+    max_iter : int, optional
+        most iterations the optimizer may run. The default is 100.
+    step : float, optional
+        finite difference step of the 'L-BFGS-B' gradient, as a share of each
+        weight's range in BOUNDS. The default is 1e-3.
+    seasons : tuple, optional
+        (first_season, last_season) of the games to fit on, both included.
+        The default is None, every game in table.
+
+    Raises
+    ------
+    ImportError
+        If scipy isn't installed.
+    ValueError
+        If objective, method or backend isn't supported, or seasons holds no
+        games of table.
+
+    Returns
+    -------
+    dict
+        'entity': the fitted weights, 'objective': its loss, 'accuracy': its
+        share of right predictions, 'replays': number of entities replayed
+        (comparable to the genetic algorithm's pop_size x generations),
+        'batches': number of replay() calls, 'iterations' and 'converged' from
+        the optimizer with its 'message', 'seconds' taken and the ReplayState
+        of the fitted entity after the last fitted game as 'state', to resume
+        from.
+    """
+    if not HAS_SCIPY:
+        raise ImportError("fit_parameters requires scipy")
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective expected one of {tuple(OBJECTIVES)} and "\
+                         f"received {objective!r}")
+    if method not in METHODS:
+        raise ValueError(f"method expected one of {METHODS} and received {method!r}")
+    if backend not in BACKENDS:
+        raise ValueError(f"backend expected one of {BACKENDS} and received {backend!r}")
+    if table is None:
+        table = DataHandler.get_game_table()
+    start_idx, stop_idx = _season_range(table, seasons)
+
+    counts = {'replays': 0, 'batches': 0}
+    #right count before the window and state after it of every evaluated point,
+    #so the fitted point doesn't have to be replayed again
+    fitted = {}
+    def evaluate(points):
+        entities = [_to_entity(point) for point in points]
+        before = replay(entities, table, stop=start_idx, backend=backend)
+        state = replay(entities, table, before, stop_idx, backend=backend, losses=True)
+        fitted[points[0].tobytes()] = [int(before.right[0]), state.select([0])]
+        counts['replays'] += len(points)
+        counts['batches'] += 1
+        games = stop_idx - start_idx
+        return {'Log Loss': state.log_loss / games, 'Brier': state.brier / games}
+
+    def loss(units):
+        return float(evaluate([units])[OBJECTIVES[objective]][0])
+
+    def loss_and_gradient(units):
+        #step backwards for weights at their upper bound
+        steps = np.where(units + step <= 1, step, -step)
+        points = [units] + [units + np.eye(len(units))[idx] * steps[idx]
+                            for idx in range(len(units))]
+        losses = evaluate(points)[OBJECTIVES[objective]]
+        return float(losses[0]), (losses[1:] - losses[0]) / steps
+
+    start_time = time.perf_counter()
+    bounds = [(0, 1)] * len(BOUNDS)
+    if method == 'L-BFGS-B':
+        result = minimize(loss_and_gradient, _to_units(start or DEFAULT_START), jac=True,
+                          method=method, bounds=bounds, options={'maxiter': max_iter})
+    else:
+        result = minimize(loss, _to_units(start or DEFAULT_START), method=method,
+                          bounds=bounds, options={'maxiter': max_iter})
+    seconds = time.perf_counter() - start_time
+
+    if result.x.tobytes() not in fitted:
+        evaluate([result.x])
+    right_before, state = fitted[result.x.tobytes()]
+    right = state.right[0] - right_before
+    return {'entity': _to_entity(result.x), 'objective': float(result.fun),
+            'accuracy': float(get_accuracy({'Right': right,
+                                            'Wrong': stop_idx - start_idx - right})),
+            'replays': counts['replays'], 'batches': counts['batches'],
+            'iterations': int(result.nit), 'converged': bool(result.success),
+            'message': str(result.message), 'seconds': seconds, 'state': state}
+
+def _season_range(table, seasons):
+    """
+    Internal function that finds the game indexes of a range of seasons.
+
+    :param table: GameTable to search.
+    :param seasons: (first_season, last_season) tuple, both included, or None
+                    for every game.
+
+    :return list: returns [start, stop] game indexes of the range.
+    """
+    if seasons is None:
+        start, stop = 0, len(table)
+    else:
+        first_season, last_season = seasons
+        in_range = [idx for season, idx in table.season_starts().items()
+                    if first_season <= season <= last_season]
+        start = in_range[0] if in_range else len(table)
+        stop = next((idx for season, idx in table.season_starts().items()
+                     if season > last_season), len(table))
+    if start >= stop:
+        raise ValueError(f"seasons {seasons} hold no games to fit on")
+    return [start, stop]
+
+def _to_units(entity):
+    """
+    Internal function that scales each weight of entity to [0, 1] within BOUNDS,
+    so a step of the optimizer means the same for every weight.
+
+    :param entity: list of weights.
+
+    :return np.ndarray: returns the scaled weights.
+    """
+    low, high = np.array(BOUNDS, dtype=float).T
+    return (np.asarray(entity, dtype=float) - low) / (high - low)
+
+def _to_entity(units):
+    """
+    Internal function that scales a point of the unit cube back to weights,
+    clipped to BOUNDS.
+
+    :param units: np.ndarray of scaled weights.
+
+    :return list: returns list of weights in the genetic_alg entity layout.
+    """
+    low, high = np.array(BOUNDS, dtype=float).T
+    return (low + np.clip(units, 0, 1) * (high - low)).tolist()
@@ -0,0 +1,149 @@
+"""
+The results_store module contains the ResultsStore class used by grid_search to
+keep the right/wrong prediction counts of every evaluated grid point on disk,
+so an interrupted sweep can carry on without replaying the points it finished.
+
+Classes:
+    ResultsStore:
+        Constructor:
+            ResultsStore(str, str)
+
+        Attributes:
+            str path
+            str dataset_hash
+
+        Methods:
+            finished() -> dict
+            append(list)
+            close()
+            static key(list) -> tuple
+
+Global Variables:
+    STORE_VERSION - int version of the store's table layout.
+    GENES - names of the entity genes, the store's key columns.
+"""
+
+import sqlite3
+from errors import DatasetMismatchError
+
+STORE_VERSION = 1
+GENES = ('k', 'rating_factor', 'hfa', 'season_scale', 'playoff_multiplier', 'mov')
+
+class ResultsStore:
+    """
+    Append-only SQLite table of entity -> right/wrong prediction counts. Rows
+    are only ever inserted, one transaction per append(), so a sweep killed
+    part way keeps every chunk it finished and never leaves a half written
+    chunk behind. Like FitnessCache, every store is tied to the digest of the
+    GameTable its counts were replayed from.
+
+    Usage
+    _____
+
+    Constructor: ResultsStore(path, dataset_hash) opens the store at path,
+                 creating it if it doesn't exist. Use it as a context manager
+                 or call close() when done.
+
+    Call finished() to get the entities already evaluated and append() to
+    add newly evaluated ones.
+
+    Attributes
+    __________
+    path : string
+        path of the SQLite file.
+    dataset_hash : string
+        GameTable.digest() of the data the counts were replayed from.
+
+    Methods
+    _______
+    finished():
+        returns dict of every stored entity's key to its [right, wrong] counts.
+    append(list rows):
+        stores rows of [entity, right, wrong].
+    close():
+        closes the database connection.
+    key(list entity):
+        returns the hashable key of entity used by finished().
+    """
+    def __init__(self, path, dataset_hash):
+        """
+        Constructor
+
+        :param path: string path of the SQLite file.
+        :param dataset_hash: GameTable.digest() of the current data.
+
+        :raises DatasetMismatchError: if the store at path was made for
+                                      another dataset.
+        :raises ValueError: if the store at path has another STORE_VERSION.
+        """
+        self.path = path
+        self.dataset_hash = dataset_hash
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY,"
+                                     " value TEXT)")
+            self._connection.execute("INSERT OR IGNORE INTO meta VALUES ('version', ?), "
+                                     "('dataset_hash', ?)", (str(STORE_VERSION), dataset_hash))
+            columns = ', '.join(f'{gene} REAL' for gene in GENES)
+            self._connection.execute(f"CREATE TABLE IF NOT EXISTS results ({columns},"
+                                     f" right INTEGER, wrong INTEGER,"
+                                     f" PRIMARY KEY ({', '.join(GENES)}))")
+        meta = dict(self._connection.execute("SELECT name, value FROM meta"))
+        if meta['version'] != str(STORE_VERSION):
+            self.close()
+            raise ValueError(f"{path} has store version {meta['version']}, "\
+                             f"expected {STORE_VERSION}")
+        if meta['dataset_hash'] != dataset_hash:
+            self.close()
+            raise DatasetMismatchError(dataset_hash, meta['dataset_hash'], path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def finished(self):
+        """
+        Reads every entity already in the store.
+
+        :returns dict: returns dict of entity keys (see key) to lists of
+                       [right, wrong] counts.
+        """
+        columns = ', '.join(GENES)
+        return {ResultsStore.key(row[:len(GENES)]): list(row[len(GENES):])
+                for row in self._connection.execute(f"SELECT {columns}, right, wrong"
+                                                    " FROM results")}
+
+    def append(self, rows):
+        """
+        Stores the counts of newly evaluated entities in a single transaction.
+        Entities that are already stored keep their first counts.
+
+        :param rows: list of [entity, right, wrong], entity being a list of
+                     values for GENES.
+        """
+        with self._connection:
+            self._connection.executemany(
+                f"INSERT OR IGNORE INTO results VALUES ({', '.join('?' * (len(GENES) + 2))})",
+                [(*ResultsStore.key(entity), int(right), int(wrong))
+                 for entity, right, wrong in rows])
+
+    def close(self):
+        """
+        Closes the database connection. The stored rows are already committed.
+        """
+        self._connection.close()
+
+    @staticmethod
+    def key(entity):
+        """
+        Returns the hashable key used for entity. Values are stored as sqlite
+        REALs, which round trip python floats exactly, so a point read back
+        compares equal to the point that was stored.
+
+        :param entity: list of values for GENES.
+
+        :returns tuple: returns the values as a tuple of floats.
+        """
+        return tuple(float(value) for value in entity)
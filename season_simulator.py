@@ -0,0 +1,284 @@
+"""
+The season_simulator module plays out the not-yet played games at the end of
+the GAMES_FILE thousands of times to estimate each team's chance of making the
+playoffs and of getting each playoff seed.
+
+The ratings are the final elos of prediction_expanded_stats with the given
+parameters. Every remaining game is won by the home team with the
+EloCalculator.expanded_expected chance. The simulations are cold, the ratings
+don't change during a simulated season, so every game's chance is calculated
+once, with EloCalculator.expanded_expected_array, and the simulations are
+drawn as one (simulations x games) array. The
+simulations are split into blocks of SIM_BLOCK, each with its own random
+stream spawned from one SeedSequence, so the results only depend on the seed
+and not on the number of worker processes.
+
+Seeding follows the NFL format per conference: the division winners get the
+top seeds ordered by wins, then the best remaining teams get the wildcard
+seeds. Ties in the standings are broken at random instead of with the NFL's
+tiebreakers.
+
+Methods
+-------
+simulate_season(int, int, int, float, float, int, int, int, int, int, str) -> dict:
+    simulates the remaining schedule and returns each team's playoff and seed
+    chances.
+print_simulation(dict results) -> none:
+    prints the results of simulate_season() to console, one team per line.
+_season_ratings(GameTable table, list schedule, list entity, str backend) -> np.ndarray:
+    returns every team's elo going into the remaining schedule.
+_played_wins(GameTable table, int season) -> np.ndarray:
+    returns every team's wins in the already played games of season.
+_conferences(GameTable table) -> dict:
+    returns the dense team indexes of every division, grouped by conference.
+_simulate_block(list args) -> list[np.ndarray, np.ndarray]:
+    runs one block of simulations and returns the seed counts and total wins.
+_seed_conference(np.ndarray score, list divisions, int playoff_teams) -> np.ndarray:
+    returns the seeded teams of one conference in every simulation.
+
+Global Variables
+----------------
+SIM_BLOCK: number of simulations drawn at once, bounds the memory used.
+TIEBREAK: size of the random amount added to wins to break ties, smaller than
+          the half win of a draw.
+"""
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from data_handler import DataHandler
+from elo_calculator import EloCalculator as ec
+from elo_calculator import HOME_WIN, HOME_DRAW
+from errors import InputTooSmallError
+from stat_eval import prediction_expanded_stats
+
+SIM_BLOCK = 10000
+TIEBREAK = .25
+
+def simulate_season(k=32, rating_factor=400, hfa_val=0, season_scale=1, playoff_multiplier=1,
+                    mov=0, n_sims=10000, workers=1, seed=None, playoff_teams=7, backend='python'):
+    """
+    Simulates the not-yet played games at the end of the GAMES_FILE n_sims
+    times using the elos from prediction_expanded_stats with the given
+    parameters. Games of the same season that were already played count
+    towards the standings.
+
+    Parameters
+    ----------
+    k, rating_factor, hfa_val, season_scale, playoff_multiplier, mov : optional
+        elo parameters passed to prediction_expanded_stats, see there. The
+        defaults are the same, and like there a genetic_alg entity can be
+        passed as simulate_season(*entity).
+    n_sims : int, optional
+        number of simulated seasons. The default is 10000.
+    workers : int, optional
+        number of processes the simulation blocks are spread over, 1 runs them
+        in this process. The default is 1.
+    seed : int, optional
+        seed of the SeedSequence the random streams are spawned from. The
+        default is None.
+    playoff_teams : int, optional
+        playoff seeds per conference, must be at least the number of divisions
+        in a conference. The default is 7.
+    backend : str, optional
+        backend of prediction_expanded_stats, one of stat_eval.BACKENDS. The
+        default is 'python'.
+
+    Raises
+    ------
+    InputTooSmallError
+        If n_sims or workers is below 1, or playoff_teams is below the number
+        of divisions in a conference.
+    ValueError
+        If there are no unplayed games in the GAMES_FILE.
+
+    Returns
+    -------
+    dict
+        dict of team_id keys to a dict of the team's 'conference', 'division',
+        'mean_wins', 'playoffs' chance and list of 'seeds' chances, seed 1
+        first. Only teams in a division are included.
+    """
+    if n_sims < 1:
+        raise InputTooSmallError(n_sims, 1, 'n_sims')
+    if workers < 1:
+        raise InputTooSmallError(workers, 1, 'workers')
+
+    schedule = list(DataHandler.iter_schedule())
+    if not schedule:
+        raise ValueError("GAMES_FILE has no unplayed games to simulate")
+    table = DataHandler.get_game_table()
+    conferences = _conferences(table)
+    for name, divisions in conferences.items():
+        if playoff_teams < len(divisions):
+            raise InputTooSmallError(playoff_teams, len(divisions), f'playoff_teams ({name})')
+
+    home = table.team_index.ids_of([game.home for game in schedule])
+    away = table.team_index.ids_of([game.away for game in schedule])
+    elos = _season_ratings(table, schedule, [k, rating_factor, hfa_val, season_scale,
+                                             playoff_multiplier, mov], backend)
+    neutral = np.array([game.neutral for game in schedule])
+    chances = ec.expanded_expected_array(elos[home], elos[away], rating_factor,
+                                         np.where(neutral, 0, hfa_val))
+    base_wins = _played_wins(table, schedule[0].season)
+
+    sizes = [min(SIM_BLOCK, n_sims - start) for start in range(0, n_sims, SIM_BLOCK)]
+    streams = np.random.SeedSequence(seed).spawn(len(sizes))
+    blocks = [[chances, home, away, base_wins, list(conferences.values()), playoff_teams,
+               size, stream] for size, stream in zip(sizes, streams)]
+    if workers == 1:
+        outputs = list(map(_simulate_block, blocks))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(blocks))) as executor:
+            outputs = list(executor.map(_simulate_block, blocks))
+    seed_counts = sum(output[0] for output in outputs)
+    total_wins = sum(output[1] for output in outputs)
+
+    results = {}
+    for name, divisions in conferences.items():
+        for division, teams in divisions.items():
+            for team in teams.tolist():
+                seeds = seed_counts[team] / n_sims
+                results[table.team_ids[team]] = {
+                    'conference': name, 'division': division,
+                    'mean_wins': float(total_wins[team] / n_sims),
+                    'playoffs': float(seeds.sum()), 'seeds': seeds.tolist()}
+    return results
+
+def print_simulation(results):
+    """
+    Prints the results of simulate_season() to console, grouped by division
+    and sorted by playoff chance.
+
+    :param results: dict returned by simulate_season().
+    """
+    by_division = {}
+    for team_id, result in results.items():
+        by_division.setdefault(result['division'], []).append((team_id, result))
+    for division in sorted(by_division):
+        print(division)
+        for team_id, result in sorted(by_division[division], key=lambda item: -item[1]['playoffs']):
+            seeds = ' '.join(f'{chance:6.1%}' for chance in result['seeds'])
+            print(f"    {team_id:<4} wins {result['mean_wins']:5.2f}  "
+                  f"playoffs {result['playoffs']:6.1%}  seeds {seeds}")
+
+def _season_ratings(table, schedule, entity, backend):
+    """
+    Internal function that replays the played games with
+    prediction_expanded_stats and returns every team's elo going into the
+    remaining schedule. Teams whose last game was in an earlier season are
+    scaled towards 1200 as NFLTeam.adj_season would at their next game.
+
+    :param table: the shared GameTable.
+    :param schedule: list of Games from DataHandler.iter_schedule().
+    :param entity: list of [k, rating_factor, hfa_val, season_scale,
+                   playoff_multiplier, mov] elo parameters.
+    :param backend: backend of prediction_expanded_stats.
+
+    :return np.ndarray: returns float array of elos, indexed by dense team index.
+    """
+    teams = prediction_expanded_stats(*entity, backend=backend)[1]
+    season_scale = entity[3]
+    elos = np.empty(table.n_teams)
+    for name, idx in table.name_to_idx.items():
+        team = teams[name]
+        elos[idx] = team.elo
+        if team.curr_season not in ('', schedule[0].season):
+            elos[idx] = 1200 + (team.elo - 1200) * season_scale
+    return elos
+
+def _played_wins(table, season):
+    """
+    Internal function that counts every team's wins in the games of season that
+    were already played. A draw counts as half a win.
+
+    :param table: the shared GameTable.
+    :param season: int season being simulated.
+
+    :return np.ndarray: returns float array of wins, indexed by dense team index.
+    """
+    played = table.season == season
+    home_score = np.where(table.result[played] == HOME_WIN, 1.0,
+                          np.where(table.result[played] == HOME_DRAW, .5, 0.0))
+    wins = np.bincount(table.home[played], home_score, minlength=table.n_teams)
+    wins += np.bincount(table.away[played], 1 - home_score, minlength=table.n_teams)
+    return wins
+
+def _conferences(table):
+    """
+    Internal function that groups the teams in DataHandler.get_divisions() by
+    division and conference. The conference is the first word of the division,
+    e.g. 'NFC' for 'NFC West'.
+
+    :param table: the shared GameTable.
+
+    :return dict: returns dict of conference keys to dicts of division keys to
+                  int arrays of dense team indexes.
+    """
+    conferences = {}
+    for team_id, division in sorted(DataHandler.get_divisions().items()):
+        if team_id not in table.team_index:
+            continue
+        divisions = conferences.setdefault(division.split()[0], {})
+        divisions.setdefault(division, []).append(table.team_index.id_of(team_id))
+    return {name: {division: np.array(teams) for division, teams in sorted(divisions.items())}
+            for name, divisions in sorted(conferences.items())}
+
+def _simulate_block(args):
+    """
+    Internal function that simulates one block of seasons. Module level so it
+    can be sent to worker processes.
+
+    :param args: list of [np.ndarray chances, np.ndarray home, np.ndarray away,
+                 np.ndarray base_wins, list conferences, int playoff_teams,
+                 int n_sims, SeedSequence stream], see simulate_season().
+
+    :return list: returns list of 2 items. First is the (n_teams x playoff_teams)
+                  int array of how often each team got each seed, second is the
+                  float array of each team's wins summed over the simulations.
+    """
+    chances, home, away, base_wins, conferences, playoff_teams, n_sims, stream = args
+    rng = np.random.default_rng(stream)
+    n_teams = len(base_wins)
+
+    #(games x teams) one-hot matrices so the standings are two matrix products
+    home_hot = np.zeros((len(home), n_teams))
+    home_hot[np.arange(len(home)), home] = 1
+    away_hot = np.zeros((len(away), n_teams))
+    away_hot[np.arange(len(away)), away] = 1
+
+    home_won = (rng.random((n_sims, len(chances))) < chances).astype(float)
+    wins = base_wins + home_won @ home_hot + (1 - home_won) @ away_hot
+    score = wins + rng.random(wins.shape) * TIEBREAK
+
+    seed_counts = np.zeros((n_teams, playoff_teams), dtype=np.int64)
+    for divisions in conferences:
+        seeds = _seed_conference(score, list(divisions.values()), playoff_teams)
+        np.add.at(seed_counts, (seeds, np.arange(playoff_teams)), 1)
+    return [seed_counts, wins.sum(axis=0)]
+
+def _seed_conference(score, divisions, playoff_teams):
+    """
+    Internal function that seeds one conference in every simulation. Division
+    winners are seeded first by score, the remaining seeds go to the highest
+    scoring other teams of the conference.
+
+    :param score: (n_sims x n_teams) float array of wins plus tiebreak.
+    :param divisions: list of int arrays of the dense team indexes of each
+                      division in the conference.
+    :param playoff_teams: int number of seeds.
+
+    :return np.ndarray: returns (n_sims x playoff_teams) int array of the dense
+                        team index holding each seed.
+    """
+    winners = np.stack([teams[np.argmax(score[:, teams], axis=1)] for teams in divisions],
+                       axis=1)
+    order = np.argsort(-np.take_along_axis(score, winners, axis=1), axis=1)
+    winners = np.take_along_axis(winners, order, axis=1)
+
+    teams = np.concatenate(divisions)
+    is_winner = np.zeros(score.shape, dtype=bool)
+    np.put_along_axis(is_winner, winners, True, axis=1)
+    others = np.where(is_winner, -math.inf, score)[:, teams]
+    wildcards = teams[np.argsort(-others, axis=1)[:, :playoff_teams - len(divisions)]]
+    return np.concatenate((winners, wildcards), axis=1)
@@ -18,21 +18,45 @@ prediction_basic_stats() -> list[dict, dict]:
     of right/wrong predictions and updates each nfl_team's elo after each game
     using the basic standard elo calculation. Once completed, returns a dict of
     right/wrong predictions and the teams dict with updated nfl_teams.
-prediction_expanded_stats(int, int, int, float, float) -> list[dict, dict]:
+prediction_expanded_stats(int, int, int, float, float, int, str) -> list[dict, dict]:
     iterates through all the games and predicts winners based on the teams elo,
     then compares the end result to the prediction. The function monitors the num
     of right/wrong predictions and updates each nfl_team's elo after each game
     using the expanded elo calculation with the input parameters. Once
     completed, returns a dict of right/wrong predictions and the teams dict with
     updated nfl_teams.
+_prediction_expanded_replay(list entity, str backend) -> list[dict, dict]:
+    numpy and numba backends of prediction_expanded_stats.
+_add_records(GameTable table, LeagueState league) -> none:
+    adds every team's wins, losses and draws in the games to the league.
 get_accuracy(dict stats) -> float:
     takes in a dict of 'Right' and 'Wrong' values and returns the percentage of
     right predictions.
+get_log_loss(np.ndarray expected, np.ndarray results) -> float:
+    returns the mean log loss of the home team's expected scores.
+get_brier(np.ndarray expected, np.ndarray results) -> float:
+    returns the mean squared error of the home team's expected scores.
+get_calibration(np.ndarray expected, np.ndarray results, int bins) -> dict:
+    returns the reliability histogram of the home team's expected scores.
+_probability_stats(np.ndarray expected, np.ndarray results) -> dict:
+    returns the log loss, Brier score and calibration of a replay's expected
+    scores.
+
+Global Variables
+----------------
+BACKENDS: names of the prediction_expanded_stats backends, 'python' and the
+          elo_engine.BACKENDS.
 """
 
 from data_handler import DataHandler
 from elo_calculator import EloCalculator as ec
 from elo_calculator import HOME_WIN, HOME_LOSS, HOME_DRAW
+import numpy as np
+from elo_engine import replay
+from elo_engine import BACKENDS as REPLAY_BACKENDS
+from elo_kernel import HAS_NUMBA, MIN_EXPECTED
+
+BACKENDS = ('python',) + REPLAY_BACKENDS
 
 def calc_win_loss():
     """
@@ -41,35 +65,15 @@ def calc_win_loss():
     number of games and amount of draws and prints them to the console.
     """
     #init data
-    teams = DataHandler.get_teams()
-    games = DataHandler.get_games_file_data()
-    draw_cnt = 0
-    game_cnt = 0
-
-    for game in games:
-        #get team ids for both teams
-        team_home = teams[game['team_home']]
-        team_away = teams[game['team_away']]
-
-        #calc if home win, draw, or home loss
-        if game['score_home'] == game['score_away']:
-            team_home.add_draw()
-            team_away.add_draw()
-            draw_cnt += 1
-        elif game['score_home'] > game['score_away']:
-            team_home.add_win()
-            team_away.add_loss()
-        else:
-            team_home.add_loss()
-            team_away.add_win()
-        game_cnt += 1
+    table = DataHandler.get_game_table()
+    league = table.new_teams()[1]
+    _add_records(table, league)
 
-    #get team classes from dict, get unique classes by converting to set, then
-    #resort to get alphabetical order by team id
-    for team in sorted(set(teams.values())):
+    #resort the league's teams to get alphabetical order by team id
+    for team in sorted(league.teams):
         print(team)
 
-    print(f"Total Games: {game_cnt}\t\tTotal Draws: {draw_cnt}")
+    print(f"Total Games: {len(table)}\t\tTotal Draws: {sum(league.draws) // 2}")
 
 #calc elo using inputed fn
 def calc_end_elo(eval_fn):
@@ -90,35 +94,19 @@ def calc_end_elo(eval_fn):
         Prints the str value of each nfl_team object to console.
 
     """
-    teams = DataHandler.get_teams()
-    games = DataHandler.get_games_file_data()
-
-    for game in games:
-        #get team ids for both teams
-        team_home = teams[game['team_home']]
-        team_away = teams[game['team_away']]
-
-        #calc if home win, draw, or home loss
-        if game['score_home'] == game['score_away']:
-            team_home.add_draw() #for __str__
-            team_away.add_draw() #for __str__
-            result = HOME_DRAW
-        elif game['score_home'] > game['score_away']:
-            team_home.add_win() #for __str__
-            team_away.add_loss() #for __str__
-            result = HOME_WIN
-        else:
-            team_home.add_loss() #for __str__
-            team_away.add_win() #for __str__
-            result = HOME_LOSS
-
-        changes = eval_fn(team_home.elo, team_away.elo, result)
-        team_home.inc_elo(changes['Home Change'])
-        team_away.inc_elo(changes['Away Change'])
-
-    #get team classes from dict, get unique classes by converting to set, then
-    #resort to get alphabetical order by team id
-    for team in sorted(set(teams.values())):
+    table = DataHandler.get_game_table()
+    league = table.new_teams()[1]
+    _add_records(table, league) #for __str__
+    elos = league.elo
+
+    for home, away, result in zip(table.home.tolist(), table.away.tolist(),
+                                  table.result.tolist()):
+        changes = eval_fn(elos[home], elos[away], result)
+        elos[home] += changes['Home Change']
+        elos[away] += changes['Away Change']
+
+    #resort the league's teams to get alphabetical order by team id
+    for team in sorted(league.teams):
         print(team)
 
 def prediction_basic_stats():
@@ -133,58 +121,69 @@ def prediction_basic_stats():
     -------
     list
         returns list of 2 items. First is a dict of 'Right'ly predicted games and
-        'Wrong'ly predicted games. Second is the dict of 'team_name's to nfl_teams.
+        'Wrong'ly predicted games, plus the 'Log Loss', 'Brier' and 'Calibration'
+        of the home team's expected scores (see _probability_stats). Second is
+        the dict of 'team_name's to nfl_teams.
     """
-    teams = DataHandler.get_teams()
-    games = DataHandler.get_games_file_data()
+    table = DataHandler.get_game_table()
+    teams, league = table.new_teams()
+    _add_records(table, league)
     result_stats = {"Right": 0, "Wrong": 0}
+    #filled in the loop, the probabilistic stats are reduced from it at the end
+    expected = np.empty(len(table))
 
-    for game in games:
-        #get team ids for both teams
-        team_home = teams[game['team_home']]
-        team_away = teams[game['team_away']]
-
-        game['Prediction'] = HOME_WIN if ec.basic_expected(team_home.get_elo(),\
-                             team_away.get_elo()) >= .5 else HOME_LOSS
-
-        #calc if home win, draw, or home loss
-        if game['score_home'] == game['score_away']:
-            game['Result'] = HOME_DRAW
-            team_home.add_draw()
-            team_away.add_draw()
-        elif game['score_home'] > game['score_away']:
-            game['Result'] = HOME_WIN
-            team_home.add_win()
-            team_away.add_loss()
-        else:
-            game['Result'] = HOME_LOSS
-            team_home.add_loss()
-            team_away.add_win()
+    #league columns, as in prediction_expanded_stats
+    elos, views = league.elo, league.teams
+    for idx, (home, away, result, date) in enumerate(zip(table.home.tolist(),
+            table.away.tolist(), table.result.tolist(), table.date)):
+        home_expected = ec.basic_expected(elos[home], elos[away])
+        expected[idx] = home_expected
+        prediction = HOME_WIN if home_expected >= .5 else HOME_LOSS
 
-        changes = ec.basic_elo_change(team_home.get_elo(), team_away.get_elo(),\
-                                      game['Result'])
-        team_home.inc_elo(changes['Home Change'])
-        team_away.inc_elo(changes['Away Change'])
+        changes = ec.basic_elo_change(elos[home], elos[away], result)
+        elos[home] += changes['Home Change']
+        elos[away] += changes['Away Change']
 
-        team_home.record(game['schedule_date'])
-        team_away.record(game['schedule_date'])
+        views[home].record(date)
+        views[away].record(date)
 
-        if game['Prediction'] == game['Result']:
+        if prediction == result:
             result_stats["Right"] += 1
         else:
             result_stats["Wrong"] += 1
 
+    result_stats.update(_probability_stats(expected, table.result))
     return [result_stats, teams]
 
+def _add_records(table, league):
+    """
+    Internal function that adds every team's wins, losses and draws in table to
+    league, counted per dense team index instead of game by game.
+
+    :param table: GameTable of the games to count.
+    :param league: LeagueState of table.new_teams() to add the counts to.
+    """
+    def counts(home_result, away_result):
+        return np.bincount(table.home[table.result == home_result], minlength=table.n_teams)\
+               + np.bincount(table.away[table.result == away_result], minlength=table.n_teams)
+
+    for column, home_result, away_result in ((league.wins, HOME_WIN, HOME_LOSS),
+                                             (league.losses, HOME_LOSS, HOME_WIN),
+                                             (league.draws, HOME_DRAW, HOME_DRAW)):
+        for idx, count in enumerate(counts(home_result, away_result).tolist()):
+            column[idx] += count
+
 def prediction_expanded_stats(k=32, rating_factor=400, hfa_val=0,\
-                                         season_scale=1, playoff_multiplier=1):
+                              season_scale=1, playoff_multiplier=1, mov=0, *, backend='python'):
     """
     Prediction expanded stats is the function that is based off elo, but with
     additional parameters to try to find the model where the teams' elo most
     accurately predicts the winner of a game. If no parameters are supplied,
-    it will run the standard elo calculation with the default values.
+    it will run the standard elo calculation with the default values. The
+    parameters are in the genetic_alg entity order, so
+    prediction_expanded_stats(*entity) replays an entity.
 
-    Function runs through all games imported from the games file and predicts
+    Function runs through all games in the shared GameTable and predicts
     the winner then records if the prediction was right or not. The fn then
     returns the results at the end.
 
@@ -201,53 +200,117 @@ def prediction_expanded_stats(k=32, rating_factor=400, hfa_val=0,\
     playoff_multiplier : float, optional
         float multiplier applied to elos if the game is a playoff game. The
         default is 1.
+    mov : int, optional
+        1 to scale every elo change by the margin of victory multiplier of
+        EloCalculator.mov_multiplier(), 0 to leave it out. The default is 0.
+    backend : str, optional, keyword only
+        'python' to replay the games in the python loop below, or one of
+        elo_engine.BACKENDS to replay them with elo_engine.replay(), 'numba'
+        being the compiled elo_kernel. 'numba' falls back to 'python' if numba
+        isn't installed. All give identical results. The default is 'python'.
+
+    Raises
+    ------
+    ValueError
+        If backend isn't one of BACKENDS.
 
     Returns
     -------
     list
         returns list of 2 items. First is a dict of 'Right'ly predicted games and
-        'Wrong'ly predicted games. Second is the dict of 'team_name's to nfl_teams.
+        'Wrong'ly predicted games, plus the 'Log Loss', 'Brier' and 'Calibration'
+        of the home team's expected scores (see _probability_stats). Second is
+        the dict of 'team_name's to nfl_teams.
     """
-    teams = DataHandler.get_teams()
-    games = DataHandler.get_games_file_data()
+    if backend not in BACKENDS:
+        raise ValueError(f"backend expected one of {BACKENDS} and received {backend!r}")
+    if backend == 'numpy' or (backend == 'numba' and HAS_NUMBA):
+        return _prediction_expanded_replay([k, rating_factor, hfa_val, season_scale,\
+                                            playoff_multiplier, mov], backend)
+
+    table = DataHandler.get_game_table()
+    teams, league = table.new_teams()
     result_stats = {"Right": 0, "Wrong": 0}
 
-    for game in games:
-        #get team ids for both teams
-        team_home = teams[game['team_home']]
-        team_away = teams[game['team_away']]
-        playoff_bonus = playoff_multiplier if game['schedule_playoff'] else 0
-
-        for team in [team_home, team_away]:
-            team.adj_season(game['schedule_season'], season_scale)
+    #schedule_playoff used to be checked as the raw 'TRUE'/'FALSE' csv string,
+    #which is always truthy, so the multiplier has always applied to every game.
+    #kept that way so accuracies and already tuned weights don't change.
+    playoff_bonus = playoff_multiplier
+
+    #plain lists index faster than numpy arrays inside a python loop, which is
+    #why elo_engine._replay_games converts its columns too
+    homes, aways = table.home.tolist(), table.away.tolist()
+    seasons, neutrals = table.season.tolist(), table.neutral.tolist()
+    results = table.result.tolist()
+    margins = (table.score_home.astype(int) - table.score_away).tolist() if mov\
+              else [None] * len(table)
+    #work on the league's columns directly, the NFLTeams in teams are views of them
+    elos, curr_seasons = league.elo, league.curr_season
+    #filled in the loop, the probabilistic stats are reduced from it at the end
+    expected = np.empty(len(table))
+
+    for idx, (home, away, season, neutral, result, margin) in\
+        enumerate(zip(homes, aways, seasons, neutrals, results, margins)):
+        #same as NFLTeam.adj_season
+        for team in (home, away):
+            if curr_seasons[team] != season:
+                if curr_seasons[team] != '':
+                    elos[team] = 1200 + (elos[team] - 1200) * season_scale
+                curr_seasons[team] = season
 
         #if the stadium benefits the home team take value
-        hfa = hfa_val if game['stadium_neutral'] == "FALSE" else 0
+        hfa = 0 if neutral else hfa_val
+        home_elo, away_elo = elos[home], elos[away]
 
         #calculate predicted winner
-        if ec.expanded_expected(team_home.get_elo(), team_away.get_elo(), rating_factor, hfa) >= .5:
-            game['Prediction'] = HOME_WIN
-        else:
-            game['Prediction'] = HOME_LOSS
-
-        #calc if home win, draw, or home loss
-        if game['score_home'] == game['score_away']:
-            game['Result'] = HOME_DRAW
-        elif game['score_home'] > game['score_away']:
-            game['Result'] = HOME_WIN
+        home_expected = ec.expanded_expected(home_elo, away_elo, rating_factor, hfa)
+        expected[idx] = home_expected
+        if home_expected >= .5:
+            prediction = HOME_WIN
         else:
-            game['Result'] = HOME_LOSS
+            prediction = HOME_LOSS
 
-        changes = ec.expanded_elo_change(team_home.get_elo(),\
-             team_away.get_elo(), game['Result'], k, rating_factor, hfa, playoff_bonus)
-        team_home.inc_elo(changes['Home Change'])
-        team_away.inc_elo(changes['Away Change'])
+        changes = ec.expanded_elo_change(home_elo, away_elo, result, k,\
+                                         rating_factor, hfa, playoff_bonus, margin)
+        elos[home] += changes['Home Change']
+        elos[away] += changes['Away Change']
 
-        if game['Prediction'] == game['Result']:
+        if prediction == result:
             result_stats["Right"] += 1
         else:
             result_stats["Wrong"] += 1
 
+    result_stats.update(_probability_stats(expected, table.result))
+    return [result_stats, teams]
+
+def _prediction_expanded_replay(entity, backend):
+    """
+    Numpy and numba backends of prediction_expanded_stats. Replays the games
+    with elo_engine.replay() and copies the final elos and seasons into a new
+    league.
+
+    Parameters
+    ----------
+    entity : list
+        [k, rating_factor, hfa_val, season_scale, playoff_multiplier, mov].
+    backend : str
+        replay backend from elo_engine.BACKENDS.
+
+    Returns
+    -------
+    list
+        same as prediction_expanded_stats.
+    """
+    table = DataHandler.get_game_table()
+    expected = np.empty((len(table), 1))
+    state = replay([entity], table, backend=backend, probabilities=expected)
+    teams, league = table.new_teams()
+    for idx in range(table.n_teams):
+        league.elo[idx] = state.elos[idx, 0]
+        if state.curr_seasons[idx] is not None:
+            league.curr_season[idx] = state.curr_seasons[idx]
+    result_stats = {"Right": int(state.right[0]), "Wrong": int(state.position - state.right[0])}
+    result_stats.update(_probability_stats(expected[:, 0], table.result))
     return [result_stats, teams]
 
 def get_accuracy(stats):
@@ -267,3 +330,94 @@ def get_accuracy(stats):
 
     """
     return stats["Right"] / (stats["Right"] + stats["Wrong"])
+
+def get_log_loss(expected, results):
+    """
+    Calculates the mean log loss of the home team's expected scores. A home
+    win scores 1, a loss 0 and a draw .5, the same as the elo updates.
+
+    Parameters
+    ----------
+    expected : np.ndarray
+        home team's expected score of each game, games along the first axis.
+    results : np.ndarray
+        HOME_WIN, HOME_LOSS or HOME_DRAW of each game.
+
+    Returns
+    -------
+    float
+        mean log loss, or an array of one per column if expected is 2d.
+    """
+    scores = ec.result_scores(np.asarray(results)).reshape((-1,) + (1,) * (np.ndim(expected) - 1))
+    clipped = np.clip(expected, MIN_EXPECTED, 1 - MIN_EXPECTED)
+    return -np.mean(scores * np.log(clipped) + (1 - scores) * np.log(1 - clipped), axis=0)
+
+def get_brier(expected, results):
+    """
+    Calculates the Brier score, the mean squared error of the home team's
+    expected scores.
+
+    Parameters
+    ----------
+    expected : np.ndarray
+        home team's expected score of each game, games along the first axis.
+    results : np.ndarray
+        HOME_WIN, HOME_LOSS or HOME_DRAW of each game.
+
+    Returns
+    -------
+    float
+        mean squared error, or an array of one per column if expected is 2d.
+    """
+    scores = ec.result_scores(np.asarray(results)).reshape((-1,) + (1,) * (np.ndim(expected) - 1))
+    return np.mean((np.asarray(expected) - scores) ** 2, axis=0)
+
+def get_calibration(expected, results, bins=10):
+    """
+    Builds the reliability histogram of the home team's expected scores. The
+    games are split into equal width bins of expected score, and each bin's
+    mean expected score is compared with the mean score the home team really
+    got. A well calibrated model has the two close in every bin.
+
+    Parameters
+    ----------
+    expected : np.ndarray
+        home team's expected score of each game.
+    results : np.ndarray
+        HOME_WIN, HOME_LOSS or HOME_DRAW of each game.
+    bins : int, optional
+        number of bins over [0, 1]. The default is 10.
+
+    Returns
+    -------
+    dict
+        dict with 'Low' and 'High' edges of each bin, the number of 'Games' in
+        it, their mean 'Expected' score and mean 'Observed' score (nan for
+        empty bins).
+    """
+    expected = np.asarray(expected, dtype=np.float64)
+    scores = ec.result_scores(np.asarray(results))
+    edges = np.linspace(0, 1, bins + 1)
+    idx = np.clip((expected * bins).astype(np.int64), 0, bins - 1)
+    games = np.bincount(idx, minlength=bins)
+    with np.errstate(invalid='ignore'):
+        return {'Low': edges[:-1], 'High': edges[1:], 'Games': games,
+                'Expected': np.bincount(idx, expected, minlength=bins) / games,
+                'Observed': np.bincount(idx, scores, minlength=bins) / games}
+
+def _probability_stats(expected, results):
+    """
+    Internal function that reduces the home team's expected score of every game
+    of a replay to the probabilistic stats added to the 'Right'/'Wrong' counts.
+    Unlike the counts, a draw isn't always wrong: it scores .5, so a close
+    prediction of a draw loses little.
+
+    :param expected: float array of the home team's expected score of each game.
+    :param results: array of HOME_WIN, HOME_LOSS or HOME_DRAW of each game.
+
+    :return dict: returns dict with the 'Log Loss' and 'Brier' floats and the
+                  'Calibration' dict of get_calibration().
+    """
+    return {"Log Loss": float(get_log_loss(expected, results)),
+            "Brier": float(get_brier(expected, results)),
+            "Calibration": get_calibration(expected, results)}
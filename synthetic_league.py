@@ -0,0 +1,316 @@
+"""
+The synthetic_league module writes made up leagues in the same layout as the
+data folder's spreadspoke_scores.csv and nfl_teams.csv, for testing how
+stat_eval and genetic_alg scale and whether they recover known parameters.
+
+Every team has a hidden strength on the elo scale. Game results are drawn
+from the same expected winner formula as EloCalculator.expanded_expected,
+using the true home field advantage and rating factor, and between seasons
+every strength is pulled towards the mean by the true seasonal scaling. So the
+expanded elo parameters that best fit a generated league are known ahead of
+time, and they are returned (and optionally saved) as the ground truth.
+
+Games are generated and written one season at a time, so the memory used
+doesn't grow with the number of seasons and files with millions of games can
+be written.
+
+Usage
+-----
+Call generate_league() with the two file paths to write, or run the module:
+
+    python synthetic_league.py games.csv teams.csv --teams 64 --seasons 200
+
+then load the league with DataHandler.set_data_files(games.csv, teams.csv).
+
+Methods
+-------
+generate_league(str games_file, str teams_file, ...) -> dict:
+    writes a league to games_file and teams_file and returns the ground truth.
+main(list argv) -> none:
+    command line entry point for generate_league().
+_write_teams(str teams_file, list names, list ids, int teams_per_division):
+    writes the teams file.
+_regular_season(...) -> list:
+    plays the regular season of one season and returns its rows.
+_playoffs(...) -> list:
+    plays a single elimination playoff and returns its rows.
+_play(...) -> list:
+    plays a batch of games and returns the csv rows.
+
+Global Variables
+----------------
+GAMES_HEADER: column names of the games file.
+TEAMS_HEADER: column names of the teams file.
+MAX_YEAR: last year a season can start in, dates are written as M/D/YYYY.
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import numpy as np
+
+GAMES_HEADER = ['schedule_date', 'schedule_season', 'schedule_week', 'schedule_playoff',
+                'team_home', 'score_home', 'score_away', 'team_away', 'team_favorite_id',
+                'spread_favorite', 'over_under_line', 'stadium', 'stadium_neutral',
+                'weather_temperature', 'weather_wind_mph', 'weather_humidity',
+                'weather_detail']
+TEAMS_HEADER = ['team_name', 'team_name_short', 'team_id', 'team_id_pfr', 'team_conference',
+                'team_division', 'team_conference_pre2002', 'team_division_pre2002']
+MAX_YEAR = 9998
+
+def generate_league(games_file, teams_file, n_teams=32, n_seasons=50, games_per_team=16,
+                    playoff_rate=.375, neutral_rate=.01, draw_rate=.003, hfa=65,
+                    rating_factor=400, season_scale=.75, strength_sd=100, weekly_sd=5,
+                    first_season=1966, seed=None, truth_file=None):
+    """
+    Generates a league from the latent strength model and streams it to disk.
+
+    Parameters
+    ----------
+    games_file : str
+        path of the games csv file to write.
+    teams_file : str
+        path of the teams csv file to write.
+    n_teams : int, optional
+        number of teams, must be >= 2. The default is 32.
+    n_seasons : int, optional
+        number of seasons. The default is 50.
+    games_per_team : int, optional
+        regular season weeks, every team plays once a week (teams left over
+        with an odd number of teams get a bye). The default is 16.
+    playoff_rate : float, optional
+        share of teams that make the single elimination playoffs, rounded
+        down to a power of 2 (at least 2 teams). The default is .375.
+    neutral_rate : float, optional
+        chance of a regular season game being played at a neutral stadium.
+        The final is always neutral. The default is .01.
+    draw_rate : float, optional
+        chance of a regular season game ending in a draw. The default is .003.
+    hfa : float, optional
+        true home field advantage in elo points. The default is 65.
+    rating_factor : float, optional
+        true rating factor of the expected winner formula. The default is 400.
+    season_scale : float, optional
+        true share of a team's strength (away from the mean) carried into the
+        next season. The default is .75.
+    strength_sd : float, optional
+        standard deviation of the team strengths. The default is 100.
+    weekly_sd : float, optional
+        standard deviation of the weekly change in strength. The default is 5.
+    first_season : int, optional
+        year of the first season. The default is 1966.
+    seed : int, optional
+        seed for the random number generator. The default is None.
+    truth_file : str, optional
+        if given, the ground truth is also written to this json file.
+
+    Raises
+    ------
+    ValueError
+        If there are fewer than 2 teams or the seasons run past MAX_YEAR.
+
+    Returns
+    -------
+    dict
+        ground truth of the league: the model parameters, the number of games
+        written and every team's final strength.
+    """
+    if n_teams < 2:
+        raise ValueError(f"n_teams must be at least 2, received {n_teams}")
+    if first_season + n_seasons - 1 > MAX_YEAR:
+        raise ValueError(f"seasons run past {MAX_YEAR}, lower n_seasons or first_season")
+
+    rng = np.random.default_rng(seed)
+    names = [f'Team {idx:05d}' for idx in range(n_teams)]
+    ids = [f'T{idx:05d}' for idx in range(n_teams)]
+    _write_teams(teams_file, names, ids, 4)
+
+    n_playoff = 2 ** int(np.log2(max(2, min(n_teams, int(playoff_rate * n_teams)))))
+    #stationary spread: carrying season_scale of the strength and adding fresh
+    #noise keeps the strengths' standard deviation at strength_sd
+    season_sd = strength_sd * np.sqrt(max(0.0, 1 - season_scale ** 2))
+    strengths = rng.normal(0, strength_sd, n_teams)
+    model = {'names': names, 'hfa': hfa, 'rating_factor': rating_factor,
+             'neutral_rate': neutral_rate, 'draw_rate': draw_rate, 'weekly_sd': weekly_sd}
+
+    n_games = 0
+    with open(games_file, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(GAMES_HEADER)
+        for season in range(first_season, first_season + n_seasons):
+            if season != first_season:
+                strengths = strengths * season_scale + rng.normal(0, season_sd, n_teams)
+            start = datetime.date(season, 9, 1)
+            rows, wins = _regular_season(rng, model, strengths, season, start, games_per_team)
+            rows += _playoffs(rng, model, strengths, season,
+                              start + datetime.timedelta(weeks=games_per_team),
+                              np.argsort(-(wins + rng.random(n_teams)))[:n_playoff])
+            writer.writerows(rows)
+            n_games += len(rows)
+
+    truth = {'rating_factor': rating_factor, 'hfa': hfa,
+             'season_scale': season_scale, 'strength_sd': strength_sd,
+             'weekly_sd': weekly_sd, 'n_teams': n_teams, 'n_seasons': n_seasons,
+             'n_games': n_games, 'seed': seed,
+             'final_strengths': dict(zip(ids, (1200 + strengths).round(3).tolist()))}
+    if truth_file is not None:
+        with open(truth_file, 'w') as file:
+            json.dump(truth, file, indent=2)
+    return truth
+
+def _write_teams(teams_file, names, ids, teams_per_division):
+    """
+    Writes the teams file, splitting the teams into 2 conferences of divisions
+    of teams_per_division teams.
+
+    :param teams_file: string path of the teams csv file.
+    :param names: list of team_name strings.
+    :param ids: list of team_id strings.
+    :param teams_per_division: int number of teams in a division.
+    """
+    with open(teams_file, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(TEAMS_HEADER)
+        for idx, (name, team_id) in enumerate(zip(names, ids)):
+            conference = 'AFC' if idx % 2 == 0 else 'NFC'
+            division = f'{conference} {idx // (2 * teams_per_division) + 1}'
+            writer.writerow([name, name.split()[-1], team_id, team_id, conference,
+                             division, conference, division])
+
+def _regular_season(rng, model, strengths, season, start, weeks):
+    """
+    Plays one regular season. Every week the teams are shuffled and paired up.
+    strengths drift by model['weekly_sd'] after every week.
+
+    :param rng: np.random.Generator to draw from.
+    :param model: dict of the model parameters from generate_league().
+    :param strengths: np.ndarray of team strengths, updated in place.
+    :param season: int season.
+    :param start: datetime.date of the first week.
+    :param weeks: int number of weeks.
+
+    :return list: returns list of 2 items. First is the list of csv rows, second
+                  is the np.ndarray of wins of each team.
+    """
+    n_teams = len(strengths)
+    wins = np.zeros(n_teams)
+    rows = []
+    for week in range(weeks):
+        order = rng.permutation(n_teams)[:n_teams - n_teams % 2]
+        home, away = order[0::2], order[1::2]
+        neutral = rng.random(len(home)) < model['neutral_rate']
+        date = start + datetime.timedelta(weeks=week)
+        week_rows, home_won = _play(rng, model, strengths, home, away, neutral, season,
+                                    str(week + 1), date, False)
+        rows += week_rows
+        np.add.at(wins, home, home_won == 1)
+        np.add.at(wins, away, home_won == 0)
+        strengths += rng.normal(0, model['weekly_sd'], n_teams)
+    return [rows, wins]
+
+def _playoffs(rng, model, strengths, season, start, seeds):
+    """
+    Plays a single elimination playoff. The better seed hosts every round
+    except the final, which is played at a neutral stadium.
+
+    :param rng: np.random.Generator to draw from.
+    :param model: dict of the model parameters from generate_league().
+    :param strengths: np.ndarray of team strengths.
+    :param season: int season.
+    :param start: datetime.date of the first round.
+    :param seeds: np.ndarray of team indexes, best seed first.
+
+    :return list: returns the list of csv rows.
+    """
+    rows = []
+    round_num = 1
+    while len(seeds) > 1:
+        half = len(seeds) // 2
+        home, away = seeds[:half], seeds[half:][::-1]
+        neutral = np.full(half, half == 1)
+        date = start + datetime.timedelta(weeks=round_num - 1)
+        round_rows, home_won = _play(rng, model, strengths, home, away, neutral, season,
+                                     'Superbowl' if half == 1 else f'Playoff {round_num}',
+                                     date, True)
+        rows += round_rows
+        #winners take the slot of the home team, so the bracket order is kept
+        seeds = np.where(home_won == 1, home, away)
+        round_num += 1
+    return rows
+
+def _play(rng, model, strengths, home, away, neutral, season, week, date, playoff):
+    """
+    Plays a batch of games. The home team wins with the expanded_expected
+    chance given the teams' strengths, the home field advantage (unless
+    neutral) and the rating factor. Playoff games can't end in a draw.
+
+    :param rng: np.random.Generator to draw from.
+    :param model: dict of the model parameters from generate_league().
+    :param strengths: np.ndarray of team strengths.
+    :param home: np.ndarray of home team indexes.
+    :param away: np.ndarray of away team indexes.
+    :param neutral: np.ndarray of bools, true for neutral stadium games.
+    :param season: int season.
+    :param week: string schedule_week.
+    :param date: datetime.date of the games.
+    :param playoff: bool true for playoff games.
+
+    :return list: returns list of 2 items. First is the list of csv rows, second
+                  is an np.ndarray of 1 for home wins, 0 for home losses and -1
+                  for draws.
+    """
+    n_games = len(home)
+    hfa = np.where(neutral, 0, model['hfa'])
+    exp = (strengths[away] - (strengths[home] + hfa)) / model['rating_factor']
+    expected = 1 / (1 + 10 ** exp)
+    home_won = (rng.random(n_games) < expected).astype(int)
+    if not playoff:
+        home_won[rng.random(n_games) < model['draw_rate']] = -1
+
+    loser_score = rng.integers(0, 31, n_games)
+    margin = np.ceil(rng.exponential(10, n_games)).astype(int) + 1
+    score_home = np.where(home_won == 1, loser_score + margin, loser_score)
+    score_away = np.where(home_won == 0, loser_score + margin, loser_score)
+
+    names = model['names']
+    date_str = f'{date.month}/{date.day}/{date.year}'
+    playoff_str = 'TRUE' if playoff else 'FALSE'
+    rows = [[date_str, season, week, playoff_str, names[h], s_home, s_away, names[a],
+             '', '', '', 'Neutral Site' if n else f'{names[h]} Stadium',
+             'TRUE' if n else 'FALSE', '', '', '', '']
+            for h, a, s_home, s_away, n in zip(home.tolist(), away.tolist(), score_home.tolist(),
+                                               score_away.tolist(), neutral.tolist())]
+    return [rows, home_won]
+
+def main(argv=None):
+    """
+    Command line entry point, see the module docstring.
+
+    :param argv: list of command line arguments, defaults to sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(description='Write a synthetic league.')
+    parser.add_argument('games_file')
+    parser.add_argument('teams_file')
+    parser.add_argument('--teams', type=int, default=32)
+    parser.add_argument('--seasons', type=int, default=50)
+    parser.add_argument('--games-per-team', type=int, default=16)
+    parser.add_argument('--playoff-rate', type=float, default=.375)
+    parser.add_argument('--neutral-rate', type=float, default=.01)
+    parser.add_argument('--draw-rate', type=float, default=.003)
+    parser.add_argument('--hfa', type=float, default=65)
+    parser.add_argument('--season-scale', type=float, default=.75)
+    parser.add_argument('--first-season', type=int, default=1966)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--truth-file')
+    args = parser.parse_args(argv)
+    truth = generate_league(args.games_file, args.teams_file, n_teams=args.teams,
+                            n_seasons=args.seasons, games_per_team=args.games_per_team,
+                            playoff_rate=args.playoff_rate, neutral_rate=args.neutral_rate,
+                            draw_rate=args.draw_rate, hfa=args.hfa, season_scale=args.season_scale,
+                            first_season=args.first_season, seed=args.seed,
+                            truth_file=args.truth_file)
+    print(f"Wrote {truth['n_games']} games to {args.games_file}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+"""
+Puts the repository root on sys.path so the tests import the top level modules
+the same way the scripts do, and runs every test from the repository root so
+the relative data paths of data_handler resolve whichever directory pytest is
+started from.
+"""
+
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture(autouse=True)
+def _repo_root(monkeypatch):
+    monkeypatch.chdir(ROOT)
@@ -0,0 +1,50 @@
+"""
+Tests of fitness_cache.FitnessCache.
+"""
+
+import os
+import pytest
+from errors import DatasetMismatchError
+from fitness_cache import FitnessCache
+
+ENTITIES = [[k, 400, 65, .75, 1.5, 0] for k in (10, 20, 30, 40)]
+
+def test_least_recently_used_entry_is_evicted():
+    cache = FitnessCache('digest', max_size=3)
+    for idx, entity in enumerate(ENTITIES[:3]):
+        cache.put(entity, idx / 10)
+    #reading the oldest entry makes the second one the least recently used
+    assert cache.get(ENTITIES[0]) == 0.0
+    cache.put(ENTITIES[3], .3)
+    assert len(cache) == 3
+    assert ENTITIES[1] not in cache
+    assert all(entity in cache for entity in (ENTITIES[0], ENTITIES[2], ENTITIES[3]))
+    assert cache.get(ENTITIES[1]) is None
+    assert [cache.hits, cache.misses] == [1, 1]
+
+def test_save_load_round_trip_keeps_entries_and_order(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    cache = FitnessCache('digest', max_size=3)
+    for idx, entity in enumerate(ENTITIES[:3]):
+        cache.put(entity, idx / 10)
+    cache.get(ENTITIES[0])
+    cache.save(path)
+    assert os.listdir(tmp_path) == ['cache.json']
+    loaded = FitnessCache.load(path, 'digest', max_size=3)
+    assert loaded.to_dict() == cache.to_dict()
+    #the recency order survives, so the next eviction is the same
+    loaded.put(ENTITIES[3], .3)
+    assert ENTITIES[1] not in loaded
+
+def test_missing_file_loads_empty_cache(tmp_path):
+    assert len(FitnessCache.load(str(tmp_path / 'cache.json'), 'digest')) == 0
+
+def test_changed_dataset_digest_is_rejected(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    cache = FitnessCache('old digest')
+    cache.put(ENTITIES[0], .5)
+    cache.save(path)
+    with pytest.raises(DatasetMismatchError):
+        FitnessCache.load(path, 'new digest')
+    with pytest.raises(DatasetMismatchError):
+        FitnessCache('new digest').merge(cache)
@@ -0,0 +1,33 @@
+"""
+Tests of the DataHandler games cache.
+"""
+
+import os
+import numpy as np
+import data_handler
+from data_handler import DataHandler, GameTable
+
+def test_cache_round_trip_leaves_no_temporary_files(tmp_path, monkeypatch):
+    cache_file = str(tmp_path / 'games.npy')
+    monkeypatch.setattr(data_handler, 'GAMES_CACHE_FILE', cache_file)
+    monkeypatch.setattr(data_handler, 'GAMES_CACHE_META_FILE', cache_file + '.json')
+    table = DataHandler.get_game_table()
+    DataHandler._save_game_table_cache(table)
+    assert sorted(os.listdir(tmp_path)) == ['games.npy', 'games.npy.json']
+    loaded = DataHandler._load_game_table_cache()
+    for name in GameTable.COLUMNS:
+        assert np.array_equal(getattr(loaded, name), getattr(table, name))
+
+def test_failed_save_leaves_no_cache(tmp_path, monkeypatch):
+    cache_file = str(tmp_path / 'games.npy')
+    monkeypatch.setattr(data_handler, 'GAMES_CACHE_FILE', cache_file)
+    monkeypatch.setattr(data_handler, 'GAMES_CACHE_META_FILE', cache_file + '.json')
+    table = DataHandler.get_game_table()
+    DataHandler._save_game_table_cache(table)
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+    monkeypatch.setattr(np, 'save', fail)
+    DataHandler._save_game_table_cache(table)
+    #the old meta file is gone, so the stale games are never loaded
+    assert os.listdir(tmp_path) == ['games.npy']
+    assert DataHandler._load_game_table_cache() is None
@@ -0,0 +1,22 @@
+"""
+Tests of genetic_alg runs being reproducible.
+"""
+
+from genetic_alg import genetic_algorithm
+
+def test_resumed_run_matches_uninterrupted_run(tmp_path):
+    checkpoint = str(tmp_path / 'run.json')
+    genetic_algorithm(pop_size=9, generations=2, seed=5, backend='numba', checkpoint=checkpoint)
+    resumed = genetic_algorithm(pop_size=9, generations=4, backend='numba', resume_from=checkpoint)
+    straight = genetic_algorithm(pop_size=9, generations=4, seed=5, backend='numba')
+    assert resumed == straight
+
+def test_same_seed_gives_same_run():
+    first = genetic_algorithm(pop_size=12, generations=3, seed=11, backend='numba')
+    second = genetic_algorithm(pop_size=12, generations=3, seed=11, backend='numba')
+    assert first == second
+
+def test_workers_give_same_run_as_one_process():
+    single = genetic_algorithm(pop_size=12, generations=3, seed=11, backend='numba')
+    pooled = genetic_algorithm(pop_size=12, generations=3, seed=11, backend='numba', workers=3)
+    assert single == pooled
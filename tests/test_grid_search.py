@@ -0,0 +1,47 @@
+"""
+Tests of grid_search and the ResultsStore it resumes from.
+"""
+
+import sqlite3
+import pytest
+import grid_search as gs
+from errors import DatasetMismatchError
+from results_store import ResultsStore
+
+def test_generator_axes_match_lists():
+    from_lists = gs.grid_search(k=[10, 20], hfa_val=[0, 65], backend='numba')
+    from_generators = gs.grid_search(k=(k for k in [10, 20]), hfa_val=iter([0, 65]),
+                                     backend='numba')
+    assert len(from_lists) == 4
+    assert from_generators == from_lists
+
+def test_resume_skips_stored_points(tmp_path, monkeypatch):
+    store = str(tmp_path / 'grid.sqlite')
+    gs.grid_search(k=[10, 20], backend='numba', store=store)
+    replayed = []
+    chunk_counts = gs._chunk_counts
+    def counting(table, chunk, backend):
+        replayed.extend(chunk)
+        return chunk_counts(table, chunk, backend)
+    monkeypatch.setattr(gs, '_chunk_counts', counting)
+    resumed = gs.grid_search(k=[10, 20, 30], backend='numba', store=store)
+    assert replayed == [[30, 400, 0, 1, 1, 0]]
+    monkeypatch.setattr(gs, '_chunk_counts', chunk_counts)
+    assert resumed == gs.grid_search(k=[10, 20, 30], backend='numba')
+    with ResultsStore(store, gs.DataHandler.get_game_table().digest()) as results:
+        assert len(results.finished()) == 3
+
+def test_store_of_another_dataset_is_rejected(tmp_path):
+    store = str(tmp_path / 'grid.sqlite')
+    ResultsStore(store, 'another dataset').close()
+    with pytest.raises(DatasetMismatchError):
+        gs.grid_search(k=[10], backend='numba', store=store)
+
+def test_store_of_another_version_is_rejected(tmp_path):
+    store = str(tmp_path / 'grid.sqlite')
+    gs.grid_search(k=[10], backend='numba', store=store)
+    with sqlite3.connect(store) as connection:
+        connection.execute("UPDATE meta SET value = '0' WHERE name = 'version'")
+    connection.close()
+    with pytest.raises(ValueError):
+        gs.grid_search(k=[10], backend='numba', store=store)
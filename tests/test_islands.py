@@ -0,0 +1,51 @@
+"""
+Tests of the island mode of genetic_alg.
+"""
+
+import queue
+import numpy as np
+from data_handler import DataHandler
+from genetic_alg import genetic_algorithm, _island_main, _initial_population
+from fitness_cache import FitnessCache
+from ga_metrics import MetricsLog
+
+ISLANDS = {'pop_size': 6, 'generations': 2, 'islands': 3, 'migration_interval': 1,
+           'migration_size': 1, 'backend': 'numba'}
+
+def test_seeded_island_run_is_deterministic():
+    first = genetic_algorithm(seed=3, **ISLANDS)
+    second = genetic_algorithm(seed=3, **ISLANDS)
+    #every island returns its pruned population of 2/3 of pop_size
+    assert len(first) == 3 * 4
+    assert first == second
+
+def test_migrants_arrive_and_best_are_sent():
+    table = DataHandler.get_game_table()
+    shm, spec = table.to_shared_memory()
+    migrant = _initial_population(1, np.random.default_rng(0))[0]
+    inbox, outbox, results = queue.Queue(), queue.Queue(), queue.Queue()
+    #a fitness no real entity reaches, so the migrant has to stay the best
+    inbox.put([[migrant, 1.0]])
+    try:
+        _island_main(0, spec, 6, 2, [1, 1], np.random.SeedSequence(3),
+                     FitnessCache(table.digest()), 'numba', False, False, inbox, outbox, results)
+    finally:
+        DataHandler.set_game_table(table)
+        shm.close()
+        shm.unlink()
+    sent = outbox.get_nowait()
+    assert len(sent) == 1 and sent[0][1] < 1.0
+    tag, island, pop_fitness, cache = results.get_nowait()
+    assert [tag, island] == ['result', 0]
+    assert pop_fitness[0] == [migrant, 1.0]
+    assert cache.get(migrant) == 1.0
+
+def test_island_records_reach_the_callers_metrics(tmp_path):
+    path = str(tmp_path / 'metrics.jsonl')
+    received = []
+    with MetricsLog(path, received.append) as metrics:
+        genetic_algorithm(seed=3, metrics=metrics, **ISLANDS)
+    #one record per island for the initial population and each generation
+    assert sorted((record['island'], record['generation']) for record in received) ==\
+           [(island, generation) for island in range(3) for generation in range(3)]
+    assert MetricsLog.read(path) == received
@@ -0,0 +1,54 @@
+"""
+Parity tests of the replay backends. The python loop of
+stat_eval.prediction_expanded_stats is the reference, the numpy and numba
+replays of elo_engine have to give bit for bit the same predictions and elos.
+"""
+
+from itertools import product
+import numpy as np
+import pytest
+from elo_engine import replay
+from genetic_alg import GENE_RANGES
+from stat_eval import prediction_expanded_stats
+
+#every corner of GENE_RANGES with the margin of victory gene on
+CORNERS = [list(genes) + [1] for genes in
+           product(*[(low / divisor, high / divisor) for low, high, divisor in GENE_RANGES[:5]])]
+
+def _elos(teams):
+    """
+    Final elo of every team_name in a prediction_expanded_stats teams dict.
+    """
+    return np.array([teams[name].elo for name in sorted(teams)])
+
+@pytest.mark.parametrize('entity', CORNERS)
+def test_python_matches_numba_at_gene_range_corners(entity):
+    python_stats, python_teams = prediction_expanded_stats(*entity, backend='python')
+    numba_stats, numba_teams = prediction_expanded_stats(*entity, backend='numba')
+    for key in ('Right', 'Wrong', 'Log Loss', 'Brier'):
+        assert python_stats[key] == numba_stats[key]
+    np.testing.assert_array_equal(_elos(python_teams), _elos(numba_teams))
+
+#standard elo, a tuned entity with and without margin of victory, and extreme
+#k-factors and rating-factors
+ENTITIES = [[32, 400, 0, 1, 1, 0], [20, 400, 65, .75, 1.5, 0], [20, 400, 65, .75, 1.5, 1],
+            [1000, 50, 500, 1, 2, 1], [1, 10000, 0, 0, .01, 0], [600, 80, 250, .5, .5, 1]]
+
+@pytest.mark.parametrize('backend', ['numpy', 'numba'])
+@pytest.mark.parametrize('entity', ENTITIES)
+def test_prediction_expanded_stats_backends_match_python(entity, backend):
+    python_stats, python_teams = prediction_expanded_stats(*entity, backend='python')
+    stats, teams = prediction_expanded_stats(*entity, backend=backend)
+    for key in ('Right', 'Wrong', 'Log Loss', 'Brier'):
+        assert python_stats[key] == stats[key]
+    np.testing.assert_array_equal(_elos(python_teams), _elos(teams))
+    assert [python_teams[name].curr_season for name in sorted(python_teams)] ==\
+           [teams[name].curr_season for name in sorted(teams)]
+
+def test_replay_numba_matches_numpy():
+    numpy_state = replay(ENTITIES, backend='numpy', losses=True)
+    numba_state = replay(ENTITIES, backend='numba', losses=True)
+    np.testing.assert_array_equal(numpy_state.right, numba_state.right)
+    np.testing.assert_array_equal(numpy_state.log_loss, numba_state.log_loss)
+    np.testing.assert_array_equal(numpy_state.brier, numba_state.brier)
+    np.testing.assert_array_equal(numpy_state.elos, numba_state.elos)
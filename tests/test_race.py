@@ -0,0 +1,23 @@
+"""
+Tests of elo_engine.race against full replays.
+"""
+
+import numpy as np
+import pytest
+from elo_engine import race, batch_expanded_stats
+from genetic_alg import _initial_population
+from stat_eval import get_accuracy
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_raced_top_keep_matches_full_replay(seed):
+    pop = _initial_population(100, np.random.default_rng(seed))
+    keep = 66
+    accuracies, finished = race(pop, keep, backend='numba')
+    full = np.asarray(get_accuracy(batch_expanded_stats(pop, backend='numba')[0]))
+    #some entities have to be dropped for the race to be tested at all
+    assert not finished.all()
+    raced = sorted(range(len(pop)), key=lambda idx: (finished[idx], accuracies[idx]),
+                   reverse=True)[:keep]
+    replayed = sorted(range(len(pop)), key=lambda idx: full[idx], reverse=True)[:keep]
+    assert raced == replayed
+    np.testing.assert_array_equal(accuracies[finished], full[finished])
@@ -0,0 +1,18 @@
+"""
+Tests of elo_engine.SeasonCheckpoints windows.
+"""
+
+import numpy as np
+from data_handler import DataHandler, GameTable
+from elo_engine import SeasonCheckpoints
+
+ENTITY = [20, 400, 65, .75, 1.5, 0]
+
+def test_window_ends_at_next_season_with_games():
+    table = DataHandler.get_game_table()
+    kept = table.season != 1990
+    gapped = GameTable({name: np.array(getattr(table, name)[kept]) for name in GameTable.COLUMNS},
+                       table.team_ids, table.name_to_idx)
+    starts = gapped.season_starts()
+    stats = SeasonCheckpoints([ENTITY], gapped).window_stats(1985, 1989)
+    assert stats['Right'][0] + stats['Wrong'][0] == starts[1991] - starts[1985]